@@ -1,5 +1,5 @@
 # app/config/__init__.py
-from .database import connect_to_mongo, close_mongo_connection
+from .database import connect_to_mongo, close_mongo_connection, ensure_indexes
 from .settings import settings
 
-__all__ = ['connect_to_mongo', 'close_mongo_connection', 'settings']
\ No newline at end of file
+__all__ = ['connect_to_mongo', 'close_mongo_connection', 'ensure_indexes', 'settings']
\ No newline at end of file
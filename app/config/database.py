@@ -6,10 +6,9 @@ client = AsyncIOMotorClient(settings.mongo_uri)
 db = client[settings.mongo_db_name]
 
 async def connect_to_mongo():
-    global client, db
+    # Dùng lại client tạo lúc import: các model đã giữ `db` của client này,
+    # tạo client mới ở đây sẽ tách health check / close khỏi client thật
     try:
-        client = AsyncIOMotorClient(settings.mongo_uri)  # Sửa thành settings.mongo_uri
-        db = client[settings.mongo_db_name]  # Sửa thành settings.mongo_db_name
         await db.command('ping')
         print("Connected to MongoDB")
         return True
@@ -23,3 +22,24 @@ async def close_mongo_connection():
         client.close()
         print("❌ Disconnected from MongoDB")
 
+
+async def ensure_indexes():
+    """Create the indexes the models rely on (idempotent)"""
+    from app.models.order import Order
+    from app.models.phone_number import PhoneNumber
+    from app.models.pricing import Pricing
+    from app.models.project import Project
+    from app.models.sms_log import SMSLog
+    from app.models.transaction import Transaction
+    from app.models.usage import UsageMeter
+    await Order.ensure_indexes()
+    await PhoneNumber.ensure_indexes()
+    await Pricing.ensure_indexes()
+    await Project.ensure_indexes()
+    await SMSLog.ensure_indexes()
+    await Transaction.ensure_indexes()
+    await UsageMeter.ensure_indexes()
+    from app.services.service_stats import service_stats
+    await service_stats.ensure_indexes()
+    from app.services.sessions import session_store
+    await session_store.ensure_indexes()
@@ -4,6 +4,86 @@ class Settings(BaseSettings):
     # Đổi tên biến để tránh xung đột
     mongo_uri: str = "mongodb://localhost:27017"
     mongo_db_name: str = "sms_verification_db"
+
+    # JWT: khoá ký theo kid ("kid1:secret1,kid2:secret2") và cache claims (app/core/security.py, app/core/auth.py)
+    jwt_signing_keys: str = ""
+    jwt_active_kid: str = ""
+    auth_cache_size: int = 10000
+
+    # Session phía server (app/services/sessions.py); backend: "mongo" hoặc "memory"
+    session_backend: str = "mongo"
+    session_idle_minutes: int = 60 * 24 * 7
+    session_max_age_days: int = 30
+    session_cache_size: int = 10000
+    session_cache_seconds: float = 30
+    session_touch_seconds: float = 60
+    session_flush_seconds: float = 10
+    # Tắt (False) chỉ khi chạy thử qua http:// ở máy local
+    session_cookie_secure: bool = True
+
+    # Mã hoá mật khẩu bằng scrypt (app/core/passwords.py); workers = 0 -> số CPU
+    password_scrypt_n: int = 16384
+    password_scrypt_r: int = 8
+    password_scrypt_p: int = 1
+    password_hash_workers: int = 0
+
+    # Theo dõi tình trạng database (app/services/health.py)
+    health_check_interval_seconds: float = 5
+    health_check_timeout_seconds: float = 2
+    health_failure_threshold: int = 2
+
+    # Cấp phát số điện thoại (app/services/number_allocator.py)
+    allocation_batch_size: int = 8
+    allocation_lease_seconds: int = 30
+
+    # Dọn dẹp đơn hàng / giao dịch pending quá hạn (app/services/sweeper.py)
+    sweeper_interval_seconds: int = 60
+    sweeper_lease_seconds: int = 180
+    sweeper_batch_size: int = 500
+    pending_order_hours: int = 1
+    pending_transaction_hours: int = 24
+
+    # Lưu trữ đơn hàng / giao dịch cũ (app/services/archiver.py, chạy trong sweeper)
+    archive_order_days: int = 90
+    archive_transaction_days: int = 90
+    archive_batch_size: int = 1000
+    archive_max_batches_per_run: int = 20
+
+    # Static đã fingerprint + nén sẵn (app/core/assets.py, scripts/build_assets.py)
+    static_build_dir: str = "app/static_build"
+    image_derivatives_dir: str = "app/static_derived"
+
+    # Template Jinja: bytecode cache và biên dịch trước khi khởi động (app/core/templating.py)
+    template_bytecode_cache_dir: str = ""
+    template_precompile: bool = True
+
+    # Context dùng chung cho các trang (app/services/page_context.py)
+    page_context_ttl_seconds: float = 10
+
+    # Snapshot danh mục dịch vụ cho /api/services (app/services/service_catalog.py)
+    services_snapshot_ttl_seconds: float = 30
+    services_api_max_age_seconds: int = 15
+
+    # Autocomplete quốc gia (app/services/country_index.py)
+    country_index_refresh_seconds: int = 300
+
+    # Thống kê tỷ lệ thành công (app/services/service_stats.py)
+    stats_window_minutes: int = 60
+    stats_flush_seconds: float = 10
+
+    # Gộp các lệnh $inc (app/services/counter_buffer.py)
+    counter_flush_interval_ms: int = 1000
+    counter_flush_max_updates: int = 1000
+
+    # Đo lượng sử dụng API (app/models/usage.py)
+    usage_hourly_retention_days: int = 90
+
+    # Thời gian giữ SMS log (TTL, app/models/sms_log.py)
+    sms_log_retention_days: int = 30
+
+    # Đổi giá hàng loạt (app/services/repricer.py, app/models/pricing.py)
+    reprice_batch_size: int = 500
+    price_cache_ttl_seconds: int = 30
     
     class Config:
         env_file = ".env"
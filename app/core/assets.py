@@ -0,0 +1,193 @@
+"""
+Fingerprinted, precompressed static assets.
+
+Build step (scripts/build_assets.py, run on deploy): every file under
+app/static is copied to settings.static_build_dir as
+`name.<content hash>.ext`, text assets (CSS, JS, SVG, ...) also get
+`.gz` and, when the optional `brotli` package is installed, `.br`
+siblings. manifest.json maps the source path to the fingerprinted one.
+
+Serving: AssetStaticFiles is mounted at /static over the build directory,
+the image derivatives (app/core/images.py) and app/static, in that order.
+For a fingerprinted file it serves the best precompressed sibling the
+client accepts (br, then gzip) with
+`Cache-Control: public, max-age=31536000, immutable`: the name changes
+whenever the content does, so a cached copy never needs revalidating.
+Anything else (no build yet, a file missing from the manifest, the
+manifest.json / images.json indexes themselves) is served with
+`no-cache`, i.e. revalidated by ETag.
+
+Templates resolve URLs with the `asset_url` global:
+
+    <link rel="stylesheet" href="{{ asset_url('css/User/purchase.css') }}" />
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import shutil
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from app.config.settings import settings
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = "app/static"
+STATIC_URL = "/static"
+MANIFEST_NAME = "manifest.json"
+# Indexes rewritten in place by each build (images.json: app/core/images.py),
+# so never immutable even though they sit in the build directories
+INDEX_NAMES = {MANIFEST_NAME, "images.json"}
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.html', '.txt', '.map', '.xml'}
+MIN_COMPRESS_BYTES = 256
+# (Accept-Encoding token, sibling suffix) in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def fingerprinted_name(path: str, content: bytes) -> str:
+    """css/style.css -> css/style.<10 hex of sha256>.css"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:10]}{ext}"
+
+
+def _write_if_smaller(target: str, data: bytes, original_size: int) -> bool:
+    if len(data) >= original_size:
+        return False
+    with open(target, 'wb') as f:
+        f.write(data)
+    return True
+
+
+def build_assets(source: str = STATIC_DIR, target: str = None, clean: bool = False) -> dict:
+    """Fingerprint and precompress every file under `source`; returns a report"""
+    target = target or settings.static_build_dir
+    if clean and os.path.isdir(target):
+        shutil.rmtree(target)
+    manifest, report = {}, {'files': 0, 'gzip': 0, 'brotli': 0, 'bytes': 0, 'compressed_bytes': 0}
+    for root, _, files in os.walk(source):
+        for filename in sorted(files):
+            full = os.path.join(root, filename)
+            path = os.path.relpath(full, source).replace(os.sep, '/')
+            with open(full, 'rb') as f:
+                content = f.read()
+            hashed = fingerprinted_name(path, content)
+            out = os.path.join(target, hashed)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            with open(out, 'wb') as f:
+                f.write(content)
+            manifest[path] = hashed
+            report['files'] += 1
+            report['bytes'] += len(content)
+
+            smallest = len(content)
+            if os.path.splitext(path)[1].lower() in COMPRESSIBLE and len(content) >= MIN_COMPRESS_BYTES:
+                # mtime=0 keeps the .gz byte-identical between builds
+                gz = gzip.compress(content, compresslevel=9, mtime=0)
+                if _write_if_smaller(out + '.gz', gz, len(content)):
+                    report['gzip'] += 1
+                    smallest = min(smallest, len(gz))
+                if brotli is not None:
+                    br = brotli.compress(content, quality=11)
+                    if _write_if_smaller(out + '.br', br, len(content)):
+                        report['brotli'] += 1
+                        smallest = min(smallest, len(br))
+            report['compressed_bytes'] += smallest
+    os.makedirs(target, exist_ok=True)
+    with open(os.path.join(target, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    manifest_cache.clear()
+    return report
+
+
+class _ManifestCache:
+    """manifest.json of the build directory, read once"""
+
+    def __init__(self):
+        self._manifest: Optional[Dict[str, str]] = None
+
+    def get(self) -> Dict[str, str]:
+        if self._manifest is None:
+            path = os.path.join(settings.static_build_dir, MANIFEST_NAME)
+            try:
+                with open(path) as f:
+                    self._manifest = json.load(f)
+            except (OSError, ValueError):
+                # No build yet: URLs point at the source files
+                self._manifest = {}
+        return self._manifest
+
+    def clear(self) -> None:
+        self._manifest = None
+
+
+manifest_cache = _ManifestCache()
+
+
+def asset_url(path: str) -> str:
+    """URL of a static asset, fingerprinted when it is in the manifest"""
+    path = path.lstrip('/')
+    return f"{STATIC_URL}/{manifest_cache.get().get(path, path)}"
+
+
+class AssetStaticFiles(StaticFiles):
+    """StaticFiles over the build and image derivative directories first, then app/static"""
+
+    def __init__(self, directory: str = STATIC_DIR, build_dir: str = None, derived_dir: str = None, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        # Everything in these is content-addressed, hence immutable
+        self.immutable_dirs = [
+            os.path.realpath(d) for d in (
+                build_dir or settings.static_build_dir,
+                derived_dir or settings.image_derivatives_dir
+            ) if os.path.isdir(d)
+        ]
+        self.all_directories = self.immutable_dirs + list(self.all_directories)
+
+    def _precompressed(self, full_path: str, accept_encoding: str):
+        accepted = {token.split(';')[0].strip() for token in accept_encoding.split(',')}
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted:
+                try:
+                    return encoding, full_path + suffix, os.stat(full_path + suffix)
+                except OSError:
+                    continue
+        return None
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        real_path = os.path.realpath(full_path)
+        if os.path.basename(real_path) in INDEX_NAMES or not any(
+            real_path.startswith(d + os.sep) for d in self.immutable_dirs
+        ):
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            response.headers['Cache-Control'] = REVALIDATE
+            return response
+
+        request_headers = Headers(scope=scope)
+        variant = self._precompressed(full_path, request_headers.get('accept-encoding', ''))
+        if variant is None:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+        else:
+            encoding, sibling, sibling_stat = variant
+            media_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+            response = FileResponse(
+                sibling, status_code=status_code, stat_result=sibling_stat,
+                media_type=media_type, headers={'Content-Encoding': encoding}
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                response = NotModifiedResponse(response.headers)
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
@@ -0,0 +1,158 @@
+"""
+Authentication middleware: who is making this request.
+
+For every HTTP request the user comes from, in order:
+
+- an access token in the `Authorization: Bearer` header (API clients),
+  verified with app.core.security.decode_access_token; only when
+  JWT_SIGNING_KEYS is configured, since the per-process fallback key
+  issues nothing clients could hold,
+- the `session_id` cookie, looked up in the server-side session store
+  (app/services/sessions.py; browsers after login).
+
+The old `user_token` JWT cookie is no longer accepted: it could not be
+revoked by /logout.
+
+The result is put on `request.state.user`: an AuthUser, or None for
+anonymous requests or invalid tokens / sessions. The middleware never
+rejects a request; routes decide what anonymous users may see (see
+`user_id_for` below).
+
+Verified claims are kept in a bounded LRU (settings.auth_cache_size)
+keyed by the SHA-256 of the token, until the token's `exp`. A returning
+token costs a hash and a dict lookup instead of a signature check. An
+entry is also dropped when its signing key is no longer on the key ring,
+so removing a key during rotation takes effect immediately.
+"""
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from bson import ObjectId
+from jose import JWTError
+
+from app.config.settings import settings
+from app.core.security import decode_access_token, key_ring
+from app.services.sessions import SESSION_COOKIE, session_store
+
+logger = logging.getLogger(__name__)
+
+class AuthUser:
+    __slots__ = ('id', 'email', 'claims')
+
+    def __init__(self, claims: dict):
+        sub = claims.get('sub')
+        self.id = ObjectId(sub) if sub and ObjectId.is_valid(sub) else None
+        self.email = claims.get('email')
+        self.claims = claims
+
+
+class ClaimsCache:
+    """LRU of token hash -> (exp, kid, AuthUser)"""
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or settings.auth_cache_size
+        self._entries: "OrderedDict[bytes, Tuple[float, str, AuthUser]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: bytes) -> Optional[AuthUser]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        exp, kid, user = entry
+        if exp <= time.time() or kid not in key_ring.keys:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return user
+
+    def put(self, key: bytes, exp: float, kid: str, user: AuthUser) -> None:
+        self._entries[key] = (exp, kid, user)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+claims_cache = ClaimsCache()
+
+
+def _cookies(header: str) -> dict:
+    cookies = {}
+    for part in header.split(';'):
+        name, _, value = part.strip().partition('=')
+        if name and value:
+            cookies.setdefault(name, value.strip('"'))
+    return cookies
+
+
+def bearer_token(authorization: str) -> Optional[str]:
+    scheme, _, credentials = authorization.partition(' ')
+    if scheme.lower() == 'bearer' and credentials.strip():
+        return credentials.strip()
+    return None
+
+
+def authenticate(token: Optional[str]) -> Optional[AuthUser]:
+    """AuthUser for a token (cached until exp), None if missing or invalid"""
+    if not token:
+        return None
+    key = hashlib.sha256(token.encode('utf-8')).digest()
+    user = claims_cache.get(key)
+    if user is not None:
+        return user
+    try:
+        kid, claims = decode_access_token(token)
+    except JWTError:
+        return None
+    user = AuthUser(claims)
+    if isinstance(claims.get('exp'), (int, float)):
+        claims_cache.put(key, claims['exp'], kid, user)
+    return user
+
+
+class AuthMiddleware:
+    """Pure ASGI middleware setting request.state.user"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            headers = {}
+            for name, value in scope['headers']:
+                if name in (b'authorization', b'cookie'):
+                    headers[name.decode('latin-1')] = value.decode('latin-1')
+            scope.setdefault('state', {})['user'] = await self._user(headers)
+        await self.app(scope, receive, send)
+
+    async def _user(self, headers: dict) -> Optional[AuthUser]:
+        token = bearer_token(headers.get('authorization', ''))
+        if token and key_ring.configured:
+            return authenticate(token)
+        cookies = _cookies(headers.get('cookie', ''))
+        session_token = cookies.get(SESSION_COOKIE)
+        if session_token:
+            try:
+                session = await session_store.get(session_token)
+            except Exception as e:
+                # Session backend down: serve the request as anonymous
+                logger.error(f"Session lookup failed: {str(e)}")
+                session = None
+            if session is not None:
+                return AuthUser(session.claims)
+        return None
+
+
+def user_id_for(request, default: Optional[ObjectId] = None) -> Optional[ObjectId]:
+    """Id of the signed-in user, `default` for anonymous requests"""
+    user = getattr(request.state, 'user', None)
+    return user.id if user is not None and user.id is not None else default
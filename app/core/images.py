@@ -0,0 +1,187 @@
+"""
+Responsive image derivatives for app/static/img.
+
+Build step (scripts/build_images.py, offline / on deploy): every image is
+resized to the standard WIDTHS below its own width (never upscaled) and
+encoded as AVIF and WebP, whichever the installed Pillow supports.
+Derivatives are written to settings.image_derivatives_dir as
+
+    img/<name>.<source hash>.<width>w.<format>
+
+The source hash is in the name, so a rebuild only encodes images that
+changed: existing files are reused as-is. images.json in the same
+directory lists, per source image, its size and the derivatives of each
+format.
+
+Pillow is optional and only needed for the build. The app only reads
+images.json, and without it the template helpers emit a plain <img>.
+
+Template helpers (registered as Jinja globals in app/core/templating.py):
+
+    <img srcset="{{ image_srcset('img/login.avif', 'webp') }}" ...>
+    {{ responsive_image('img/signUp.webp', alt='', class_='rectangle-20', sizes='437px') }}
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Iterable, Optional
+
+from markupsafe import Markup, escape
+
+from app.config.settings import settings
+from app.core.assets import STATIC_DIR, STATIC_URL, asset_url
+
+try:
+    from PIL import Image, features
+except ImportError:  # optional: only scripts/build_images.py needs it
+    Image = None
+    features = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_DIR = "img"
+INDEX_NAME = "images.json"
+WIDTHS = (320, 640, 960, 1280, 1920)
+# Preferred first: browsers take the first <source> type they support
+FORMATS = ('avif', 'webp')
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.avif', '.gif'}
+QUALITY = {'avif': 50, 'webp': 75}
+
+
+def supported_formats() -> tuple:
+    """Derivative formats the installed Pillow can encode"""
+    if Image is None:
+        return ()
+    return tuple(fmt for fmt in FORMATS if features.check(fmt))
+
+
+def _source_name(path: str) -> str:
+    # "avatar-ui-unicorn-v-20.png.png" -> "avatar-ui-unicorn-v-20"
+    name = os.path.basename(path)
+    while os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+        name = os.path.splitext(name)[0]
+    return name
+
+
+def build_derivatives(
+    source: str = STATIC_DIR,
+    target: str = None,
+    widths: Iterable[int] = WIDTHS,
+    formats: Optional[Iterable[str]] = None
+) -> dict:
+    """Resize / re-encode every image under source/img; returns a report"""
+    if Image is None:
+        raise RuntimeError("Pillow is required to build image derivatives (pip install Pillow)")
+    target = target or settings.image_derivatives_dir
+    formats = [f for f in (formats or FORMATS) if f in supported_formats()]
+    if not formats:
+        raise RuntimeError(f"Pillow here cannot encode any of {', '.join(FORMATS)}")
+
+    index, report = {}, {'images': 0, 'encoded': 0, 'reused': 0, 'failed': []}
+    image_root = os.path.join(source, IMAGE_DIR)
+    for root, _, files in os.walk(image_root):
+        for filename in sorted(files):
+            if os.path.splitext(filename)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            full = os.path.join(root, filename)
+            path = os.path.relpath(full, source).replace(os.sep, '/')
+            try:
+                entry = _build_one(full, path, target, widths, formats, report)
+            except OSError as e:
+                # Unreadable / unsupported input: keep serving the original
+                report['failed'].append(path)
+                logger.error(f"Image {path} skipped: {e}")
+                continue
+            index[path] = entry
+            report['images'] += 1
+
+    os.makedirs(target, exist_ok=True)
+    with open(os.path.join(target, INDEX_NAME), 'w') as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    image_index.clear()
+    return report
+
+
+def _build_one(full: str, path: str, target: str, widths, formats, report) -> dict:
+    with open(full, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:10]
+    directory = os.path.dirname(path)
+    name = _source_name(path)
+    with Image.open(full) as image:
+        image.load()
+        width, height = image.size
+        # Original width too, so large screens still get a recoded file
+        targets = sorted({w for w in widths if w < width} | {width})
+        entry = {'width': width, 'height': height, 'hash': digest, 'variants': {}}
+        for fmt in formats:
+            variants = []
+            for w in targets:
+                rel = f"{directory}/{name}.{digest}.{w}w.{fmt}"
+                out = os.path.join(target, rel)
+                if os.path.exists(out):
+                    report['reused'] += 1
+                else:
+                    os.makedirs(os.path.dirname(out), exist_ok=True)
+                    resized = image if w == width else image.resize(
+                        (w, max(1, round(height * w / width))), Image.LANCZOS
+                    )
+                    if resized.mode not in ('RGB', 'RGBA'):
+                        resized = resized.convert('RGBA')
+                    # Write then rename: an interrupted build never leaves half a file
+                    resized.save(out + '.tmp', format=fmt.upper(), quality=QUALITY[fmt])
+                    os.replace(out + '.tmp', out)
+                    report['encoded'] += 1
+                variants.append([w, rel])
+            entry['variants'][fmt] = variants
+    return entry
+
+
+class _ImageIndex:
+    """images.json of the derivatives directory, read once"""
+
+    def __init__(self):
+        self._index: Optional[Dict[str, dict]] = None
+
+    def get(self) -> Dict[str, dict]:
+        if self._index is None:
+            try:
+                with open(os.path.join(settings.image_derivatives_dir, INDEX_NAME)) as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def clear(self) -> None:
+        self._index = None
+
+
+image_index = _ImageIndex()
+
+
+def image_srcset(path: str, fmt: str = 'webp') -> str:
+    """"url 320w, url 640w, ..." for one format, '' when there are no derivatives"""
+    entry = image_index.get().get(path.lstrip('/'))
+    if not entry:
+        return ''
+    return ', '.join(f"{STATIC_URL}/{rel} {w}w" for w, rel in entry['variants'].get(fmt, []))
+
+
+def responsive_image(path: str, alt: str = '', sizes: str = '100vw', class_: str = '', **attrs) -> Markup:
+    """<picture> with AVIF / WebP sources and the original as fallback <img>"""
+    path = path.lstrip('/')
+    entry = image_index.get().get(path)
+    img_attrs = {'class': class_, 'src': asset_url(path), 'alt': alt, **attrs}
+    if entry:
+        img_attrs.update(width=entry['width'], height=entry['height'])
+    img = '<img ' + ' '.join(
+        f'{k}="{escape(v)}"' for k, v in img_attrs.items() if v != '' or k == 'alt'
+    ) + ' />'
+    if not entry:
+        return Markup(img)
+    sources = ''.join(
+        f'<source type="{MIME_TYPES[fmt]}" srcset="{escape(image_srcset(path, fmt))}" sizes="{escape(sizes)}" />'
+        for fmt in FORMATS if entry['variants'].get(fmt)
+    )
+    return Markup(f"<picture>{sources}{img}</picture>")
@@ -0,0 +1,81 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(timestamp: datetime, doc_id: ObjectId) -> str:
+    """Encode the (timestamp, _id) of the last row of a page as an opaque token."""
+    payload = json.dumps({'t': timestamp.isoformat(), 'id': str(doc_id)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str) -> Tuple[datetime, ObjectId]:
+    """
+    Decode a continuation token produced by encode_cursor.
+
+    :raises ValueError: If the token is malformed.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(payload['t']), ObjectId(payload['id'])
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+
+
+def keyset_filter(field: str, cursor: Optional[str]) -> dict:
+    """
+    Build the filter selecting rows strictly after `cursor` in
+    (field desc, _id desc) order. Returns an empty filter for the first page.
+    """
+    if not cursor:
+        return {}
+    timestamp, doc_id = decode_cursor(cursor)
+    return {'$or': [
+        {field: {'$lt': timestamp}},
+        {field: timestamp, '_id': {'$lt': doc_id}}
+    ]}
+
+
+async def fetch_page(collection, query: dict, field: str, limit: int, cursor: Optional[str] = None):
+    """
+    Run a keyset-paginated query sorted by (field desc, _id desc).
+
+    Every page is an index range scan of `limit + 1` rows, so deep pages cost
+    the same as the first one.
+
+    :return: (rows, next_cursor) where next_cursor is None on the last page.
+    """
+    return await fetch_page_merged([collection], query, field, limit, cursor)
+
+
+async def fetch_page_merged(
+    collections: List, query: dict, field: str, limit: int, cursor: Optional[str] = None
+):
+    """
+    fetch_page over several collections holding the same kind of rows, such
+    as a hot collection and its archive. Each one is range-scanned for
+    `limit + 1` rows and the results are merged, so the cursor works across
+    both. A row present in two collections at once (archived but not yet
+    deleted from the hot one) is returned once.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page_query = {**query, **keyset_filter(field, cursor)}
+    rows = []
+    seen = set()
+    for collection in collections:
+        async for doc in collection.find(page_query).sort([(field, -1), ('_id', -1)]).limit(limit + 1):
+            if doc['_id'] not in seen:
+                seen.add(doc['_id'])
+                rows.append(doc)
+    if len(collections) > 1:
+        rows.sort(key=lambda doc: (doc[field], doc['_id']), reverse=True)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][field], rows[-1]['_id'])
@@ -0,0 +1,152 @@
+"""
+Password hashing with scrypt (hashlib), off the event loop.
+
+Hashes are stored as
+
+    scrypt$n=16384,r=8,p=1$<salt, base64>$<key, base64>
+
+so the cost can be raised later (settings.password_scrypt_n / _r / _p)
+without breaking existing hashes: each one is verified with the
+parameters it was made with, and `verify_and_update` returns a new hash
+whenever the stored one is outdated. That includes legacy hashes of the
+old format (hex salt + single salted SHA-256, 96 hex chars), so users are
+moved to scrypt on their next successful login.
+
+scrypt costs tens of milliseconds of CPU and n * r * 128 bytes of memory
+per call, so it runs in a dedicated thread pool of
+settings.password_hash_workers threads (hashlib releases the GIL while
+hashing). Login floods queue there instead of stalling other requests or
+using unbounded memory.
+
+Usage:
+
+    from app.core.passwords import hash_password, verify_and_update
+    user_data['password'] = await hash_password(password)
+    ok, new_hash = await verify_and_update(user.get('password'), password)
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from app.config.settings import settings
+
+SCHEME = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+LEGACY_LENGTH = 96
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def current_params() -> dict:
+    return {'n': settings.password_scrypt_n, 'r': settings.password_scrypt_r, 'p': settings.password_scrypt_p}
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _unb64(data: str) -> bytes:
+    return base64.b64decode(data + '=' * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+        # OpenSSL's default limit (32MB) is below what n=2**15, r=8 needs
+        maxmem=256 * n * r * p + 1024 * 1024, dklen=KEY_BYTES
+    )
+
+
+def _parse(stored: str) -> Optional[Tuple[dict, bytes, bytes]]:
+    """(params, salt, key) of a scrypt hash, None if it is not one"""
+    try:
+        scheme, params, salt, key = stored.split('$')
+        if scheme != SCHEME:
+            return None
+        parsed = {k: int(v) for k, v in (item.split('=') for item in params.split(','))}
+        return {'n': parsed['n'], 'r': parsed['r'], 'p': parsed['p']}, _unb64(salt), _unb64(key)
+    except (ValueError, KeyError):
+        return None
+
+
+def is_legacy_hash(stored: str) -> bool:
+    """Old format: 16-byte salt + SHA-256 digest, hex encoded"""
+    if not isinstance(stored, str) or len(stored) != LEGACY_LENGTH:
+        return False
+    try:
+        bytes.fromhex(stored)
+    except ValueError:
+        return False
+    return True
+
+
+def hash_password_sync(password: str) -> str:
+    """Blocking; use `hash_password` from async code"""
+    params = current_params()
+    salt = os.urandom(SALT_BYTES)
+    key = _scrypt(password, salt, **params)
+    return f"{SCHEME}$n={params['n']},r={params['r']},p={params['p']}${_b64(salt)}${_b64(key)}"
+
+
+def needs_rehash(stored: str) -> bool:
+    parsed = _parse(stored) if isinstance(stored, str) else None
+    return parsed is None or parsed[0] != current_params()
+
+
+def verify_password_sync(stored: Optional[str], password: str) -> bool:
+    """Blocking; use `verify_and_update` from async code"""
+    if is_legacy_hash(stored):
+        salt = bytes.fromhex(stored[:32])
+        digest = hashlib.sha256(salt + password.encode('utf-8')).hexdigest()
+        return hmac.compare_digest(digest, stored[32:])
+    parsed = _parse(stored) if isinstance(stored, str) else None
+    if parsed is None:
+        # Unknown user or no password (social login): burn the same time anyway
+        _scrypt(password, b'\0' * SALT_BYTES, **current_params())
+        return False
+    params, salt, key = parsed
+    return hmac.compare_digest(_scrypt(password, salt, **params), key)
+
+
+def _verify_and_update_sync(stored: Optional[str], password: str) -> Tuple[bool, Optional[str]]:
+    if not verify_password_sync(stored, password):
+        return False, None
+    return True, hash_password_sync(password) if needs_rehash(stored) else None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.password_hash_workers or os.cpu_count() or 1,
+            thread_name_prefix='password-hash'
+        )
+    return _executor
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_pool(), hash_password_sync, password)
+
+
+async def verify_and_update(stored: Optional[str], password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password against a stored hash.
+
+    :return: (ok, new_hash); new_hash is set when ok and the stored hash
+             is legacy or made with other parameters, and should be saved.
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        _pool(), _verify_and_update_sync, stored, password
+    )
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
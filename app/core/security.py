@@ -1,27 +1,59 @@
-import hashlib
-import os
+import logging
+import secrets
 from datetime import datetime, timedelta
-from jose import jwt
+from typing import Dict, Tuple
+from jose import jwt, JWTError
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
 
-SECRET_KEY = "your_secret_key_here"  # Replace with your actual secret key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-def hash_password(password: str) -> str:
-    """Hash a password with a random salt using SHA-256."""
-    salt = os.urandom(16)
-    salted_password = salt + password.encode('utf-8')
-    hashed = hashlib.sha256(salted_password).hexdigest()
-    # Store salt and hash together (hex encoded)
-    return salt.hex() + hashed
-
-def verify_password(stored_hash: str, password: str) -> bool:
-    """Verify a password against the stored hash."""
-    salt = bytes.fromhex(stored_hash[:32])
-    stored_password_hash = stored_hash[32:]
-    salted_password = salt + password.encode('utf-8')
-    hashed = hashlib.sha256(salted_password).hexdigest()
-    return hashed == stored_password_hash
+
+class KeyRing:
+    """
+    Signing keys by kid (JWT_SIGNING_KEYS="kid1:secret1,kid2:secret2").
+
+    New tokens are signed with the active key (JWT_ACTIVE_KID, else the
+    first one) and carry its kid in the header; any key still on the ring
+    verifies. Rotation: add the new key and make it active, then drop the
+    old one once its tokens have expired.
+
+    Without JWT_SIGNING_KEYS a random key is generated for this process:
+    its tokens stop verifying on restart and in other workers, and no
+    token can be forged from a secret committed to the repo. Tokens
+    without a kid are always rejected.
+    """
+
+    def __init__(self, spec: str = "", active_kid: str = ""):
+        self.keys: Dict[str, str] = {}
+        for item in (spec or "").split(","):
+            kid, sep, secret = item.strip().partition(":")
+            if sep and kid and secret:
+                self.keys[kid] = secret
+        self.configured = bool(self.keys)
+        if not self.configured:
+            logger.warning("JWT_SIGNING_KEYS is not set, using a random per-process signing key")
+            self.keys[f"ephemeral-{secrets.token_hex(4)}"] = secrets.token_urlsafe(32)
+        self.active_kid = active_kid if active_kid in self.keys else next(iter(self.keys))
+
+    def key_for(self, token: str) -> Tuple[str, str]:
+        """
+        (kid, secret) that must have signed `token`.
+
+        :raises JWTError: If the token is malformed, has no kid or its kid is not on the ring.
+        """
+        kid = jwt.get_unverified_header(token).get("kid")
+        if not kid:
+            raise JWTError("Token has no kid")
+        secret = self.keys.get(kid)
+        if secret is None:
+            raise JWTError(f"Unknown signing key: {kid}")
+        return kid, secret
+
+
+key_ring = KeyRing(settings.jwt_signing_keys, settings.jwt_active_kid)
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     """
@@ -37,5 +69,20 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(
+        to_encode, key_ring.keys[key_ring.active_kid], algorithm=ALGORITHM,
+        headers={"kid": key_ring.active_kid}
+    )
     return encoded_jwt
+
+def decode_access_token(token: str) -> Tuple[str, dict]:
+    """
+    Verify a JWT access token (signature and exp).
+
+    :return: (kid of the signing key, claims)
+    :raises JWTError: If the token is invalid, expired or signed with an unknown key.
+    """
+    kid, secret = key_ring.key_for(token)
+    return kid, jwt.decode(
+        token, secret, algorithms=[ALGORITHM], options={"require_exp": True, "require_sub": True}
+    )
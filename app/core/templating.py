@@ -0,0 +1,68 @@
+"""
+Shared Jinja2 template environment for the whole app.
+
+main.py and the routers import `templates` from here instead of each
+creating their own Jinja2Templates, so every template is parsed and
+compiled once per worker and the compiled template cache is shared.
+
+Compiled templates are also written to a filesystem bytecode cache
+(settings.template_bytecode_cache_dir, Jinja's per-user temp directory
+when empty). A new worker then loads the bytecode instead of re-parsing
+and re-compiling the source. Entries are keyed by template name and
+checked against the source checksum, so editing a template is picked up.
+
+`precompile_templates()` loads every template under app/views at
+startup (settings.template_precompile), so the first request to each
+page no longer pays for the compilation.
+
+Templates get `asset_url` (app/core/assets.py), `image_srcset` and
+`responsive_image` (app/core/images.py) as globals.
+"""
+import logging
+import os
+import time
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError
+
+from app.config.settings import settings
+from app.core.assets import asset_url
+from app.core.images import image_srcset, responsive_image
+
+logger = logging.getLogger(__name__)
+
+VIEWS_DIR = "app/views"
+TEMPLATE_EXTENSIONS = ("html",)
+
+
+def _bytecode_cache() -> FileSystemBytecodeCache:
+    directory = settings.template_bytecode_cache_dir or None
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return FileSystemBytecodeCache(directory)
+
+
+templates = Jinja2Templates(directory=VIEWS_DIR)
+# Set on the existing environment: Jinja2Templates does not take env options on every Starlette version
+templates.env.bytecode_cache = _bytecode_cache()
+templates.env.globals['asset_url'] = asset_url
+templates.env.globals['image_srcset'] = image_srcset
+templates.env.globals['responsive_image'] = responsive_image
+
+
+def precompile_templates(env=None) -> dict:
+    """Load (compile or read from bytecode cache) every template; returns a report"""
+    env = env or templates.env
+    start = time.perf_counter()
+    loaded, failed = 0, []
+    for name in env.list_templates(extensions=TEMPLATE_EXTENSIONS):
+        try:
+            env.get_template(name)
+            loaded += 1
+        except TemplateSyntaxError as e:
+            # Broken templates fail on their own page, not at startup
+            failed.append(name)
+            logger.error(f"Template {name} failed to compile: {e}")
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+    logger.info(f"Precompiled {loaded} templates in {elapsed_ms} ms")
+    return {'loaded': loaded, 'failed': failed, 'elapsed_ms': elapsed_ms}
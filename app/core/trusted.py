@@ -0,0 +1,107 @@
+"""
+Trusted decoding of documents read back from MongoDB into Pydantic schemas.
+
+Data written by the app was validated on the way in, so re-running every
+validator on each read (list pages, search results) is overhead, and a
+validator tightened later (e.g. ProjectSchema.validate_name) would make
+older stored documents unreadable.
+`trusted_construct` builds the instance with `model_construct` instead
+(which maps aliased keys such as `_id` and fills defaults), after only the
+conversions our stored data needs:
+
+- ObjectId values are turned into str for str / List[str] fields,
+- plain values are wrapped into Enum and nested schema fields.
+
+Use it only for documents coming from our own collections; anything from
+a client still goes through normal validation.
+"""
+import enum
+import typing
+from functools import lru_cache
+from typing import Iterable, List, Tuple, Type, TypeVar
+
+from bson import ObjectId
+from pydantic import BaseModel
+
+T = TypeVar('T', bound=BaseModel)
+
+# Conversion kinds of a field
+_PLAIN, _STR, _STR_LIST, _ENUM, _MODEL, _MODEL_LIST = range(6)
+
+
+def _unwrap_optional(annotation):
+    if typing.get_origin(annotation) is typing.Union:
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _classify(annotation):
+    annotation = _unwrap_optional(annotation)
+    origin = typing.get_origin(annotation)
+    if origin in (list, List):
+        (item,) = typing.get_args(annotation) or (None,)
+        if item is str:
+            return _STR_LIST, None
+        if isinstance(item, type) and issubclass(item, BaseModel):
+            return _MODEL_LIST, item
+        return _PLAIN, None
+    if annotation is str:
+        return _STR, None
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        return _ENUM, annotation
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _MODEL, annotation
+    return _PLAIN, None
+
+
+@lru_cache(maxsize=None)
+def _conversions(schema: Type[BaseModel]) -> Tuple[Tuple[str, int, object], ...]:
+    """(stored key, kind, target) of the fields needing conversion, once per schema"""
+    plan = []
+    for name, field in schema.model_fields.items():
+        kind, target = _classify(field.annotation)
+        if kind != _PLAIN:
+            plan.append((field.alias or name, kind, target))
+            if field.alias and field.alias != name:
+                plan.append((name, kind, target))
+    return tuple(plan)
+
+
+def trusted_construct(schema: Type[T], doc: dict) -> T:
+    """Build `schema` from a stored document without running validators."""
+    values = dict(doc)
+    for key, kind, target in _conversions(schema):
+        v = values.get(key)
+        if v is None:
+            continue
+        if kind == _STR:
+            if type(v) is ObjectId:
+                values[key] = str(v)
+        elif kind == _STR_LIST:
+            values[key] = [str(i) if type(i) is ObjectId else i for i in v]
+        elif kind == _ENUM:
+            if type(v) is not target:
+                values[key] = target(v)
+        elif kind == _MODEL:
+            if type(v) is not target:
+                values[key] = trusted_construct(target, v)
+        else:
+            values[key] = [i if type(i) is target else trusted_construct(target, i) for i in v]
+    return schema.model_construct(**values)
+
+
+def trusted_construct_many(schema: Type[T], docs: Iterable[dict]) -> List[T]:
+    """trusted_construct over a batch of stored documents."""
+    return [trusted_construct(schema, doc) for doc in docs]
+
+
+def to_validation_input(data: dict) -> dict:
+    """Copy of a write payload with ObjectIds as str, ready for strict validation."""
+    return {
+        k: str(v) if isinstance(v, ObjectId)
+        else [str(i) if isinstance(i, ObjectId) else i for i in v] if isinstance(v, list)
+        else v
+        for k, v in data.items()
+    }
@@ -8,9 +8,10 @@ from .transaction import Transaction
 from .api_key import APIKey
 from .sms_log import SMSLog
 from .pricing import Pricing
+from .usage import UsageMeter
 
 __all__ = [
     'User', 'Country', 'Service', 'PhoneNumber', 
     'Order', 'Project', 'Transaction', 'APIKey',
-    'SMSLog', 'Pricing'
+    'SMSLog', 'Pricing', 'UsageMeter'
 ]
\ No newline at end of file
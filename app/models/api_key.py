@@ -1,8 +1,9 @@
-from typing import Optional
+from typing import Optional, List
 from pydantic import BaseModel, Field
 from bson import ObjectId
 from app.config.database import db
-from datetime import datetime
+from app.models.usage import UsageMeter
+from datetime import datetime, timedelta
 
 class APIKeySchema(BaseModel):
     id: Optional[str] = Field(None, alias='_id')
@@ -53,3 +54,11 @@ class APIKey:
             {'$set': {'is_active': True}}
         )
         return result.modified_count > 0
+
+    @staticmethod
+    async def get_usage(api_key_id: str, days: int = 7) -> List[dict]:
+        """Hourly call counts of an API key over the last `days` days"""
+        return await UsageMeter.get_usage(
+            api_key_id=api_key_id,
+            since=datetime.now() - timedelta(days=days)
+        )
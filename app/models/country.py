@@ -15,11 +15,12 @@ Country Class (MongoDB Operations):
 create_country: Tạo country mới
 get_country_by_id: Lấy thông tin country bằng ID
 get_active_countries: Lấy danh sách các country đang active
+list_active_countries: Country active dạng CountryListItem (projection, service_count thay cho available_services)
 get_countries_by_service: Lấy các country có hỗ trợ service cụ thể
 update_country_status: Kích hoạt/vô hiệu hóa country
 add_service_to_country: Thêm service vào danh sách available services
 remove_service_from_country: Xóa service khỏi danh sách available services
-search_countries: Tìm kiếm country theo tên hoặc code
+search_countries: Tìm kiếm country theo tiền tố tên, code hoặc phone_code (chỉ dùng index trong bộ nhớ)
 Cách sử dụng cơ bản:
 
 # Tạo country mới
@@ -30,7 +31,7 @@ country_data = {
     "phone_code": "+84",
     "available_services": ["507f1f77bcf86cd799439011"]
 }
-country_id = Country.create_country(country_data)
+country_id = await Country.create_country(country_data)
 
 # Lấy danh sách country active
 active_countries = Country.get_active_countries()
@@ -47,6 +48,8 @@ from bson import ObjectId
 from pydantic import BaseModel, Field, validator
 from enum import Enum
 from app.config.database import db
+from app.services.country_index import country_index
+from app.services.page_context import page_context
 
 class CountrySchema(BaseModel):
     id: Optional[str] = Field(None, alias='_id')
@@ -76,13 +79,36 @@ class CountrySchema(BaseModel):
     def code_to_uppercase(cls, v):
         return v.upper()
 
+class CountryListItem:
+    """Compact row for country listings; available_services is reduced to its size"""
+    __slots__ = ('id', 'name', 'code', 'flag_icon', 'phone_code', 'service_count')
+
+    PROJECTION = {
+        'name': 1, 'code': 1, 'flag_icon': 1, 'phone_code': 1,
+        # Computed server side so the id array never leaves MongoDB
+        'service_count': {'$size': {'$ifNull': ['$available_services', []]}}
+    }
+
+    def __init__(self, doc: dict):
+        self.id = str(doc['_id'])
+        self.name = doc.get('name', '')
+        self.code = doc.get('code', '')
+        self.flag_icon = doc.get('flag_icon', '')
+        self.phone_code = doc.get('phone_code', '')
+        self.service_count = doc.get('service_count', 0)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
 class Country:
     collection = db['countries']
 
     @staticmethod
-    def create_country(country_data: dict) -> str:
+    async def create_country(country_data: dict) -> str:
         """Create a new country"""
-        result = Country.collection.insert_one(country_data)
+        result = await Country.collection.insert_one(country_data)
+        country_index.invalidate()
+        page_context.invalidate_catalog()
         return str(result.inserted_id)
 
     @staticmethod
@@ -99,6 +125,12 @@ class Country:
             countries.append(country)
         return countries
 
+    @staticmethod
+    async def list_active_countries() -> List[CountryListItem]:
+        """Projected rows of active countries, for page listings"""
+        cursor = Country.collection.find({'is_active': True}, CountryListItem.PROJECTION)
+        return [CountryListItem(doc) async for doc in cursor]
+
     @staticmethod
     def get_countries_by_service(service_id: str) -> List[dict]:
         """Get countries where a service is available"""
@@ -108,12 +140,14 @@ class Country:
         }))
 
     @staticmethod
-    def update_country_status(country_id: str, is_active: bool) -> bool:
+    async def update_country_status(country_id: str, is_active: bool) -> bool:
         """Activate/deactivate a country"""
-        result = Country.collection.update_one(
+        result = await Country.collection.update_one(
             {'_id': ObjectId(country_id)},
             {'$set': {'is_active': is_active}}
         )
+        country_index.invalidate()
+        page_context.invalidate_catalog()
         return result.modified_count > 0
 
     @staticmethod
@@ -136,11 +170,8 @@ class Country:
 
     @staticmethod
     def search_countries(query: str, limit: int = 10) -> List[dict]:
-        """Search countries by name or code"""
-        return list(Country.collection.find({
-            '$or': [
-                {'name': {'$regex': query, '$options': 'i'}},
-                {'code': {'$regex': query, '$options': 'i'}}
-            ],
-            'is_active': True
-        }).limit(limit))
\ No newline at end of file
+        """Search active countries by name, code or phone code prefix
+
+        Served from the in-memory country index, never from the database.
+        """
+        return country_index.search(query, limit)
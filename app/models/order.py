@@ -16,9 +16,12 @@ get_order_by_id: Lấy thông tin đơn hàng bằng ID
 update_order_status: Cập nhật trạng thái đơn hàng
 set_verification_code: Thiết lập mã xác thực
 get_active_orders_by_user: Lấy đơn hàng active của người dùng
+get_user_orders: Lịch sử đơn hàng, phân trang bằng cursor (created_at, _id)
 get_completed_orders_by_service: Lấy đơn hàng đã hoàn thành theo dịch vụ
 get_orders_by_phone_number: Lấy đơn hàng theo số điện thoại
 expire_pending_orders: Đánh dấu đơn hàng pending quá hạn là failed
+archive_finished_orders: Chuyển đơn completed/failed cũ sang orders_archive (get_order_by_id
+                         và get_user_orders vẫn đọc được dữ liệu đã lưu trữ)
 Cách sử dụng cơ bản:
 
 # Tạo đơn hàng mới
@@ -42,12 +45,14 @@ Order.set_verification_code(order_id, "123456")
 active_orders = Order.get_active_orders_by_user("507f1f77bcf86cd799439011")
 '''
 
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from bson import ObjectId
 from pydantic import BaseModel, Field, validator
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 from app.config.database import db
+from app.core.pagination import fetch_page_merged
+from app.services.archiver import move_to_archive
 
 class OrderStatus(str, Enum):
     PENDING = 'pending'
@@ -94,8 +99,19 @@ class OrderSchema(BaseModel):
             raise ValueError('Verification code must contain only digits')
         return v
 
+FINISHED_STATUSES = [OrderStatus.COMPLETED.value, OrderStatus.FAILED.value]
+
 class Order:
     collection = db['orders']
+    archive_collection = db['orders_archive']
+
+    @staticmethod
+    async def ensure_indexes() -> None:
+        """Create the indexes used by the background sweeper"""
+        await Order.collection.create_index([('status', 1), ('created_at', 1)])
+        # Order history: (created_at, _id) keyset per user, on both collections
+        for collection in (Order.collection, Order.archive_collection):
+            await collection.create_index([('user_id', 1), ('created_at', -1), ('_id', -1)])
 
     @staticmethod
     def create_order(order_data: dict) -> str:
@@ -106,9 +122,13 @@ class Order:
         return str(result.inserted_id)
 
     @staticmethod
-    def get_order_by_id(order_id: str) -> Optional[dict]:
-        """Get order by ID"""
-        return Order.collection.find_one({'_id': ObjectId(order_id)})
+    async def get_order_by_id(order_id: str) -> Optional[dict]:
+        """Get order by ID (archived orders included)"""
+        query = {'_id': ObjectId(order_id)}
+        order = await Order.collection.find_one(query)
+        if order is None:
+            order = await Order.archive_collection.find_one(query)
+        return order
 
     @staticmethod
     def update_order_status(order_id: str, status: OrderStatus) -> bool:
@@ -149,6 +169,25 @@ class Order:
             'status': {'$in': [OrderStatus.PENDING.value, OrderStatus.ACTIVE.value]}
         }))
 
+    @staticmethod
+    async def get_user_orders(
+        user_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        status: Optional[OrderStatus] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get a page of a user's order history, newest first
+
+        Pass the returned cursor to get the next page; it is None on the
+        last page. Archived orders are merged in.
+        """
+        query = {'user_id': ObjectId(user_id)}
+        if status:
+            query['status'] = status.value
+        return await fetch_page_merged(
+            [Order.collection, Order.archive_collection], query, 'created_at', limit, cursor
+        )
+
     @staticmethod
     def get_completed_orders_by_service(service_id: str, limit: int = 100) -> List[dict]:
         """Get completed orders for a service"""
@@ -165,20 +204,54 @@ class Order:
         }).sort('start_time', -1))
 
     @staticmethod
-    def expire_pending_orders(hours: int = 1) -> int:
-        """Mark pending orders older than X hours as failed"""
+    async def expire_pending_orders(hours: int = 1, batch_size: int = 500) -> int:
+        """Mark pending orders older than X hours as failed
+
+        Works in batches of `batch_size` ids (oldest first, served by the
+        status+created_at index) so a large backlog never turns into one
+        unbounded update.
+        """
         cutoff_time = datetime.now() - timedelta(hours=hours)
-        result = Order.collection.update_many(
+        stale = {
+            'status': OrderStatus.PENDING.value,
+            'created_at': {'$lt': cutoff_time}
+        }
+        modified = 0
+        while True:
+            cursor = Order.collection.find(stale, {'_id': 1}).sort('created_at', 1).limit(batch_size)
+            ids = [doc['_id'] async for doc in cursor]
+            if not ids:
+                break
+            result = await Order.collection.update_many(
+                {'_id': {'$in': ids}, 'status': OrderStatus.PENDING.value},
+                {
+                    '$set': {
+                        'status': OrderStatus.FAILED.value,
+                        'updated_at': datetime.now(),
+                        'end_time': datetime.now()
+                    }
+                }
+            )
+            modified += result.modified_count
+            if len(ids) < batch_size:
+                break
+        return modified
+
+    @staticmethod
+    async def archive_finished_orders(
+        days: int = 90,
+        batch_size: int = 1000,
+        max_batches: Optional[int] = None
+    ) -> int:
+        """Move completed/failed orders older than X days to orders_archive"""
+        return await move_to_archive(
+            Order.collection,
+            Order.archive_collection,
             {
-                'status': OrderStatus.PENDING.value,
-                'created_at': {'$lt': cutoff_time}
+                'status': {'$in': FINISHED_STATUSES},
+                'created_at': {'$lt': datetime.now() - timedelta(days=days)}
             },
-            {
-                '$set': {
-                    'status': OrderStatus.FAILED.value,
-                    'updated_at': datetime.now(),
-                    'end_time': datetime.now()
-                }
-            }
+            sort_field='created_at',
+            batch_size=batch_size,
+            max_batches=max_batches
         )
-        return result.modified_count
\ No newline at end of file
@@ -16,10 +16,11 @@ Giá trị mặc định hợp lý cho các trường
 PhoneNumber Class (MongoDB Operations):
 
 create_phone_number: Tạo bản ghi số điện thoại mới
-get_available_number: Lấy số điện thoại khả dụng
+get_available_number: Lấy số điện thoại khả dụng (qua NumberAllocator, không tranh chấp)
 assign_to_user: Gán số cho người dùng
 release_number: Giải phóng số (khi không dùng nữa)
-add_sms_message: Thêm tin nhắn vào lịch sử SMS
+add_sms_message: Lưu tin nhắn vào SMSLog (bucket theo giờ), chỉ cập nhật bộ đếm trên số
+get_sms_messages: Đọc tin nhắn đã nhận, có giới hạn và phân trang
 extend_expiration: Gia hạn thời gian sử dụng số
 get_numbers_by_user: Lấy tất cả số của người dùng
 update_number_status: Cập nhật trạng thái số
@@ -35,7 +36,7 @@ phone_data = {
 phone_id = PhoneNumber.create_phone_number(phone_data)
 
 # Lấy số khả dụng
-available_number = PhoneNumber.get_available_number(
+available_number = await PhoneNumber.get_available_number(
     service_id="507f1f77bcf86cd799439012",
     country_id="507f1f77bcf86cd799439011"
 )
@@ -44,18 +45,23 @@ available_number = PhoneNumber.get_available_number(
 PhoneNumber.assign_to_user(phone_id, "507f1f77bcf86cd799439013")
 
 # Thêm tin nhắn nhận được
-PhoneNumber.add_sms_message(phone_id, {
+await PhoneNumber.add_sms_message(phone_id, {
     "content": "Your code is 123456",
     "from": "+1987654321"
 })
 
+# Đọc 20 tin nhắn mới nhất
+messages, cursor = await PhoneNumber.get_sms_messages(phone_id, limit=20)
+
 '''
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+import random
 from bson import ObjectId
 from pydantic import BaseModel, Field, validator
 from datetime import datetime, timedelta
 from app.config.database import db
+from app.models.sms_log import SMSLog
 from enum import Enum
 
 class SMSMessage(BaseModel):
@@ -87,7 +93,11 @@ class PhoneNumberSchema(BaseModel):
         default_factory=lambda: datetime.now() + timedelta(days=30)
     )
     last_used: Optional[datetime] = None
-    sms_received: List[SMSMessage] = Field(default_factory=list)
+    # Random sort key so concurrent buyers start allocating at different numbers
+    alloc_key: float = Field(default_factory=random.random, ge=0, lt=1)
+    # Received SMS live in SMSLog buckets; only a summary is kept here
+    sms_count: int = Field(default=0, ge=0)
+    last_sms_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
 
@@ -103,11 +113,8 @@ class PhoneNumberSchema(BaseModel):
                 "service_id": "507f1f77bcf86cd799439012",
                 "provider": "Twilio",
                 "status": "active",
-                "sms_received": [{
-                    "content": "Your verification code is 123456",
-                    "from": "+1987654321",
-                    "timestamp": "2023-01-01T12:00:00Z"
-                }]
+                "sms_count": 1,
+                "last_sms_at": "2023-01-01T12:00:00Z"
             }
         }
 
@@ -121,33 +128,29 @@ class PhoneNumberSchema(BaseModel):
 class PhoneNumber:
     collection = db['phone_numbers']
 
+    @staticmethod
+    async def ensure_indexes() -> None:
+        """Create the index used by number allocation"""
+        await PhoneNumber.collection.create_index([
+            ('service_id', 1), ('country_id', 1), ('is_used', 1),
+            ('status', 1), ('alloc_key', 1)
+        ])
+        await PhoneNumber.collection.create_index('lease_owner', sparse=True)
+
     @staticmethod
     def create_phone_number(phone_data: dict) -> str:
         """Create a new phone number record"""
         phone_data['created_at'] = datetime.now()
         phone_data['updated_at'] = datetime.now()
+        phone_data.setdefault('alloc_key', random.random())
         result = PhoneNumber.collection.insert_one(phone_data)
         return str(result.inserted_id)
 
     @staticmethod
-    def get_available_number(service_id: str, country_id: str) -> Optional[dict]:
+    async def get_available_number(service_id: str, country_id: str) -> Optional[dict]:
         """Get an available phone number for the service and country"""
-        return PhoneNumber.collection.find_one_and_update(
-            {
-                'service_id': ObjectId(service_id),
-                'country_id': ObjectId(country_id),
-                'is_used': False,
-                'status': PhoneNumberStatus.ACTIVE.value,
-                'expiration_time': {'$gt': datetime.now()}
-            },
-            {
-                '$set': {
-                    'is_used': True,
-                    'updated_at': datetime.now()
-                }
-            },
-            return_document=True
-        )
+        from app.services.number_allocator import number_allocator
+        return await number_allocator.allocate(service_id, country_id)
 
     @staticmethod
     def assign_to_user(number_id: str, user_id: str) -> bool:
@@ -184,17 +187,46 @@ class PhoneNumber:
         return result.modified_count > 0
 
     @staticmethod
-    def add_sms_message(number_id: str, message_data: dict) -> bool:
-        """Add a received SMS message to the phone number's history"""
+    async def add_sms_message(number_id: str, message_data: dict) -> bool:
+        """Add a received SMS message to the phone number's history
+
+        The message is appended to the SMSLog bucket store; the phone number
+        document only keeps a counter and the last received time.
+        """
         message_data['timestamp'] = datetime.now()
-        result = PhoneNumber.collection.update_one(
+        phone = await PhoneNumber.collection.find_one(
             {'_id': ObjectId(number_id)},
+            {'number': 1}
+        )
+        if not phone:
+            return False
+        # Store the message first: a failed append must not leave sms_count ahead
+        if not await SMSLog.append_message(phone['number'], message_data):
+            return False
+        await PhoneNumber.collection.update_one(
+            {'_id': phone['_id']},
             {
-                '$push': {'sms_received': message_data},
+                '$inc': {'sms_count': 1},
+                '$max': {'last_sms_at': message_data['timestamp']},
                 '$set': {'updated_at': datetime.now()}
             }
         )
-        return result.modified_count > 0
+        return True
+
+    @staticmethod
+    async def get_sms_messages(
+        number_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get received SMS messages of a phone number, newest first"""
+        phone = await PhoneNumber.collection.find_one(
+            {'_id': ObjectId(number_id)},
+            {'number': 1}
+        )
+        if not phone:
+            return [], None
+        return await SMSLog.get_messages(phone['number'], limit=limit, cursor=cursor)
 
     @staticmethod
     def extend_expiration(number_id: str, days: int = 7) -> bool:
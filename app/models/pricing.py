@@ -20,6 +20,9 @@ add_bulk_discount: Adds new discount tier
 get_price_for_quantity: Calculates best price for given quantity
 get_prices_by_service/country: Gets all pricing for service or country
 sync_base_prices: Updates base prices across all entries for a service
+                  (pipeline update through app.services.repricer)
+get_cached_pricing / invalidate_prices: Short-TTL in-process cache of
+                  pricing rows used by get_price_for_quantity
 Example Usage:
 
 # Create pricing entry
@@ -36,21 +39,21 @@ pricing_data = {
 pricing_id = Pricing.create_pricing(pricing_data)
 
 # Get price for quantity
-best_price = Pricing.get_price_for_quantity(
+best_price = await Pricing.get_price_for_quantity(
     country_id="507f1f77bcf86cd799439011",
     service_id="507f1f77bcf86cd799439012",
     quantity=150
 )  # Returns 0.08
 
 # Update current price
-Pricing.update_current_price(
+await Pricing.update_current_price(
     country_id="507f1f77bcf86cd799439011",
     service_id="507f1f77bcf86cd799439012",
     new_price=0.12
 )
 
 # Add bulk discount
-Pricing.add_bulk_discount(
+await Pricing.add_bulk_discount(
     country_id="507f1f77bcf86cd799439011",
     service_id="507f1f77bcf86cd799439012",
     discount={"min_quantity": 1000, "price_per": 0.05}
@@ -58,11 +61,17 @@ Pricing.add_bulk_discount(
 '''
 
 
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
+import time
 from bson import ObjectId
 from pydantic import BaseModel, Field, validator
 from datetime import datetime
 from app.config.database import db
+from app.config.settings import settings
+
+# (country_id, service_id) -> (expires at, pricing row or None)
+_price_cache: Dict[Tuple[str, str], Tuple[float, Optional[dict]]] = {}
+PRICE_CACHE_MAX_ENTRIES = 50000
 
 class BulkDiscount(BaseModel):
     min_quantity: int = Field(..., gt=0)
@@ -125,6 +134,12 @@ class PricingSchema(BaseModel):
 class Pricing:
     collection = db['pricing']
 
+    @staticmethod
+    async def ensure_indexes() -> None:
+        """Pair lookups and service-/country-wide repricing"""
+        await Pricing.collection.create_index([('country_id', 1), ('service_id', 1)])
+        await Pricing.collection.create_index('service_id')
+
     @staticmethod
     def create_pricing(pricing_data: dict) -> str:
         """Create new pricing entry"""
@@ -141,19 +156,21 @@ class Pricing:
         })
 
     @staticmethod
-    def update_pricing(pricing_id: str, update_data: dict) -> bool:
+    async def update_pricing(pricing_id: str, update_data: dict) -> bool:
         """Update pricing information"""
         update_data['last_updated'] = datetime.now()
-        result = Pricing.collection.update_one(
+        result = await Pricing.collection.update_one(
             {'_id': ObjectId(pricing_id)},
             {'$set': update_data}
         )
+        # The row may have changed its pair, drop everything
+        Pricing.invalidate_prices()
         return result.modified_count > 0
 
     @staticmethod
-    def update_current_price(country_id: str, service_id: str, new_price: float) -> bool:
+    async def update_current_price(country_id: str, service_id: str, new_price: float) -> bool:
         """Update current price for a pricing entry"""
-        result = Pricing.collection.update_one(
+        result = await Pricing.collection.update_one(
             {
                 'country_id': ObjectId(country_id),
                 'service_id': ObjectId(service_id)
@@ -165,12 +182,13 @@ class Pricing:
                 }
             }
         )
+        Pricing.invalidate_prices(service_id, country_id)
         return result.modified_count > 0
 
     @staticmethod
-    def add_bulk_discount(country_id: str, service_id: str, discount: dict) -> bool:
+    async def add_bulk_discount(country_id: str, service_id: str, discount: dict) -> bool:
         """Add a new bulk discount tier"""
-        result = Pricing.collection.update_one(
+        result = await Pricing.collection.update_one(
             {
                 'country_id': ObjectId(country_id),
                 'service_id': ObjectId(service_id)
@@ -180,15 +198,41 @@ class Pricing:
                 '$set': {'last_updated': datetime.now()}
             }
         )
+        Pricing.invalidate_prices(service_id, country_id)
         return result.modified_count > 0
 
     @staticmethod
-    def get_price_for_quantity(country_id: str, service_id: str, quantity: int) -> Optional[float]:
-        """Get the best available price for a given quantity"""
-        pricing = Pricing.collection.find_one({
+    async def get_cached_pricing(country_id: str, service_id: str) -> Optional[dict]:
+        """Pricing row for a pair, cached for price_cache_ttl_seconds"""
+        key = (str(country_id), str(service_id))
+        now = time.monotonic()
+        entry = _price_cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+        pricing = await Pricing.collection.find_one({
             'country_id': ObjectId(country_id),
             'service_id': ObjectId(service_id)
         })
+        if len(_price_cache) >= PRICE_CACHE_MAX_ENTRIES:
+            _price_cache.clear()
+        _price_cache[key] = (now + settings.price_cache_ttl_seconds, pricing)
+        return pricing
+
+    @staticmethod
+    def invalidate_prices(service_id: Optional[str] = None, country_id: Optional[str] = None) -> None:
+        """Drop cached rows of a service, a country, a pair, or everything"""
+        if not service_id and not country_id:
+            _price_cache.clear()
+            return
+        for key in list(_price_cache):
+            if ((not country_id or key[0] == str(country_id))
+                    and (not service_id or key[1] == str(service_id))):
+                _price_cache.pop(key, None)
+
+    @staticmethod
+    async def get_price_for_quantity(country_id: str, service_id: str, quantity: int) -> Optional[float]:
+        """Get the best available price for a given quantity"""
+        pricing = await Pricing.get_cached_pricing(country_id, service_id)
         
         if not pricing:
             return None
@@ -216,19 +260,9 @@ class Pricing:
         }))
 
     @staticmethod
-    def sync_base_prices(service_id: str, new_base_price: float) -> int:
-        """Update base prices for all entries of a service"""
-        result = Pricing.collection.update_many(
-            {
-                'service_id': ObjectId(service_id),
-                'base_price': {'$ne': new_base_price}
-            },
-            {
-                '$set': {
-                    'base_price': new_base_price,
-                    'current_price': {'$max': ['$current_price', new_base_price]},
-                    'last_updated': datetime.now()
-                }
-            }
-        )
-        return result.modified_count
\ No newline at end of file
+    async def sync_base_prices(service_id: str, new_base_price: float) -> int:
+        """Update base prices for all entries of a service
+        (current_price is raised to the new base price where it is lower)"""
+        from app.services.repricer import PriceChange, repricer
+        report = await repricer.apply([PriceChange(service_id=service_id, base_price=new_base_price)])
+        return report['modified']
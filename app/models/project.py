@@ -3,7 +3,9 @@ Key features of this implementation:
 
 ProjectSchema:
 
-Validates project name (disallows special characters)
+Validates project name (disallows special characters) on writes;
+documents read back from MongoDB are built with trusted_construct
+(no re-validation)
 Ensures area code is 3-4 digits if provided
 Sets default values for created_at, api_calls, and updated_at
 Includes example schema for documentation
@@ -13,10 +15,11 @@ create_project: Creates new project with timestamps
 get_project_by_id: Retrieves single project
 get_user_projects: Gets all projects for a user (sorted by creation date)
 update_project: General update method for project details
-increment_api_calls: Tracks API usage per project
+increment_api_calls: Tracks API usage per project (buffered, flushed with bulk_write)
+                     and meters it into hourly/daily UsageMeter buckets
 set_default_service/country: Specialized setters for common updates
 delete_project: Removes project permanently
-search_projects: Full-text search within user's projects
+search_projects: Prefix search within user's projects, ranked by relevance
 Usage Examples:
 # Create a new project
 project_data = {
@@ -35,13 +38,22 @@ Project.set_default_service(project_id, "607f1f77bcf86cd799439014")
 
 # Track API usage
 Project.increment_api_calls(project_id)
+
+# Search ("verif" matches "User Verification")
+results = await Project.search_projects("507f1f77bcf86cd799439011", "verif")
 '''
 
 from typing import Optional, List
+import re
 from bson import ObjectId
 from pydantic import BaseModel, Field, validator
 from datetime import datetime
+from pymongo import UpdateOne
 from app.config.database import db
+from app.core.trusted import trusted_construct, to_validation_input
+from app.models.usage import UsageMeter
+from app.services.counter_buffer import CounterBuffer
+from app.services.page_context import page_context
 
 class ProjectSchema(BaseModel):
     id: Optional[str] = Field(None, alias='_id')
@@ -77,11 +89,44 @@ class ProjectSchema(BaseModel):
             raise ValueError('Project name contains invalid characters')
         return v
 
+# Search keys are edge n-grams of each word: "verify" -> ve, ver, veri, verif, verify
+SEARCH_MIN_PREFIX = 2
+SEARCH_MAX_PREFIX = 15
+
+def search_tokens(text: str) -> List[str]:
+    """Split text into lowercase words usable as search terms"""
+    return [
+        w[:SEARCH_MAX_PREFIX]
+        for w in re.findall(r'\w+', (text or '').lower())
+        if len(w) >= SEARCH_MIN_PREFIX
+    ]
+
+def search_prefixes(text: str) -> List[str]:
+    """All indexed prefixes of the words of a text"""
+    prefixes = set()
+    for word in search_tokens(text):
+        for i in range(SEARCH_MIN_PREFIX, len(word) + 1):
+            prefixes.add(word[:i])
+    return sorted(prefixes)
+
+def search_fields(name: str, description: str) -> dict:
+    """Search keys stored alongside a project, rebuilt on every write"""
+    name_keys = search_prefixes(name)
+    return {
+        'search_name_keys': name_keys,
+        'search_keys': sorted(set(name_keys) | set(search_prefixes(description)))
+    }
+
 class Project:
     collection = db['projects']
 
     @staticmethod
-    def create_project(project_data: dict) -> ProjectSchema:
+    async def ensure_indexes() -> None:
+        """Create the index used by search_projects"""
+        await Project.collection.create_index([('user_id', 1), ('search_keys', 1)])
+
+    @staticmethod
+    async def create_project(project_data: dict) -> ProjectSchema:
         """Create a new project and return the created project
         Args:
             project_data: Dictionary containing project data
@@ -90,12 +135,17 @@ class Project:
         """
         project_data['created_at'] = datetime.now()
         project_data['updated_at'] = datetime.now()
-        result = Project.collection.insert_one(project_data)
-        created_project = Project.collection.find_one({'_id': result.inserted_id})
-        return ProjectSchema(**created_project)
+        # Strict validation happens here, on the way in; reads trust the data
+        ProjectSchema(**to_validation_input(project_data))
+        project_data.update(search_fields(
+            project_data.get('name', ''), project_data.get('description', '')
+        ))
+        result = await Project.collection.insert_one(project_data)
+        page_context.invalidate_user(project_data['user_id'])
+        return trusted_construct(ProjectSchema, {**project_data, '_id': result.inserted_id})
 
     @staticmethod
-    def get_project_by_id(project_id: str) -> Optional[ProjectSchema]:
+    async def get_project_by_id(project_id: str) -> Optional[ProjectSchema]:
         """Get project by ID
         Args:
             project_id: The project's MongoDB ObjectId as string
@@ -105,8 +155,8 @@ class Project:
             ValueError: If project_id is invalid
         """
         try:
-            project = Project.collection.find_one({'_id': ObjectId(project_id)})
-            return ProjectSchema(**project) if project else None
+            project = await Project.collection.find_one({'_id': ObjectId(project_id)})
+            return trusted_construct(ProjectSchema, project) if project else None
         except Exception as e:
             raise ValueError(f"Invalid project ID: {project_id}") from e
 
@@ -126,32 +176,47 @@ class Project:
             ).sort('created_at', -1)
             projects = []
             async for p in cursor:
-                projects.append(ProjectSchema(**p))
+                projects.append(trusted_construct(ProjectSchema, p))
             return projects
         except Exception as e:
             raise ValueError(f"Invalid user ID: {user_id}") from e
 
     @staticmethod
-    def update_project(project_id: str, update_data: dict) -> bool:
+    async def update_project(project_id: str, update_data: dict) -> bool:
         """Update project information"""
         update_data['updated_at'] = datetime.now()
-        result = Project.collection.update_one(
+        if 'name' in update_data or 'description' in update_data:
+            # Search keys cover both fields, so fetch whichever is not changing
+            current = await Project.collection.find_one(
+                {'_id': ObjectId(project_id)},
+                {'name': 1, 'description': 1}
+            ) or {}
+            update_data.update(search_fields(
+                update_data.get('name', current.get('name', '')),
+                update_data.get('description', current.get('description', ''))
+            ))
+        project = await Project.collection.find_one_and_update(
             {'_id': ObjectId(project_id)},
-            {'$set': update_data}
+            {'$set': update_data},
+            projection={'user_id': 1}
         )
-        return result.modified_count > 0
+        if not project:
+            return False
+        # The owner's pages show the project name
+        page_context.invalidate_user(project['user_id'])
+        return True
 
     @staticmethod
-    def increment_api_calls(project_id: str, increment: int = 1) -> bool:
-        """Increment the API call counter for a project"""
-        result = Project.collection.update_one(
-            {'_id': ObjectId(project_id)},
-            {
-                '$inc': {'api_calls': increment},
-                '$set': {'updated_at': datetime.now()}
-            }
-        )
-        return result.modified_count > 0
+    def increment_api_calls(project_id: str, increment: int = 1, api_key_id: Optional[str] = None) -> bool:
+        """Increment the API call counter for a project
+
+        Increments are merged in memory and flushed in batches, so the
+        stored counter may lag by up to counter_flush_interval_ms. The
+        calls are also metered per hour/day for the project and API key.
+        """
+        api_calls_counter.add({'_id': ObjectId(project_id)}, {'api_calls': increment})
+        UsageMeter.record(project_id, api_key_id=api_key_id, calls=increment)
+        return True
 
     @staticmethod
     def set_default_service(project_id: str, service_id: str) -> bool:
@@ -182,31 +247,76 @@ class Project:
         return result.modified_count > 0
 
     @staticmethod
-    def delete_project(project_id: str) -> bool:
+    async def delete_project(project_id: str) -> bool:
         """Delete a project"""
-        result = Project.collection.delete_one({'_id': ObjectId(project_id)})
-        return result.deleted_count > 0
+        project = await Project.collection.find_one_and_delete(
+            {'_id': ObjectId(project_id)},
+            projection={'user_id': 1}
+        )
+        if not project:
+            return False
+        page_context.invalidate_user(project['user_id'])
+        return True
 
     @staticmethod
-    def search_projects(user_id: str, query: str, limit: int = 10) -> List[ProjectSchema]:
-        """Search projects by name or description with pagination
-        Args:
-            user_id: The user's MongoDB ObjectId as string
-            query: Search term
-            limit: Maximum number of results to return
-        Returns:
-            List of matching ProjectSchema objects
+    def search_pipeline(user_id: ObjectId, query: str, limit: int) -> List[dict]:
+        """Aggregation used by search_projects; empty when the query has no terms
+
+        Matching uses the (user_id, search_keys) index; sorting happens
+        before $limit so the best `limit` matches are returned.
         """
-        pipeline = [
+        terms = sorted(set(search_tokens(query)))
+        if not terms:
+            return []
+        return [
             {'$match': {
-                'user_id': ObjectId(user_id),
-                '$or': [
-                    {'name': {'$regex': query, '$options': 'i'}},
-                    {'description': {'$regex': query, '$options': 'i'}}
-                ]
+                'user_id': user_id,
+                'search_keys': {'$all': terms}
+            }},
+            {'$addFields': {
+                '_score': {'$size': {'$setIntersection': ['$search_name_keys', terms]}}
             }},
+            {'$sort': {'_score': -1, 'created_at': -1, '_id': -1}},
             {'$limit': limit},
-            {'$sort': {'created_at': -1}}
+            {'$project': {'_score': 0, 'search_keys': 0, 'search_name_keys': 0}}
         ]
-        results = Project.collection.aggregate(pipeline)
-        return [ProjectSchema(**doc) for doc in results]
+
+    @staticmethod
+    async def search_projects(user_id: str, query: str, limit: int = 10) -> List[ProjectSchema]:
+        """Search projects by name or description prefix, best matches first
+        Args:
+            user_id: The user's MongoDB ObjectId as string
+            query: Search term; every word must prefix-match a word of the
+                   project's name or description
+            limit: Maximum number of results to return
+        Returns:
+            List of matching ProjectSchema objects, ranked by how many query
+            words hit the name, then newest first
+        """
+        pipeline = Project.search_pipeline(ObjectId(user_id), query, limit)
+        if not pipeline:
+            return []
+        return [trusted_construct(ProjectSchema, doc) async for doc in Project.collection.aggregate(pipeline)]
+
+    @staticmethod
+    async def backfill_search_keys(batch_size: int = 1000) -> int:
+        """Build search keys for projects created before search indexing"""
+        updated = 0
+        batch = []
+        cursor = Project.collection.find(
+            {'search_keys': {'$exists': False}},
+            {'name': 1, 'description': 1}
+        )
+        async for doc in cursor:
+            batch.append(UpdateOne(
+                {'_id': doc['_id']},
+                {'$set': search_fields(doc.get('name', ''), doc.get('description', ''))}
+            ))
+            if len(batch) >= batch_size:
+                updated += (await Project.collection.bulk_write(batch, ordered=False)).modified_count
+                batch = []
+        if batch:
+            updated += (await Project.collection.bulk_write(batch, ordered=False)).modified_count
+        return updated
+
+api_calls_counter = CounterBuffer('project_api_calls', lambda: Project.collection, touch_field='updated_at')
@@ -15,12 +15,13 @@ Service Class (MongoDB Operations):
 create_service: Tạo service mới
 get_service_by_id: Lấy thông tin service bằng ID
 get_popular_services: Lấy các service phổ biến nhất
+list_services: Danh sách service dạng ServiceListItem (projection, chỉ các trường hiển thị)
 get_services_by_country: Lấy các service có sẵn tại country cụ thể
 update_service_prices: Cập nhật giá cả (kiểm tra base_price)
 add_country_to_service: Thêm country vào danh sách available_countries
 remove_country_from_service: Xóa country khỏi danh sách available_countries
-update_success_rate: Cập nhật tỷ lệ thành công (thống kê)
-increment_popularity: Tăng độ phổ biến của service
+update_success_rate: Ghi nhận kết quả vào ServiceStatsEngine (cửa sổ trượt, ghi DB định kỳ bằng bulk_write)
+increment_popularity: Tăng độ phổ biến của service (gộp qua CounterBuffer, ghi bằng bulk_write)
 Cách sử dụng cơ bản:
 
 # Tạo service mới
@@ -48,6 +49,8 @@ from typing import Optional, Dict, Any, List
 from bson import ObjectId
 from pydantic import BaseModel, Field, validator
 from app.config.database import db
+from app.services.counter_buffer import CounterBuffer
+from app.services.service_stats import service_stats
 from datetime import datetime
 
 class ServiceSchema(BaseModel):
@@ -58,6 +61,10 @@ class ServiceSchema(BaseModel):
     current_price: float = Field(..., gt=0, description="Current price in USD")
     available_countries: List[str] = Field(default_factory=list)
     success_rate: float = Field(default=0.0, ge=0, le=1)
+    # Seconds from number purchase to code, over the stats window
+    time_to_code_p50: Optional[float] = None
+    time_to_code_p90: Optional[float] = None
+    time_to_code_p99: Optional[float] = None
     popularity: float = Field(default=0.0, ge=0)
     is_free_allowed: bool = Field(default=False)
     free_daily_limit: int = Field(default=0, ge=0)
@@ -88,6 +95,30 @@ class ServiceSchema(BaseModel):
             raise ValueError('Current price cannot be less than base price')
         return v
 
+class ServiceListItem:
+    """Compact row for service listings (page templates, /api/services)"""
+    __slots__ = ('id', 'name', 'icon', 'current_price', 'success_rate', 'popularity')
+
+    # Only these fields leave MongoDB; available_countries can be thousands of ids
+    PROJECTION = {'name': 1, 'icon': 1, 'current_price': 1, 'success_rate': 1, 'popularity': 1}
+
+    def __init__(self, doc: dict):
+        self.id = str(doc['_id'])
+        self.name = doc.get('name', 'Unknown Service')
+        self.icon = doc.get('icon')
+        self.current_price = doc.get('current_price', 0)
+        self.success_rate = doc.get('success_rate', 0.9)
+        self.popularity = doc.get('popularity', 0)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+SERVICE_SORTS = {
+    'popularity': ('popularity', -1),
+    'price_asc': ('current_price', 1),
+    'price_desc': ('current_price', -1)
+}
+
 class Service:
     collection = db['services']
 
@@ -109,6 +140,15 @@ class Service:
                      .sort('popularity', -1)
                      .limit(limit))
 
+    @staticmethod
+    async def list_services(sort_by: str = 'popularity', limit: int = 0) -> List[ServiceListItem]:
+        """Projected service rows, sorted by popularity or price"""
+        field, direction = SERVICE_SORTS.get(sort_by, SERVICE_SORTS['popularity'])
+        cursor = Service.collection.find({}, ServiceListItem.PROJECTION).sort(field, direction)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [ServiceListItem(doc) async for doc in cursor]
+
     @staticmethod
     def get_services_by_country(country_id: str) -> List[dict]:
         """Get services available in a specific country"""
@@ -156,27 +196,24 @@ class Service:
         return result.modified_count > 0
 
     @staticmethod
-    def update_success_rate(service_id: str, success: bool) -> bool:
-        """Update service success rate (call when a service is used)"""
-        # This would typically be more sophisticated in production
-        # with proper statistical calculations
-        service = Service.get_service_by_id(service_id)
-        if not service:
-            return False
-
-        new_success_rate = ((service['success_rate'] * 100) + (1 if success else 0)) / 101
-
-        result = Service.collection.update_one(
-            {'_id': ObjectId(service_id)},
-            {'$set': {'success_rate': new_success_rate}}
-        )
-        return result.modified_count > 0
+    def update_success_rate(
+        service_id: str,
+        success: bool,
+        country_id: Optional[str] = None,
+        time_to_code: Optional[float] = None
+    ) -> bool:
+        """Record a service outcome (call when a service is used)
+
+        Counted in memory over a rolling window; success_rate and the
+        time-to-code percentiles are written back periodically.
+        """
+        service_stats.record(service_id, country_id, success, time_to_code)
+        return True
 
     @staticmethod
     def increment_popularity(service_id: str, increment: float = 0.1) -> bool:
-        """Increase service popularity"""
-        result = Service.collection.update_one(
-            {'_id': ObjectId(service_id)},
-            {'$inc': {'popularity': increment}}
-        )
-        return result.modified_count > 0
\ No newline at end of file
+        """Increase service popularity (buffered, written in batches)"""
+        popularity_counter.add({'_id': ObjectId(service_id)}, {'popularity': increment})
+        return True
+
+popularity_counter = CounterBuffer('service_popularity', lambda: Service.collection)
@@ -1,8 +1,57 @@
-from typing import Optional
+'''
+Key features of this implementation:
+
+SMSLogSchema:
+
+Single received SMS as exposed to the rest of the app
+SMSLogBucketSchema:
+
+Time-bucketed document holding up to SMS_BUCKET_SIZE messages of one
+phone number for one hour; a full bucket rolls over to a new document
+SMSLog Class Methods:
+
+create_sms_log: Logs a single SMS (per-row collection)
+append_message: Appends a received SMS to the number's current bucket
+get_messages: Newest-first, capped and paginated read across buckets
+get_sms_logs_by_phone_number: Latest SMS logs of a phone number (streamed, limited)
+ensure_indexes: Creates the lookup indexes and the TTL indexes
+apply_retention: Sets expires_at on documents written before retention existed
+
+Retention:
+
+Every bucket and per-row log carries an expires_at date (bucket end +
+settings.sms_log_retention_days) and a TTL index removes it after that
+date, so old SMS are dropped by MongoDB without a cleanup job. A new
+retention setting applies to documents written afterwards; run
+scripts/apply_sms_retention.py --recompute to re-date existing ones.
+
+Example Usage:
+
+# Store a received SMS
+await SMSLog.append_message("+85512345678", {
+    "content": "Your code is 123456",
+    "from": "+1987654321"
+})
+
+# First page, then the next one using the returned cursor
+messages, cursor = await SMSLog.get_messages("+85512345678", limit=20)
+older, cursor = await SMSLog.get_messages("+85512345678", limit=20, cursor=cursor)
+'''
+import base64
+import json
+from typing import Optional, List, Tuple
 from pydantic import BaseModel, Field
 from bson import ObjectId
 from app.config.database import db
-from datetime import datetime
+from app.config.settings import settings
+from datetime import datetime, timedelta
+
+# Maximum number of messages stored in a single bucket document
+SMS_BUCKET_SIZE = 100
+# Time span covered by a bucket
+SMS_BUCKET_SPAN = timedelta(hours=1)
+# Hard cap on messages returned by one read
+SMS_MAX_PAGE_SIZE = 200
 
 class SMSLogSchema(BaseModel):
     id: Optional[str] = Field(None, alias='_id')
@@ -24,19 +73,191 @@ class SMSLogSchema(BaseModel):
             }
         }
 
+class SMSLogBucketSchema(BaseModel):
+    id: Optional[str] = Field(None, alias='_id')
+    phone_number: str
+    bucket_start: datetime
+    count: int = Field(default=0, ge=0, le=SMS_BUCKET_SIZE)
+    first_at: Optional[datetime] = None
+    last_at: Optional[datetime] = None
+    messages: List[dict] = Field(default_factory=list)
+
+    class Config:
+        json_encoders = {
+            ObjectId: str,
+            datetime: lambda dt: dt.isoformat()
+        }
+        json_schema_extra = {
+            "example": {
+                "phone_number": "+1234567890",
+                "bucket_start": "2023-01-01T12:00:00",
+                "count": 1,
+                "messages": [{
+                    "content": "Your verification code is 123456",
+                    "from": "+1987654321",
+                    "timestamp": "2023-01-01T12:03:10"
+                }]
+            }
+        }
+
+def bucket_start_for(timestamp: datetime) -> datetime:
+    """Floor a timestamp to the start of its bucket"""
+    span = int(SMS_BUCKET_SPAN.total_seconds())
+    epoch = datetime(1970, 1, 1)
+    seconds = int((timestamp - epoch).total_seconds())
+    return epoch + timedelta(seconds=seconds - seconds % span)
+
+def expires_at_for(bucket_start: datetime) -> datetime:
+    """Date after which the TTL index removes a bucket starting at bucket_start"""
+    return bucket_start + SMS_BUCKET_SPAN + timedelta(days=settings.sms_log_retention_days)
+
+# A message's position: (timestamp, bucket _id, index in the bucket's array)
+MessageKey = Tuple[datetime, ObjectId, int]
+
+def encode_message_cursor(key: MessageKey) -> str:
+    """Opaque token for the last message of a page"""
+    timestamp, bucket_id, index = key
+    payload = json.dumps({'t': timestamp.isoformat(), 'b': str(bucket_id), 'i': index}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_message_cursor(token: str) -> MessageKey:
+    """
+    Decode a token produced by encode_message_cursor.
+
+    :raises ValueError: If the token is malformed.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(payload['t']), ObjectId(payload['b']), int(payload['i'])
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+
 class SMSLog:
     collection = db['sms_logs']
+    bucket_collection = db['sms_log_buckets']
 
     @staticmethod
-    def create_sms_log(sms_log_data: dict) -> str:
+    async def create_sms_log(sms_log_data: dict) -> str:
         sms_log_data['received_at'] = datetime.now()
-        result = SMSLog.collection.insert_one(sms_log_data)
+        sms_log_data['expires_at'] = expires_at_for(sms_log_data['received_at'])
+        result = await SMSLog.collection.insert_one(sms_log_data)
         return str(result.inserted_id)
 
     @staticmethod
-    def get_sms_log_by_id(sms_log_id: str) -> Optional[dict]:
-        return SMSLog.collection.find_one({'_id': ObjectId(sms_log_id)})
+    async def get_sms_log_by_id(sms_log_id: str) -> Optional[dict]:
+        return await SMSLog.collection.find_one({'_id': ObjectId(sms_log_id)})
+
+    @staticmethod
+    async def get_sms_logs_by_phone_number(phone_number: str, limit: int = 50) -> List[dict]:
+        """Latest logs of a phone number, newest first, at most `limit` (capped)"""
+        limit = max(1, min(limit, SMS_MAX_PAGE_SIZE))
+        cursor = SMSLog.collection.find(
+            {'phone_number': phone_number}
+        ).sort('received_at', -1).limit(limit)
+        return [log async for log in cursor]
+
+    @staticmethod
+    async def ensure_indexes() -> None:
+        """Bucket lookup / paging index, per-row lookup index and TTL on both"""
+        await SMSLog.bucket_collection.create_index(
+            [('phone_number', 1), ('bucket_start', -1), ('count', 1)]
+        )
+        await SMSLog.bucket_collection.create_index('expires_at', expireAfterSeconds=0)
+        await SMSLog.collection.create_index([('phone_number', 1), ('received_at', -1)])
+        await SMSLog.collection.create_index('expires_at', expireAfterSeconds=0)
 
     @staticmethod
-    def get_sms_logs_by_phone_number(phone_number: str) -> list:
-        return list(SMSLog.collection.find({'phone_number': phone_number}).sort('received_at', -1))
+    async def apply_retention(recompute: bool = False) -> int:
+        """Set expires_at from the current retention setting
+
+        Only documents without expires_at are touched unless `recompute` is
+        set. Returns the number of documents updated.
+        """
+        retention_ms = int(
+            (SMS_BUCKET_SPAN + timedelta(days=settings.sms_log_retention_days)).total_seconds() * 1000
+        )
+        query = {} if recompute else {'expires_at': {'$exists': False}}
+        buckets = await SMSLog.bucket_collection.update_many(
+            query, [{'$set': {'expires_at': {'$add': ['$bucket_start', retention_ms]}}}]
+        )
+        logs = await SMSLog.collection.update_many(
+            query, [{'$set': {'expires_at': {'$add': ['$received_at', retention_ms]}}}]
+        )
+        return buckets.modified_count + logs.modified_count
+
+    @staticmethod
+    async def append_message(phone_number: str, message_data: dict) -> bool:
+        """Append a received SMS to the phone number's current bucket
+
+        The write is a single upsert: it pushes into the open bucket for the
+        current hour, or creates a new bucket when that one is full.
+        """
+        now = message_data.get('timestamp') or datetime.now()
+        bucket_start = bucket_start_for(now)
+        message = {
+            'content': message_data['content'],
+            'from': message_data.get('from', message_data.get('from_number')),
+            'timestamp': now
+        }
+        result = await SMSLog.bucket_collection.update_one(
+            {
+                'phone_number': phone_number,
+                'bucket_start': bucket_start,
+                'count': {'$lt': SMS_BUCKET_SIZE}
+            },
+            {
+                '$push': {'messages': message},
+                '$inc': {'count': 1},
+                '$min': {'first_at': now},
+                '$max': {'last_at': now},
+                '$setOnInsert': {'expires_at': expires_at_for(bucket_start)}
+            },
+            upsert=True
+        )
+        return result.modified_count > 0 or result.upserted_id is not None
+
+    @staticmethod
+    async def get_messages(
+        phone_number: str,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get received SMS newest first, at most `limit` (capped) per call
+
+        Messages are ordered by (timestamp, bucket, position in bucket), so
+        several messages sharing a timestamp are never skipped or repeated
+        across pages. Returns the messages and the cursor for the next page,
+        or None when there are no older messages.
+
+        Raises:
+            ValueError: If cursor is malformed
+        """
+        limit = max(1, min(limit, SMS_MAX_PAGE_SIZE))
+        after = decode_message_cursor(cursor) if cursor else None
+        query = {'phone_number': phone_number}
+        if after:
+            # Buckets that started later can still hold messages stamped at the boundary
+            query['first_at'] = {'$lte': after[0]}
+
+        keyed = []
+        last_start = None
+        buckets = SMSLog.bucket_collection.find(
+            query,
+            {'messages': 1, 'bucket_start': 1}
+        ).sort([('bucket_start', -1), ('_id', -1)])
+        async for bucket in buckets:
+            # One extra message tells us whether an older page exists; buckets
+            # of the same hour may interleave, so finish that hour first
+            if len(keyed) > limit and bucket['bucket_start'] != last_start:
+                break
+            last_start = bucket['bucket_start']
+            for index, message in enumerate(bucket.get('messages', [])):
+                key = (message['timestamp'], bucket['_id'], index)
+                if after is None or key < after:
+                    keyed.append((key, message))
+
+        keyed.sort(key=lambda item: item[0], reverse=True)
+        page = keyed[:limit]
+        next_cursor = encode_message_cursor(page[-1][0]) if len(keyed) > limit else None
+        return [message for _, message in page], next_cursor
@@ -15,11 +15,14 @@ Transaction Class Methods:
 
 create_transaction: Creates new transaction with validation
 update_transaction_status: Updates status and timestamp
-get_user_transactions: Retrieves transactions with pagination and filtering
+get_user_transactions: Retrieves transactions with keyset (cursor) pagination and filtering
 get_transactions_by_order: Gets all transactions for an order
 get_total_deposits: Calculates total deposits for a user
 get_balance: Computes current user balance from transactions
 process_failed_transactions: Auto-fails stale pending transactions
+archive_settled_transactions: Moves old completed/failed transactions to
+                              transactions_archive; history, lookups and
+                              balances keep reading the archived rows
 Example Usage:
 
 # Create a deposit transaction
@@ -39,20 +42,27 @@ transaction_id = Transaction.create_transaction(deposit_data)
 Transaction.update_transaction_status(transaction_id, TransactionStatus.COMPLETED)
 
 # Get user balance
-balance = Transaction.get_balance("507f1f77bcf86cd799439011")
+balance = await Transaction.get_balance("507f1f77bcf86cd799439011")
 
-# Get purchase transactions
-purchases = Transaction.get_user_transactions(
+# Get purchase transactions, then the next page
+purchases, next_cursor = await Transaction.get_user_transactions(
     user_id="507f1f77bcf86cd799439011",
     transaction_type=TransactionType.PURCHASE
 )
+more, next_cursor = await Transaction.get_user_transactions(
+    user_id="507f1f77bcf86cd799439011",
+    transaction_type=TransactionType.PURCHASE,
+    cursor=next_cursor
+)
 '''
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from bson import ObjectId
 from pydantic import BaseModel, Field, validator
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 from app.config.database import db
+from app.core.pagination import fetch_page_merged
+from app.services.archiver import move_to_archive
 
 class TransactionType(str, Enum):
     DEPOSIT = 'deposit'
@@ -107,21 +117,43 @@ class TransactionSchema(BaseModel):
             raise ValueError('order_id is required for purchase transactions')
         return v
 
+SETTLED_STATUSES = [TransactionStatus.COMPLETED.value, TransactionStatus.FAILED.value]
+
 class Transaction:
     collection = db['transactions']
+    archive_collection = db['transactions_archive']
+
+    @staticmethod
+    async def ensure_indexes() -> None:
+        """Create the indexes used by the background sweeper"""
+        await Transaction.collection.create_index([('status', 1), ('created_at', 1)])
+        # History pages: (timestamp, _id) keyset, optionally narrowed by type,
+        # on both the hot and the archive collection
+        for collection in (Transaction.collection, Transaction.archive_collection):
+            await collection.create_index([('user_id', 1), ('timestamp', -1), ('_id', -1)])
+            await collection.create_index(
+                [('user_id', 1), ('type', 1), ('timestamp', -1), ('_id', -1)]
+            )
+        # Balance totals over archived rows
+        await Transaction.archive_collection.create_index([('user_id', 1), ('status', 1), ('type', 1)])
 
     @staticmethod
     def create_transaction(transaction_data: dict) -> str:
         """Create a new transaction record"""
         transaction_data['created_at'] = datetime.now()
         transaction_data['updated_at'] = datetime.now()
+        transaction_data.setdefault('timestamp', transaction_data['created_at'])
         result = Transaction.collection.insert_one(transaction_data)
         return str(result.inserted_id)
 
     @staticmethod
-    def get_transaction_by_id(transaction_id: str) -> Optional[dict]:
-        """Get transaction by ID"""
-        return Transaction.collection.find_one({'_id': ObjectId(transaction_id)})
+    async def get_transaction_by_id(transaction_id: str) -> Optional[dict]:
+        """Get transaction by ID (archived transactions included)"""
+        query = {'_id': ObjectId(transaction_id)}
+        transaction = await Transaction.collection.find_one(query)
+        if transaction is None:
+            transaction = await Transaction.archive_collection.find_one(query)
+        return transaction
 
     @staticmethod
     def update_transaction_status(transaction_id: str, status: TransactionStatus) -> bool:
@@ -138,14 +170,19 @@ class Transaction:
         return result.modified_count > 0
 
     @staticmethod
-    def get_user_transactions(
+    async def get_user_transactions(
         user_id: str,
         limit: int = 100,
-        skip: int = 0,
+        cursor: Optional[str] = None,
         transaction_type: Optional[TransactionType] = None,
         status: Optional[TransactionStatus] = None
-    ) -> List[dict]:
-        """Get transactions for a user with optional filters"""
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Get a page of transactions for a user with optional filters
+
+        Pages are ordered by (timestamp, _id) descending. Pass the returned
+        cursor to get the next page; it is None on the last page. Archived
+        transactions are merged in.
+        """
         query = {'user_id': ObjectId(user_id)}
         
         if transaction_type:
@@ -154,10 +191,9 @@ class Transaction:
         if status:
             query['status'] = status.value
 
-        return list(Transaction.collection.find(query)
-            .sort('timestamp', -1)
-            .skip(skip)
-            .limit(limit))
+        return await fetch_page_merged(
+            [Transaction.collection, Transaction.archive_collection], query, 'timestamp', limit, cursor
+        )
 
     @staticmethod
     def get_transactions_by_order(order_id: str) -> List[dict]:
@@ -167,36 +203,51 @@ class Transaction:
         }).sort('timestamp', -1))
 
     @staticmethod
-    def get_total_deposits(user_id: str) -> float:
-        """Get total deposited amount for a user"""
-        pipeline = [
-            {'$match': {
-                'user_id': ObjectId(user_id),
-                'type': TransactionType.DEPOSIT.value,
-                'status': TransactionStatus.COMPLETED.value
+    def _with_archive(match: dict) -> List[dict]:
+        """$match over the hot collection plus the same $match over the archive
+
+        A row archived but not yet deleted from the hot collection (mid-pass
+        or after an interrupted pass) is in both; it is kept once.
+        """
+        return [
+            {'$match': match},
+            {'$unionWith': {
+                'coll': Transaction.archive_collection.name,
+                'pipeline': [{'$match': match}]
             }},
+            {'$group': {'_id': '$_id', 'doc': {'$first': '$$ROOT'}}},
+            {'$replaceRoot': {'newRoot': '$doc'}}
+        ]
+
+    @staticmethod
+    async def get_total_deposits(user_id: str) -> float:
+        """Get total deposited amount for a user"""
+        pipeline = Transaction._with_archive({
+            'user_id': ObjectId(user_id),
+            'type': TransactionType.DEPOSIT.value,
+            'status': TransactionStatus.COMPLETED.value
+        }) + [
             {'$group': {
                 '_id': None,
                 'total': {'$sum': '$amount'}
             }}
         ]
-        result = list(Transaction.collection.aggregate(pipeline))
+        result = await Transaction.collection.aggregate(pipeline).to_list(1)
         return result[0]['total'] if result else 0.0
 
     @staticmethod
-    def get_balance(user_id: str) -> float:
+    async def get_balance(user_id: str) -> float:
         """Calculate current user balance"""
-        pipeline = [
-            {'$match': {
-                'user_id': ObjectId(user_id),
-                'status': TransactionStatus.COMPLETED.value
-            }},
+        pipeline = Transaction._with_archive({
+            'user_id': ObjectId(user_id),
+            'status': TransactionStatus.COMPLETED.value
+        }) + [
             {'$group': {
                 '_id': '$type',
                 'total': {'$sum': '$amount'}
             }}
         ]
-        results = list(Transaction.collection.aggregate(pipeline))
+        results = await Transaction.collection.aggregate(pipeline).to_list(None)
         
         deposits = next((r['total'] for r in results if r['_id'] == TransactionType.DEPOSIT.value), 0.0)
         withdrawals = next((r['total'] for r in results if r['_id'] == TransactionType.WITHDRAWAL.value), 0.0)
@@ -205,19 +256,53 @@ class Transaction:
         return deposits - withdrawals - purchases
 
     @staticmethod
-    def process_failed_transactions(hours: int = 24) -> int:
-        """Mark pending transactions older than X hours as failed"""
+    async def process_failed_transactions(hours: int = 24, batch_size: int = 500) -> int:
+        """Mark pending transactions older than X hours as failed
+
+        Works in batches of `batch_size` ids (oldest first, served by the
+        status+created_at index) so a large backlog never turns into one
+        unbounded update.
+        """
         cutoff_time = datetime.now() - timedelta(hours=hours)
-        result = Transaction.collection.update_many(
+        stale = {
+            'status': TransactionStatus.PENDING.value,
+            'created_at': {'$lt': cutoff_time}
+        }
+        modified = 0
+        while True:
+            cursor = Transaction.collection.find(stale, {'_id': 1}).sort('created_at', 1).limit(batch_size)
+            ids = [doc['_id'] async for doc in cursor]
+            if not ids:
+                break
+            result = await Transaction.collection.update_many(
+                {'_id': {'$in': ids}, 'status': TransactionStatus.PENDING.value},
+                {
+                    '$set': {
+                        'status': TransactionStatus.FAILED.value,
+                        'updated_at': datetime.now()
+                    }
+                }
+            )
+            modified += result.modified_count
+            if len(ids) < batch_size:
+                break
+        return modified
+
+    @staticmethod
+    async def archive_settled_transactions(
+        days: int = 90,
+        batch_size: int = 1000,
+        max_batches: Optional[int] = None
+    ) -> int:
+        """Move completed/failed transactions older than X days to transactions_archive"""
+        return await move_to_archive(
+            Transaction.collection,
+            Transaction.archive_collection,
             {
-                'status': TransactionStatus.PENDING.value,
-                'created_at': {'$lt': cutoff_time}
+                'status': {'$in': SETTLED_STATUSES},
+                'created_at': {'$lt': datetime.now() - timedelta(days=days)}
             },
-            {
-                '$set': {
-                    'status': TransactionStatus.FAILED.value,
-                    'updated_at': datetime.now()
-                }
-            }
+            sort_field='created_at',
+            batch_size=batch_size,
+            max_batches=max_batches
         )
-        return result.modified_count
@@ -0,0 +1,178 @@
+'''
+Key features of this implementation:
+
+UsageGranularity Enum:
+
+hour, day
+UsageBucketSchema:
+
+One pre-aggregated counter document per (project, API key, granularity,
+bucket_start). api_key_id is None on the project-wide rows, so project
+totals never need to add up per-key rows
+UsageMeter Class Methods:
+
+record: Counts API calls into the hourly and daily buckets (buffered by
+        CounterBuffer, written with bulk_write upserts)
+get_usage: Per-bucket series for a project or API key over a time range
+count_calls: Total calls over a time range ("last 7 days" = 168 hourly rows;
+             ranges older than the hourly retention are summed from daily rows)
+ensure_indexes: Unique bucket index, key lookup index and TTL on hourly rows
+
+Example Usage:
+
+UsageMeter.record("507f1f77bcf86cd799439011", api_key_id="607f1f77bcf86cd799439012")
+
+calls = await UsageMeter.count_calls(
+    project_id="507f1f77bcf86cd799439011",
+    since=datetime.now() - timedelta(days=7)
+)
+'''
+from typing import Optional, List
+from bson import ObjectId
+from pydantic import BaseModel, Field
+from datetime import datetime, timedelta
+from enum import Enum
+from app.config.database import db
+from app.config.settings import settings
+from app.services.counter_buffer import CounterBuffer
+
+class UsageGranularity(str, Enum):
+    HOUR = 'hour'
+    DAY = 'day'
+
+class UsageBucketSchema(BaseModel):
+    id: Optional[str] = Field(None, alias='_id')
+    project_id: str
+    api_key_id: Optional[str] = None
+    granularity: UsageGranularity
+    bucket_start: datetime
+    calls: int = Field(default=0, ge=0)
+    expires_at: Optional[datetime] = None
+
+    class Config:
+        json_encoders = {
+            ObjectId: str,
+            datetime: lambda dt: dt.isoformat()
+        }
+        json_schema_extra = {
+            "example": {
+                "project_id": "507f1f77bcf86cd799439011",
+                "api_key_id": None,
+                "granularity": "hour",
+                "bucket_start": "2023-01-01T12:00:00",
+                "calls": 42
+            }
+        }
+
+def bucket_start_for(ts: datetime, granularity: UsageGranularity) -> datetime:
+    """Floor a timestamp to the start of its hour or day"""
+    if granularity == UsageGranularity.DAY:
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+class UsageMeter:
+    collection = db['usage_buckets']
+
+    @staticmethod
+    async def ensure_indexes() -> None:
+        """Bucket upsert key, per-key reads and retention of hourly rows"""
+        await UsageMeter.collection.create_index(
+            [('project_id', 1), ('api_key_id', 1), ('granularity', 1), ('bucket_start', 1)],
+            unique=True
+        )
+        await UsageMeter.collection.create_index(
+            [('api_key_id', 1), ('granularity', 1), ('bucket_start', 1)]
+        )
+        await UsageMeter.collection.create_index('expires_at', expireAfterSeconds=0)
+
+    @staticmethod
+    def record(project_id: str, api_key_id: Optional[str] = None, calls: int = 1) -> None:
+        """Count API calls for a project (and the API key used, if any)"""
+        now = datetime.now()
+        project_id = ObjectId(project_id)
+        key_ids = [None]
+        if api_key_id:
+            key_ids.append(ObjectId(api_key_id))
+        for key_id in key_ids:
+            for granularity in UsageGranularity:
+                set_on_insert = None
+                if granularity == UsageGranularity.HOUR:
+                    set_on_insert = {
+                        'expires_at': now + timedelta(days=settings.usage_hourly_retention_days)
+                    }
+                usage_counter.add(
+                    {
+                        'project_id': project_id,
+                        'api_key_id': key_id,
+                        'granularity': granularity.value,
+                        'bucket_start': bucket_start_for(now, granularity)
+                    },
+                    {'calls': calls},
+                    set_on_insert=set_on_insert
+                )
+
+    @staticmethod
+    def _range_query(
+        project_id: Optional[str],
+        api_key_id: Optional[str],
+        granularity: UsageGranularity,
+        since: datetime,
+        until: Optional[datetime]
+    ) -> dict:
+        if not project_id and not api_key_id:
+            raise ValueError("project_id or api_key_id is required")
+        query = {
+            'api_key_id': ObjectId(api_key_id) if api_key_id else None,
+            'granularity': granularity.value,
+            'bucket_start': {'$gte': bucket_start_for(since, granularity)}
+        }
+        if project_id:
+            query['project_id'] = ObjectId(project_id)
+        if until:
+            query['bucket_start']['$lt'] = until
+        return query
+
+    @staticmethod
+    async def get_usage(
+        project_id: Optional[str] = None,
+        api_key_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        granularity: UsageGranularity = UsageGranularity.HOUR
+    ) -> List[dict]:
+        """Calls per bucket, oldest first"""
+        since = since or datetime.now() - timedelta(days=7)
+        query = UsageMeter._range_query(project_id, api_key_id, granularity, since, until)
+        cursor = UsageMeter.collection.find(
+            query, {'_id': 0, 'bucket_start': 1, 'calls': 1}
+        ).sort('bucket_start', 1)
+        return [doc async for doc in cursor]
+
+    @staticmethod
+    async def count_calls(
+        project_id: Optional[str] = None,
+        api_key_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> int:
+        """
+        Total calls in [since, until), read from hourly buckets.
+
+        Hourly rows expire after usage_hourly_retention_days, so a range
+        reaching further back is summed from the daily rows instead (the
+        first day then counts whole).
+        """
+        now = datetime.now()
+        since = since or now - timedelta(days=7)
+        granularity = UsageGranularity.HOUR
+        if since < now - timedelta(days=settings.usage_hourly_retention_days):
+            granularity = UsageGranularity.DAY
+        query = UsageMeter._range_query(project_id, api_key_id, granularity, since, until)
+        pipeline = [
+            {'$match': query},
+            {'$group': {'_id': None, 'calls': {'$sum': '$calls'}}}
+        ]
+        result = await UsageMeter.collection.aggregate(pipeline).to_list(1)
+        return result[0]['calls'] if result else 0
+
+usage_counter = CounterBuffer('usage_meter', lambda: UsageMeter.collection, upsert=True)
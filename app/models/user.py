@@ -13,6 +13,7 @@ User Class (MongoDB Operations):
 create_user: Tạo user mới với các giá trị mặc định
 find_by_id/find_by_email: Tìm user bằng ID hoặc email
 update_login_time: Cập nhật thời gian đăng nhập cuối và lưu IP
+update_password_hash: Thay hash mật khẩu (nâng cấp hash cũ khi đăng nhập)
 update_balance: Cập nhật số dư tài khoản
 update_status: Thay đổi trạng thái user (active/suspended)
 set_api_key: Gán API key cho user
@@ -111,6 +112,15 @@ class User:
         """Find user by email"""
         return User.collection.find_one({'email': email})
 
+    @staticmethod
+    async def update_password_hash(user_id, new_hash: str, old_hash: str) -> bool:
+        """Replace a password hash (rehash on login); no-op if it changed meanwhile"""
+        result = await User.collection.update_one(
+            {'_id': ObjectId(user_id), 'password': old_hash},
+            {'$set': {'password': new_hash}}
+        )
+        return result.modified_count > 0
+
     @staticmethod
     def update_login_time(user_id: str, ip_address: str) -> None:
         """Update last login time and add IP to history"""
@@ -2,6 +2,7 @@ from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
 from datetime import datetime
 import httpx
 import asyncio
+import random
 from typing import Optional
 import aiomysql
 import uvicorn
@@ -9,6 +10,8 @@ import logging
 from functools import wraps
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.models.phone_number import PhoneNumber
+from app.services.health import health_monitor
+from fastapi.responses import JSONResponse
 
 
 # Configure logging
@@ -282,6 +285,7 @@ async def get_number(
                 "provider": provider,
                 "status": "active",
                 "is_used": False,
+                "alloc_key": random.random(),
                 "created_at": datetime.now(),
                 "updated_at": datetime.now()
             }
@@ -422,15 +426,32 @@ class DatabaseOperations:
 
 
 # Startup and shutdown events
+async def ping_mysql():
+    async with db_pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT 1")
+
+
+@app.get("/health")
+async def health():
+    return JSONResponse(
+        health_monitor.status(),
+        status_code=200 if health_monitor.healthy else 503
+    )
+
+
 @app.on_event("startup")
 async def startup():
     await init_db_pool()
+    health_monitor.add_check('mysql', ping_mysql, required=False)
+    await health_monitor.start()
     logger.info("Application started, database pool initialized")
 
 
 @app.on_event("shutdown")
 async def shutdown():
     global db_pool, http_client
+    await health_monitor.stop()
     if db_pool:
         db_pool.close()
         await db_pool.wait_closed()
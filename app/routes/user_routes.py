@@ -1,21 +1,36 @@
 from fastapi import APIRouter, Request, Form, status, Response, HTTPException
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import RedirectResponse
-from app.models.service import Service
+from fastapi.responses import RedirectResponse, JSONResponse
 from app.models.country import Country
 from app.models.project import Project
-from typing import List
-from app.core.security import hash_password, create_access_token
+from app.models.order import Order, OrderStatus
+from app.models.transaction import Transaction, TransactionType
+from app.models.usage import UsageMeter, UsageGranularity
+from app.models.api_key import APIKey
+from app.services.health import health_monitor
+from app.config.settings import settings
+from app.core.templating import templates
+from app.services.page_context import page_context
+from app.services.fragment_cache import etag_matches, render_page
+from app.services.service_catalog import service_catalog
+from app.services.sessions import SESSION_COOKIE, session_store
+from bson import ObjectId
+from typing import List, Optional
+from app.core.passwords import hash_password, verify_and_update
+from app.core.auth import user_id_for
 from app.models.user import User
 import secrets
 import os
 import hashlib
 import hmac
+import logging
 from authlib.integrations.starlette_client import OAuth
 from starlette.config import Config
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/views")
+logger = logging.getLogger(__name__)
+
+# Anonymous visitors still see the demo user's data until login is required
+DEMO_USER_ID = ObjectId("507f1f77bcf86cd799439011")
 
 # Cấu hình OAuth
 config = Config('.env')
@@ -52,43 +67,9 @@ oauth.register(
 @router.get("/homepage")
 async def homepage(request: Request):
     try:
-        # Verify database connection
-        from app.config.database import db
-        await db.client.admin.command('ping')
-        
-        # Get services with error handling for missing fields
-        services = []
-        cursor = Service.collection.find().sort("popularity", -1).limit(20)
-        async for service in cursor:
-            # Ensure required fields exist
-            service.setdefault("name", "Unknown Service")
-            service.setdefault("popularity", 0)
-            service.setdefault("current_price", 0)
-            service.setdefault("success_rate", 0.9)
-            services.append(service)
-
-        # Get active countries asynchronously
-        countries = await Country.get_active_countries()
-
-        # Hardcoded user_id for demonstration
-        from bson import ObjectId
-        user_id = ObjectId("507f1f77bcf86cd799439011")
-        user_projects = await Project.get_user_projects(user_id)
-        selected_project_name = "My Verification Project"
-        if user_projects:
-            selected_project_name = user_projects[0].name
-        
-        return templates.TemplateResponse(
-            "user/account/homepage.html",
-            {
-                "request": request,
-                "services": services,
-                "total_services": len(services),
-                "countries": countries,
-                "total_countries": len(countries),
-                "selected_project_name": selected_project_name
-            }
-        )
+        # Catalog and project name from the shared, short-TTL page context
+        context = await page_context.get(request, user_id_for(request, DEMO_USER_ID))
+        return render_page(templates, request, "user/account/homepage.html", context)
     except Exception as e:
         import traceback
         error_detail = {
@@ -102,43 +83,9 @@ async def homepage(request: Request):
 @router.get("/view_profile")
 async def view_profile(request: Request):
     try:
-        # Verify database connection app\views\user\account\view_profile.html
-        from app.config.database import db
-        await db.client.admin.command('ping')
-        
-        # Get services with error handling for missing fields
-        services = []
-        cursor = Service.collection.find().sort("popularity", -1).limit(20)
-        async for service in cursor:
-            # Ensure required fields exist
-            service.setdefault("name", "Unknown Service")
-            service.setdefault("popularity", 0)
-            service.setdefault("current_price", 0)
-            service.setdefault("success_rate", 0.9)
-            services.append(service)
-
-        # Get active countries asynchronously
-        countries = await Country.get_active_countries()
-
-        # Hardcoded user_id for demonstration
-        from bson import ObjectId
-        user_id = ObjectId("507f1f77bcf86cd799439011")
-        user_projects = await Project.get_user_projects(user_id)
-        selected_project_name = "My Verification Project"
-        if user_projects:
-            selected_project_name = user_projects[0].name
-        
-        return templates.TemplateResponse(
-            "user/account/view_profile.html",
-            {
-                "request": request,
-                "services": services,
-                "total_services": len(services),
-                "countries": countries,
-                "total_countries": len(countries),
-                "selected_project_name": selected_project_name
-            }
-        )
+        # Catalog and project name from the shared, short-TTL page context
+        context = await page_context.get(request, user_id_for(request, DEMO_USER_ID))
+        return render_page(templates, request, "user/account/view_profile.html", context)
     except Exception as e:
         import traceback
         error_detail = {
@@ -152,43 +99,9 @@ async def view_profile(request: Request):
 @router.get("/edit_profile")
 async def edit_profile(request: Request):
     try:
-        # Verify database connection app\views\user\account\edit_profile.html
-        from app.config.database import db
-        await db.client.admin.command('ping')
-        
-        # Get services with error handling for missing fields
-        services = []
-        cursor = Service.collection.find().sort("popularity", -1).limit(20)
-        async for service in cursor:
-            # Ensure required fields exist
-            service.setdefault("name", "Unknown Service")
-            service.setdefault("popularity", 0)
-            service.setdefault("current_price", 0)
-            service.setdefault("success_rate", 0.9)
-            services.append(service)
-
-        # Get active countries asynchronously
-        countries = await Country.get_active_countries()
-
-        # Hardcoded user_id for demonstration
-        from bson import ObjectId
-        user_id = ObjectId("507f1f77bcf86cd799439011")
-        user_projects = await Project.get_user_projects(user_id)
-        selected_project_name = "My Verification Project"
-        if user_projects:
-            selected_project_name = user_projects[0].name
-        
-        return templates.TemplateResponse(
-            "user/account/edit_profile.html",
-            {
-                "request": request,
-                "services": services,
-                "total_services": len(services),
-                "countries": countries,
-                "total_countries": len(countries),
-                "selected_project_name": selected_project_name
-            }
-        )
+        # Catalog and project name from the shared, short-TTL page context
+        context = await page_context.get(request, user_id_for(request, DEMO_USER_ID))
+        return render_page(templates, request, "user/account/edit_profile.html", context)
     except Exception as e:
         import traceback
         error_detail = {
@@ -204,43 +117,9 @@ async def edit_profile(request: Request):
 async def faq_page(request: Request):
     """FAQ page route"""
     try:
-        # Verify database connection
-        from app.config.database import db
-        await db.client.admin.command('ping')
-        
-        # Get services with error handling for missing fields
-        services = []
-        cursor = Service.collection.find().sort("popularity", -1).limit(20)
-        async for service in cursor:
-            # Ensure required fields exist
-            service.setdefault("name", "Unknown Service")
-            service.setdefault("popularity", 0)
-            service.setdefault("current_price", 0)
-            service.setdefault("success_rate", 0.9)
-            services.append(service)
-
-        # Get active countries asynchronously
-        countries = await Country.get_active_countries()
-
-        # Hardcoded user_id for demonstration
-        from bson import ObjectId
-        user_id = ObjectId("507f1f77bcf86cd799439011")
-        user_projects = await Project.get_user_projects(user_id)
-        selected_project_name = "My Verification Project"
-        if user_projects:
-            selected_project_name = user_projects[0].name
-        
-        return templates.TemplateResponse(
-            "user/support/faq.html",
-            {
-                "request": request,
-                "services": services,
-                "total_services": len(services),
-                "countries": countries,
-                "total_countries": len(countries),
-                "selected_project_name": selected_project_name
-            }
-        )
+        # Catalog and project name from the shared, short-TTL page context
+        context = await page_context.get(request, user_id_for(request, DEMO_USER_ID))
+        return render_page(templates, request, "user/support/faq.html", context)
     except Exception as e:
         import traceback
         error_detail = {
@@ -257,43 +136,9 @@ async def faq_page(request: Request):
 async def faq_sub_category(request: Request):
 
     try:
-        # Verify database connection
-        from app.config.database import db
-        await db.client.admin.command('ping')
-        
-        # Get services with error handling for missing fields
-        services = []
-        cursor = Service.collection.find().sort("popularity", -1).limit(20)
-        async for service in cursor:
-            # Ensure required fields exist
-            service.setdefault("name", "Unknown Service")
-            service.setdefault("popularity", 0)
-            service.setdefault("current_price", 0)
-            service.setdefault("success_rate", 0.9)
-            services.append(service)
-
-        # Get active countries asynchronously
-        countries = await Country.get_active_countries()
-
-        # Hardcoded user_id for demonstration
-        from bson import ObjectId
-        user_id = ObjectId("507f1f77bcf86cd799439011")
-        user_projects = await Project.get_user_projects(user_id)
-        selected_project_name = "My Verification Project"
-        if user_projects:
-            selected_project_name = user_projects[0].name
-        
-        return templates.TemplateResponse(
-            "user/support/faq_sub_category.html",
-            {
-                "request": request,
-                "services": services,
-                "total_services": len(services),
-                "countries": countries,
-                "total_countries": len(countries),
-                "selected_project_name": selected_project_name
-            }
-        )
+        # Catalog and project name from the shared, short-TTL page context
+        context = await page_context.get(request, user_id_for(request, DEMO_USER_ID))
+        return render_page(templates, request, "user/support/faq_sub_category.html", context)
     except Exception as e:
         import traceback
         error_detail = {
@@ -310,43 +155,9 @@ async def faq_sub_category(request: Request):
 async def faq_page(request: Request):
     """how_to_use page route"""
     try:
-        # Verify database connection
-        from app.config.database import db
-        await db.client.admin.command('ping')
-        
-        # Get services with error handling for missing fields
-        services = []
-        cursor = Service.collection.find().sort("popularity", -1).limit(20)
-        async for service in cursor:
-            # Ensure required fields exist
-            service.setdefault("name", "Unknown Service")
-            service.setdefault("popularity", 0)
-            service.setdefault("current_price", 0)
-            service.setdefault("success_rate", 0.9)
-            services.append(service)
-
-        # Get active countries asynchronously
-        countries = await Country.get_active_countries()
-
-        # Hardcoded user_id for demonstration
-        from bson import ObjectId
-        user_id = ObjectId("507f1f77bcf86cd799439011")
-        user_projects = await Project.get_user_projects(user_id)
-        selected_project_name = "My Verification Project"
-        if user_projects:
-            selected_project_name = user_projects[0].name
-        
-        return templates.TemplateResponse(
-            "user/support/how_to_use.html ",
-            {
-                "request": request,
-                "services": services,
-                "total_services": len(services),
-                "countries": countries,
-                "total_countries": len(countries),
-                "selected_project_name": selected_project_name
-            }
-        )
+        # Catalog and project name from the shared, short-TTL page context
+        context = await page_context.get(request, user_id_for(request, DEMO_USER_ID))
+        return render_page(templates, request, "user/support/how_to_use.html", context)
     except Exception as e:
         import traceback
         error_detail = {
@@ -360,43 +171,9 @@ async def faq_page(request: Request):
 @router.get("/purchase")
 async def purchase(request: Request):
     try:
-        # Verify database connection
-        from app.config.database import db
-        await db.client.admin.command('ping')
-        
-        # Get services with error handling for missing fields
-        services = []
-        cursor = Service.collection.find().sort("popularity", -1).limit(20)
-        async for service in cursor:
-            # Ensure required fields exist
-            service.setdefault("name", "Unknown Service")
-            service.setdefault("popularity", 0)
-            service.setdefault("current_price", 0)
-            service.setdefault("success_rate", 0.9)
-            services.append(service)
-
-        # Get active countries asynchronously
-        countries = await Country.get_active_countries()
-
-        # Hardcoded user_id for demonstration
-        from bson import ObjectId
-        user_id = ObjectId("507f1f77bcf86cd799439011")
-        user_projects = await Project.get_user_projects(user_id)
-        selected_project_name = "My Verification Project"
-        if user_projects:
-            selected_project_name = user_projects[0].name
-        
-        return templates.TemplateResponse(
-            "user/orders/purchase.html ",
-            {
-                "request": request,
-                "services": services,
-                "total_services": len(services),
-                "countries": countries,
-                "total_countries": len(countries),
-                "selected_project_name": selected_project_name
-            }
-        )
+        # Catalog and project name from the shared, short-TTL page context
+        context = await page_context.get(request, user_id_for(request, DEMO_USER_ID))
+        return render_page(templates, request, "user/orders/purchase.html", context)
     except Exception as e:
         import traceback
         error_detail = {
@@ -410,41 +187,69 @@ async def purchase(request: Request):
 @router.get("/recharge")
 async def recharge(request: Request):
     try:
-        # Verify database connection
-        from app.config.database import db
-        await db.client.admin.command('ping')
-        
-        # Get services with error handling for missing fields
-        services = []
-        cursor = Service.collection.find().sort("popularity", -1).limit(20)
-        async for service in cursor:
-            # Ensure required fields exist
-            service.setdefault("name", "Unknown Service")
-            service.setdefault("popularity", 0)
-            service.setdefault("current_price", 0)
-            service.setdefault("success_rate", 0.9)
-            services.append(service)
-
-        # Get active countries asynchronously
-        countries = await Country.get_active_countries()
-
-        # Hardcoded user_id for demonstration
-        from bson import ObjectId
-        user_id = ObjectId("507f1f77bcf86cd799439011")
-        user_projects = await Project.get_user_projects(user_id)
-        selected_project_name = "My Verification Project"
-        if user_projects:
-            selected_project_name = user_projects[0].name
-        
+        # Catalog and project name from the shared, short-TTL page context
+        context = await page_context.get(request, user_id_for(request, DEMO_USER_ID))
+        return render_page(templates, request, "user/orders/recharge.html", context)
+    except Exception as e:
+        import traceback
+        error_detail = {
+            "error": str(e),
+            "traceback": traceback.format_exc()
+        }
+        return templates.TemplateResponse(
+            "error.html",
+            {"request": request, "error": error_detail}
+        )
+
+@router.get("/free_phone_list")
+async def free_phone_list(request: Request):
+    try:
+        # Catalog and project name from the shared, short-TTL page context
+        context = await page_context.get(request, user_id_for(request, DEMO_USER_ID))
+        return render_page(templates, request, "user/orders/free_phone_list.html", context)
+    except Exception as e:
+        import traceback
+        error_detail = {
+            "error": str(e),
+            "traceback": traceback.format_exc()
+        }
+        return templates.TemplateResponse(
+            "error.html",
+            {"request": request, "error": error_detail}
+        )
+
+
+DATABASE_UNAVAILABLE = "Database is temporarily unavailable, please try again shortly"
+
+def _database_unavailable(request: Request, template: str = "error.html"):
+    """Answer 503 while the health monitor reports the database down"""
+    error = {"error": DATABASE_UNAVAILABLE} if template == "error.html" else DATABASE_UNAVAILABLE
+    return templates.TemplateResponse(
+        template,
+        {"request": request, "error": error},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+def _history_item(doc: dict) -> dict:
+    """Make a history row JSON friendly (ObjectId -> str)"""
+    return {k: str(v) if isinstance(v, ObjectId) else v for k, v in doc.items()}
+
+@router.get("/recharge_history")
+async def recharge_history(request: Request, cursor: Optional[str] = None):
+    try:
+        if not health_monitor.healthy:
+            return _database_unavailable(request)
+
+        user_id = user_id_for(request, DEMO_USER_ID)
+        transactions, next_cursor = await Transaction.get_user_transactions(
+            user_id, limit=20, cursor=cursor, transaction_type=TransactionType.DEPOSIT
+        )
         return templates.TemplateResponse(
-            "user/orders/recharge.html ",
+            "user/orders/recharge_history.html",
             {
                 "request": request,
-                "services": services,
-                "total_services": len(services),
-                "countries": countries,
-                "total_countries": len(countries),
-                "selected_project_name": selected_project_name
+                "transactions": transactions,
+                "next_cursor": next_cursor
             }
         )
     except Exception as e:
@@ -458,44 +263,20 @@ async def recharge(request: Request):
             {"request": request, "error": error_detail}
         )
 
-@router.get("/free_phone_list")
-async def free_phone_list(request: Request):
+@router.get("/purchase_history")
+async def purchase_history(request: Request, cursor: Optional[str] = None):
     try:
-        # Verify database connection
-        from app.config.database import db
-        await db.client.admin.command('ping')
-        
-        # Get services with error handling for missing fields
-        services = []
-        cursor = Service.collection.find().sort("popularity", -1).limit(20)
-        async for service in cursor:
-            # Ensure required fields exist
-            service.setdefault("name", "Unknown Service")
-            service.setdefault("popularity", 0)
-            service.setdefault("current_price", 0)
-            service.setdefault("success_rate", 0.9)
-            services.append(service)
-
-        # Get active countries asynchronously
-        countries = await Country.get_active_countries()
-
-        # Hardcoded user_id for demonstration
-        from bson import ObjectId
-        user_id = ObjectId("507f1f77bcf86cd799439011")
-        user_projects = await Project.get_user_projects(user_id)
-        selected_project_name = "My Verification Project"
-        if user_projects:
-            selected_project_name = user_projects[0].name
-        
+        if not health_monitor.healthy:
+            return _database_unavailable(request)
+
+        user_id = user_id_for(request, DEMO_USER_ID)
+        orders, next_cursor = await Order.get_user_orders(user_id, limit=20, cursor=cursor)
         return templates.TemplateResponse(
-            "user/orders/free_phone_list.html ",
+            "user/orders/purchase_history.html",
             {
                 "request": request,
-                "services": services,
-                "total_services": len(services),
-                "countries": countries,
-                "total_countries": len(countries),
-                "selected_project_name": selected_project_name
+                "orders": orders,
+                "next_cursor": next_cursor
             }
         )
     except Exception as e:
@@ -508,63 +289,130 @@ async def free_phone_list(request: Request):
             "error.html",
             {"request": request, "error": error_detail}
         )
-    
 
-@router.get("/api/services") 
-async def get_services_api(sort_by: str = "popularity"):
-    """API endpoint để lấy danh sách dịch vụ"""
+@router.get("/api/transactions")
+async def get_transactions_api(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    type: Optional[TransactionType] = None
+):
+    """Lịch sử giao dịch, phân trang bằng cursor (timestamp, _id)"""
+    user_id = user_id_for(request, DEMO_USER_ID)
+    try:
+        items, next_cursor = await Transaction.get_user_transactions(
+            user_id, limit=limit, cursor=cursor, transaction_type=type
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": [_history_item(t) for t in items], "next_cursor": next_cursor}
+
+@router.get("/api/orders")
+async def get_orders_api(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    status: Optional[OrderStatus] = None
+):
+    """Lịch sử đơn hàng, phân trang bằng cursor (created_at, _id)"""
+    user_id = user_id_for(request, DEMO_USER_ID)
+    try:
+        items, next_cursor = await Order.get_user_orders(
+            user_id, limit=limit, cursor=cursor, status=status
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": [_history_item(o) for o in items], "next_cursor": next_cursor}
+
+async def _owns_usage_target(user_id: ObjectId, project_id: Optional[str], api_key_id: Optional[str]) -> bool:
+    """project / API key thuộc về user (user_id lưu dạng ObjectId hoặc chuỗi)"""
+    owner = {'$in': [user_id, str(user_id)]}
+    if project_id and not await Project.collection.find_one(
+        {'_id': ObjectId(project_id), 'user_id': owner}, {'_id': 1}
+    ):
+        return False
+    if api_key_id and not await APIKey.collection.find_one(
+        {'_id': ObjectId(api_key_id), 'user_id': owner}, {'_id': 1}
+    ):
+        return False
+    return True
+
+@router.get("/api/usage")
+async def get_usage_api(
+    request: Request,
+    project_id: Optional[str] = None,
+    api_key_id: Optional[str] = None,
+    days: int = 7,
+    granularity: UsageGranularity = UsageGranularity.HOUR
+):
+    """Số lượt gọi API theo giờ/ngày của project hoặc API key (đọc từ bucket)"""
+    from datetime import datetime, timedelta
+    user_id = user_id_for(request)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if not project_id and not api_key_id:
+        raise HTTPException(status_code=400, detail="project_id or api_key_id is required")
+    for value in (project_id, api_key_id):
+        if value and not ObjectId.is_valid(value):
+            raise HTTPException(status_code=400, detail=f"Invalid id: {value}")
+    # Không tiết lộ project / key của người khác: trả 404 như khi không tồn tại
+    if not await _owns_usage_target(user_id, project_id, api_key_id):
+        raise HTTPException(status_code=404, detail="Project or API key not found")
+    since = datetime.now() - timedelta(days=max(1, min(days, 365)))
+    series = await UsageMeter.get_usage(project_id, api_key_id, since=since, granularity=granularity)
+    total = await UsageMeter.count_calls(project_id, api_key_id, since=since)
+    return {"total_calls": total, "series": series}
+
+@router.get("/health")
+async def health():
+    """Trạng thái database theo health monitor chạy nền (không truy vấn DB)"""
+    return JSONResponse(
+        health_monitor.status(),
+        status_code=status.HTTP_200_OK if health_monitor.healthy else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+@router.get("/api/countries/autocomplete")
+async def autocomplete_countries(q: str = "", limit: int = 10):
+    """Gợi ý quốc gia theo tiền tố tên, mã ISO hoặc mã điện thoại (không truy vấn DB)"""
+    return Country.search_countries(q, max(1, min(limit, 50)))
+
+@router.get("/api/services")
+async def get_services_api(
+    request: Request,
+    sort_by: str = "popularity",
+    country_id: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None
+):
+    """Danh sách dịch vụ từ snapshot trong bộ nhớ, phân trang bằng cursor, lọc theo quốc gia"""
     try:
-        if sort_by == "price_asc":
-            services = list(Service.collection.find().sort("current_price", 1))
-        elif sort_by == "price_desc":
-            services = list(Service.collection.find().sort("current_price", -1))
-        else:
-            services = list(Service.collection.find().sort("popularity", -1))
-            
-        return services
+        page = await service_catalog.page(sort_by, country_id=country_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        return {"error": str(e)}
+        # Chi tiết lỗi (host / kết nối Mongo) chỉ ghi log, không trả về client
+        logger.error(f"Service catalog load failed: {str(e)}")
+        return JSONResponse(
+            {"error": "Service catalog unavailable"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    version = page.pop("version")
+    etag = '"' + hashlib.sha1(
+        f"{version}|{sort_by}|{country_id}|{limit}|{cursor}".encode()
+    ).hexdigest()[:32] + '"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.services_api_max_age_seconds}"
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(page, headers=headers)
 
 @router.get("/login")
 async def login(request: Request):
     try:
-        # Verify database connection
-        from app.config.database import db
-        await db.client.admin.command('ping')
-        
-        # Get services with error handling for missing fields
-        services = []
-        cursor = Service.collection.find().sort("popularity", -1).limit(20)
-        async for service in cursor:
-            # Ensure required fields exist
-            service.setdefault("name", "Unknown Service")
-            service.setdefault("popularity", 0)
-            service.setdefault("current_price", 0)
-            service.setdefault("success_rate", 0.9)
-            services.append(service)
-
-        # Get active countries asynchronously
-        countries = await Country.get_active_countries()
-
-        # Hardcoded user_id for demonstration
-        from bson import ObjectId
-        user_id = ObjectId("507f1f77bcf86cd799439011")
-        user_projects = await Project.get_user_projects(user_id)
-        selected_project_name = "My Verification Project"
-        if user_projects:
-            selected_project_name = user_projects[0].name
-        
-        return templates.TemplateResponse(
-            "user/auth/login.html",
-            {
-                "request": request,
-                "services": services,
-                "total_services": len(services),
-                "countries": countries,
-                "total_countries": len(countries),
-                "selected_project_name": selected_project_name
-            }
-        )
+        # Catalog and project name from the shared, short-TTL page context
+        context = await page_context.get(request, user_id_for(request, DEMO_USER_ID))
+        return render_page(templates, request, "user/auth/login.html", context)
     except Exception as e:
         import traceback
         error_detail = {
@@ -576,6 +424,20 @@ async def login(request: Request):
             {"request": request, "error": error_detail}
         )
 
+async def _start_session(request: Request, response: Response, user_id, email: Optional[str]) -> None:
+    """Server-side session for a signed-in user, token in the session_id cookie"""
+    if not user_id:
+        return
+    token = await session_store.create(
+        user_id, email=email,
+        ip=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent")
+    )
+    response.set_cookie(
+        key=SESSION_COOKIE, value=token, httponly=True, samesite="lax",
+        secure=settings.session_cookie_secure, max_age=settings.session_max_age_days * 24 * 3600
+    )
+
 @router.post("/login")
 async def login_post(
     request: Request,
@@ -584,13 +446,16 @@ async def login_post(
     password: str = Form(...)
 ):
     try:
-        # Verify database connection
-        from app.config.database import db
-        await db.client.admin.command('ping')
+        # Database state from the background health monitor (no ping here)
+        if not health_monitor.healthy:
+            return _database_unavailable(request, "user/auth/login.html")
 
         # Find user by email
-        user = await User.collection.find_one({"email": email})
-        if not user:
+        user = await User.collection.find_one({"email": email}, {"password": 1})
+        # Verify password (thread pool; unknown emails cost the same time)
+        stored_hash = user.get("password") if user else None
+        ok, new_hash = await verify_and_update(stored_hash, password)
+        if not ok:
             return templates.TemplateResponse(
                 "user/auth/login.html",
                 {
@@ -598,20 +463,12 @@ async def login_post(
                     "error": "Invalid email or password"
                 }
             )
-        # Verify password
-        hashed_input_password = hash_password(password)
-        if hashed_input_password != user.get("password"):
-            return templates.TemplateResponse(
-                "user/auth/login.html",
-                {
-                    "request": request,
-                    "error": "Invalid email or password"
-                }
-            )
-        # Create access token and set cookie
-        access_token = create_access_token(email)
+        if new_hash:
+            # Legacy SHA-256 hash or outdated scrypt cost: upgrade it now
+            await User.update_password_hash(user["_id"], new_hash, stored_hash)
+        # Create server-side session and set cookie
         redirect_response = RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
-        redirect_response.set_cookie(key="user_token", value=access_token, httponly=True)
+        await _start_session(request, redirect_response, user["_id"], email)
         return redirect_response
     except Exception as e:
         import traceback
@@ -624,10 +481,24 @@ async def login_post(
             {"request": request, "error": error_detail}
         )
 
+@router.post("/logout")
+async def logout(request: Request, everywhere: bool = Form(False)):
+    """Xoá session hiện tại, hoặc mọi session của user (everywhere=true)"""
+    user_id = user_id_for(request)
+    token = request.cookies.get(SESSION_COOKIE)
+    if everywhere and user_id:
+        await session_store.revoke_user(user_id)
+    elif token:
+        await session_store.revoke(token)
+    redirect_response = RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
+    redirect_response.delete_cookie(SESSION_COOKIE)
+    # Cookie JWT cũ (không còn được chấp nhận), xoá cho sạch
+    redirect_response.delete_cookie("user_token")
+    return redirect_response
+
 from fastapi import Form, status
 from fastapi.responses import RedirectResponse
 from fastapi.security import OAuth2AuthorizationCodeBearer
-from app.core.security import hash_password
 from app.models.user import User
 from fastapi import HTTPException
 
@@ -677,7 +548,7 @@ async def register_post(
             "error": "Email already registered"
         })
     # Hash password
-    hashed_password = hash_password(password)
+    hashed_password = await hash_password(password)
     # Create user
     user_data = {
         "email": email,
@@ -718,6 +589,7 @@ async def auth_google_callback(request: Request):
     
     # Kiểm tra hoặc tạo user
     existing_user = await User.collection.find_one({"email": user_info['email']})
+    user_id = str(existing_user["_id"]) if existing_user else None
     if not existing_user:
         user_data = {
             "email": user_info['email'],
@@ -726,11 +598,11 @@ async def auth_google_callback(request: Request):
             "auth_provider": "google",
             "status": "active",
         }
-        await User.create_user(user_data)
+        user_id = await User.create_user(user_data)
     
     # Tạo session và chuyển hướng
     response = RedirectResponse(url="/dashboard")
-    response.set_cookie(key="user_token", value=create_access_token(user_info['email']))
+    await _start_session(request, response, user_id, user_info['email'])
     return response
 
 @router.get("/auth/discord")
@@ -750,6 +622,7 @@ async def auth_discord_callback(request: Request):
     
     # Kiểm tra hoặc tạo user
     existing_user = await User.collection.find_one({"email": user_info['email']})
+    user_id = str(existing_user["_id"]) if existing_user else None
     if not existing_user:
         user_data = {
             "email": user_info['email'],
@@ -758,11 +631,11 @@ async def auth_discord_callback(request: Request):
             "auth_provider": "discord",
             "status": "active",
         }
-        await User.create_user(user_data)
+        user_id = await User.create_user(user_data)
     
     # Tạo session và chuyển hướng
     response = RedirectResponse(url="/dashboard")
-    response.set_cookie(key="user_token", value=create_access_token(user_info['email']))
+    await _start_session(request, response, user_id, user_info['email'])
     return response
 
 @router.get("/auth/twitter")
@@ -782,6 +655,7 @@ async def auth_twitter_callback(request: Request):
     
     # Kiểm tra hoặc tạo user
     existing_user = await User.collection.find_one({"email": user_info.get('email')})
+    user_id = str(existing_user["_id"]) if existing_user else None
     if not existing_user and user_info.get('email'):
         user_data = {
             "email": user_info['email'],
@@ -790,11 +664,11 @@ async def auth_twitter_callback(request: Request):
             "auth_provider": "twitter",
             "status": "active",
         }
-        await User.create_user(user_data)
+        user_id = await User.create_user(user_data)
     
     # Tạo session và chuyển hướng
     response = RedirectResponse(url="/dashboard")
-    response.set_cookie(key="user_token", value=create_access_token(user_info.get('email')))
+    await _start_session(request, response, user_id, user_info.get('email'))
     return response
 
 @router.get("/auth/telegram")
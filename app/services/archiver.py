@@ -0,0 +1,64 @@
+'''
+Moves old, finished rows from a hot collection into its archive collection.
+
+`move_to_archive` works oldest first in batches: it copies a batch into
+the archive with an unordered insert_many, then deletes the same ids from
+the hot collection. A pass interrupted between the two steps is picked up
+by the next one: the copy is repeated (duplicate keys in the archive are
+ignored) and the delete completes, so passes are resumable and never lose
+a row. Until the delete lands a row exists in both collections; readers
+over both (fetch_page_merged, Transaction._with_archive) drop the copy.
+
+Order.archive_finished_orders and Transaction.archive_settled_transactions
+run it as sweeper jobs, a bounded number of batches per tick; history
+reads merge the hot and archive collections (see
+app.core.pagination.fetch_page_merged), so archived rows stay visible.
+
+Usage:
+
+    moved = await move_to_archive(
+        Order.collection, Order.archive_collection,
+        {'status': {'$in': ['completed', 'failed']}, 'created_at': {'$lt': cutoff}},
+        sort_field='created_at'
+    )
+'''
+import logging
+from typing import Optional
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+async def move_to_archive(
+    source,
+    target,
+    query: dict,
+    sort_field: str,
+    batch_size: int = 1000,
+    max_batches: Optional[int] = None
+) -> int:
+    """Move rows matching `query` from source to target; returns rows moved"""
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        cursor = source.find(query).sort(sort_field, 1).limit(batch_size)
+        docs = [doc async for doc in cursor]
+        if not docs:
+            break
+        try:
+            await target.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Rows copied by an interrupted earlier pass are already there
+            errors = [err for err in e.details.get('writeErrors', []) if err.get('code') != DUPLICATE_KEY]
+            if errors:
+                raise
+        result = await source.delete_many({'_id': {'$in': [doc['_id'] for doc in docs]}})
+        moved += result.deleted_count
+        batches += 1
+        if len(docs) < batch_size:
+            break
+    if moved:
+        logger.info(f"Archived {moved} rows from {source.name} into {target.name}")
+    return moved
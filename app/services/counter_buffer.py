@@ -0,0 +1,192 @@
+'''
+Write-combining buffer for $inc counters.
+
+Hot counters (service popularity, project API calls, usage meters) are
+incremented on the request path. Instead of one update_one per increment,
+`CounterBuffer.add` merges increments per target document in memory, and
+the buffer writes them as a single bulk_write every `flush_interval_ms`
+or as soon as `max_updates` increments are pending, whichever comes first.
+
+Every buffer registers itself; main.py starts them all on startup and
+flushes them on shutdown. `lag` reports how long the oldest unflushed
+increment has been waiting.
+
+Usage:
+
+    popularity_counter = CounterBuffer('service_popularity', lambda: Service.collection)
+    popularity_counter.add({'_id': ObjectId(service_id)}, {'popularity': 0.1})
+'''
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+FilterKey = Tuple[Tuple[str, object], ...]
+
+
+class CounterBuffer:
+    instances: List['CounterBuffer'] = []
+
+    def __init__(
+        self,
+        name: str,
+        collection: Callable[[], object],
+        flush_interval_ms: int = None,
+        max_updates: int = None,
+        upsert: bool = False,
+        touch_field: Optional[str] = None
+    ):
+        """
+        :param collection: Callable returning the target collection, resolved
+            at flush time so models re-pointed at another database are honoured.
+        :param upsert: Create missing documents (pre-aggregated buckets).
+        :param touch_field: Field set to the flush time on every written document.
+        """
+        self.name = name
+        self.collection = collection
+        self.flush_interval = (flush_interval_ms or settings.counter_flush_interval_ms) / 1000
+        self.max_updates = max_updates or settings.counter_flush_max_updates
+        self.upsert = upsert
+        self.touch_field = touch_field
+        self._pending: Dict[FilterKey, Dict[str, float]] = {}
+        self._set_on_insert: Dict[FilterKey, dict] = {}
+        self._pending_updates = 0
+        self._oldest: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self.flushed_updates = 0
+        self.flushed_writes = 0
+        CounterBuffer.instances.append(self)
+
+    def add(self, filter: dict, increments: Dict[str, float], set_on_insert: dict = None) -> None:
+        """Merge increments for the document matching `filter`"""
+        key = tuple(sorted(filter.items()))
+        fields = self._pending.setdefault(key, {})
+        for field, amount in increments.items():
+            fields[field] = fields.get(field, 0) + amount
+        if set_on_insert and key not in self._set_on_insert:
+            self._set_on_insert[key] = set_on_insert
+        self._pending_updates += 1
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        if self._pending_updates >= self.max_updates:
+            self._schedule_flush()
+
+    @property
+    def lag(self) -> float:
+        """Seconds the oldest unflushed increment has been waiting"""
+        return time.monotonic() - self._oldest if self._oldest is not None else 0.0
+
+    def stats(self) -> dict:
+        return {
+            'name': self.name,
+            'pending_documents': len(self._pending),
+            'pending_updates': self._pending_updates,
+            'lag_seconds': round(self.lag, 3),
+            'flushed_updates': self.flushed_updates,
+            'flushed_writes': self.flushed_writes
+        }
+
+    def _schedule_flush(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._safe_flush())
+
+    async def _safe_flush(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Counter buffer {self.name} flush failed: {str(e)}")
+
+    def _requeue(self, pending: Dict[FilterKey, Dict[str, float]], set_on_insert: dict, updates: int) -> None:
+        """Merge unwritten increments back so they are retried on the next flush"""
+        for key, increments in pending.items():
+            fields = self._pending.setdefault(key, {})
+            for field, amount in increments.items():
+                fields[field] = fields.get(field, 0) + amount
+            if key in set_on_insert:
+                self._set_on_insert.setdefault(key, set_on_insert[key])
+        self._pending_updates += updates
+        if pending and self._oldest is None:
+            self._oldest = time.monotonic()
+
+    async def flush(self) -> int:
+        """Write all pending increments in one bulk_write; returns documents written"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        set_on_insert, self._set_on_insert = self._set_on_insert, {}
+        updates, self._pending_updates = self._pending_updates, 0
+        self._oldest = None
+
+        now = datetime.now()
+        operations = []
+        for key, increments in pending.items():
+            update = {'$inc': increments}
+            if self.touch_field:
+                update['$set'] = {self.touch_field: now}
+            if key in set_on_insert:
+                update['$setOnInsert'] = set_on_insert[key]
+            operations.append(UpdateOne(dict(key), update, upsert=self.upsert))
+        try:
+            await self.collection().bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: every op not listed in writeErrors has been applied,
+            # so only the failed ones go back for the next flush
+            keys = list(pending)
+            failed = {error['index'] for error in e.details.get('writeErrors', [])}
+            self._requeue(
+                {keys[i]: pending[keys[i]] for i in failed},
+                set_on_insert,
+                len(failed)
+            )
+            self.flushed_updates += updates - len(failed)
+            self.flushed_writes += len(operations) - len(failed)
+            raise
+        except Exception:
+            # Nothing known to be applied: merge everything back
+            self._requeue(pending, set_on_insert, updates)
+            raise
+        self.flushed_updates += updates
+        self.flushed_writes += len(operations)
+        return len(operations)
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._safe_flush()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._safe_flush()
+
+    @classmethod
+    def start_all(cls) -> None:
+        for buffer in cls.instances:
+            buffer.start()
+
+    @classmethod
+    async def stop_all(cls) -> None:
+        for buffer in cls.instances:
+            await buffer.stop()
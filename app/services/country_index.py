@@ -0,0 +1,174 @@
+'''
+In-memory prefix index over active countries for the country picker.
+
+Keys are the lowercase country name, each word of the name, the ISO code
+and the phone code (with and without "+"). They are kept in one sorted
+list, so a prefix lookup is two bisections and never touches MongoDB.
+
+The index is rebuilt:
+- on startup (`start`),
+- right after Country write methods (`invalidate`),
+- on every change of the `countries` collection when a change stream is
+  available (replica set), otherwise every `country_index_refresh_seconds`.
+  A stream that breaks (network, failover) is reopened with backoff.
+
+Usage:
+
+    from app.services.country_index import country_index
+    country_index.search("viet")   # [{'name': 'Vietnam', 'code': 'VN', ...}]
+'''
+import asyncio
+import logging
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from pymongo.errors import OperationFailure
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Fields copied from country documents into the index
+COUNTRY_FIELDS = {'name': 1, 'code': 1, 'phone_code': 1, 'flag_icon': 1}
+
+# "$changeStream is only supported on replica sets"
+CHANGE_STREAM_UNSUPPORTED = 40573
+
+# Rank of a match kind; lower sorts first
+EXACT, CODE, NAME, WORD, PHONE = range(5)
+
+
+class CountryPrefixIndex:
+    def __init__(self, refresh_seconds: int = None):
+        self.refresh_seconds = refresh_seconds or settings.country_index_refresh_seconds
+        self._keys: List[str] = []
+        self._entries: List[Tuple[int, str]] = []
+        self._countries: Dict[str, dict] = {}
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._rebuild_again = False
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _index_keys(country: dict) -> List[Tuple[str, int]]:
+        name = (country.get('name') or '').lower()
+        code = (country.get('code') or '').lower()
+        phone = (country.get('phone_code') or '').lstrip('+')
+        keys = [(name, NAME)]
+        keys += [(word, WORD) for word in name.split()[1:]]
+        if code:
+            keys.append((code, CODE))
+        if phone:
+            keys += [(phone, PHONE), ('+' + phone, PHONE)]
+        return keys
+
+    def load(self, countries: List[dict]) -> None:
+        """Replace the index contents (swapped in one assignment)"""
+        by_id = {}
+        pairs = []
+        for country in countries:
+            country_id = str(country['_id'])
+            by_id[country_id] = {
+                'id': country_id,
+                'name': country.get('name'),
+                'code': country.get('code'),
+                'phone_code': country.get('phone_code'),
+                'flag_icon': country.get('flag_icon')
+            }
+            pairs += [(key, (kind, country_id)) for key, kind in self._index_keys(country)]
+        pairs.sort()
+        self._keys, self._entries, self._countries = (
+            [key for key, _ in pairs],
+            [entry for _, entry in pairs],
+            by_id
+        )
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Countries whose name, a name word, code or phone code starts with query"""
+        q = (query or '').strip().lower()
+        if not q:
+            return []
+        lo = bisect_left(self._keys, q)
+        hi = bisect_right(self._keys, q + '\uffff')
+
+        best: Dict[str, int] = {}
+        for i in range(lo, hi):
+            kind, country_id = self._entries[i]
+            rank = EXACT if self._keys[i] == q else kind
+            if rank < best.get(country_id, PHONE + 1):
+                best[country_id] = rank
+        ranked = sorted(best, key=lambda cid: (best[cid], self._countries[cid]['name'] or ''))
+        return [self._countries[cid] for cid in ranked[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._countries)
+
+    async def rebuild(self) -> None:
+        from app.models.country import Country
+        countries = [c async for c in Country.collection.find({'is_active': True}, COUNTRY_FIELDS)]
+        self.load(countries)
+        logger.info(f"Country index rebuilt with {len(countries)} countries")
+
+    def invalidate(self) -> None:
+        """Schedule a rebuild; lookups keep using the current index meanwhile"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._rebuild_task is None or self._rebuild_task.done():
+            self._rebuild_task = loop.create_task(self._safe_rebuild())
+        else:
+            # The running rebuild may have read the collection already
+            self._rebuild_again = True
+
+    async def _safe_rebuild(self) -> None:
+        while True:
+            self._rebuild_again = False
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.error(f"Country index rebuild failed: {str(e)}")
+            if not self._rebuild_again:
+                break
+
+    async def _watch(self) -> None:
+        from app.models.country import Country
+        delay = 1
+        while True:
+            try:
+                async with Country.collection.watch() as stream:
+                    async for _ in stream:
+                        delay = 1
+                        await self._safe_rebuild()
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_UNSUPPORTED:
+                    # Change streams need a replica set; poll instead
+                    logger.info("Country change stream unavailable, polling instead")
+                    break
+                logger.error(f"Country change stream failed: {str(e)}")
+            except Exception as e:
+                logger.error(f"Country change stream failed: {str(e)}")
+            # Reopen with backoff; changes made meanwhile are picked up by the rebuild
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.refresh_seconds)
+            await self._safe_rebuild()
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self._safe_rebuild()
+
+    async def start(self) -> None:
+        await self._safe_rebuild()
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        for task in (self._watch_task, self._rebuild_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._watch_task = self._rebuild_task = None
+
+
+country_index = CountryPrefixIndex()
@@ -0,0 +1,137 @@
+'''
+Rendered fragment cache and conditional (ETag / 304) page responses.
+
+The service grid and the country list are the same HTML for every
+visitor until the catalog changes, so they live in partials
+(app/views/user/partials/) that are rendered once per catalog version
+and dropped into the pages as `{{ fragments.service_grid }}` /
+`{{ fragments.country_list }}`.
+
+Cache keys are (catalog version, template revisions):
+
+- the catalog version is a content hash of the catalog rows, computed
+  by PageContextProvider when it loads them, so a catalog change (or a
+  page_context.invalidate_catalog() after an admin write) yields a new
+  version and the old fragments are simply never looked up again,
+- a template revision is the file's mtime and size, so editing a
+  template is picked up without a restart.
+
+Whole pages get a strong ETag built from the same inputs plus the
+signed-in user and the per-user part of the context (project name). A
+browser sending it back in If-None-Match gets an empty 304 instead of
+the page.
+
+Usage:
+
+    from app.services.fragment_cache import render_page
+    context = await page_context.get(request, user_id)
+    return render_page(templates, request, "user/account/homepage.html", context)
+'''
+import hashlib
+import os
+from typing import Dict, Iterable, Tuple
+
+from markupsafe import Markup
+from starlette.responses import Response
+
+from app.core.auth import user_id_for
+from app.core.templating import VIEWS_DIR
+
+FRAGMENTS = {
+    "service_grid": "user/partials/service_grid.html",
+    "country_list": "user/partials/country_list.html",
+}
+# Pages revalidate on every load; per-user context keeps them out of shared caches
+PAGE_CACHE_CONTROL = "private, no-cache"
+
+
+def template_revision(name: str, directory: str = VIEWS_DIR) -> str:
+    """mtime + size of a template file, '' if it does not exist"""
+    try:
+        st = os.stat(os.path.join(directory, name))
+    except OSError:
+        return ""
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def catalog_version(services: Iterable, countries: Iterable) -> str:
+    """Content hash of the catalog rows the fragments are rendered from"""
+    digest = hashlib.sha1()
+    for row in list(services) + list(countries):
+        digest.update(repr(sorted(row.to_dict().items())).encode())
+    return digest.hexdigest()[:16]
+
+
+class FragmentCache:
+    def __init__(self, fragments: Dict[str, str] = None, max_versions: int = 8):
+        self.fragments = fragments or FRAGMENTS
+        self.max_versions = max_versions
+        self._rendered: Dict[Tuple, Dict[str, Markup]] = {}
+        self.hits = 0
+        self.renders = 0
+
+    def revisions(self) -> Tuple[str, ...]:
+        return tuple(template_revision(t) for t in self.fragments.values())
+
+    def get(self, env, version: str, context: dict) -> Dict[str, Markup]:
+        """Rendered fragments for a catalog version, rendering them on a miss"""
+        key = (version, self.revisions())
+        rendered = self._rendered.get(key)
+        if rendered is not None:
+            self.hits += 1
+            return rendered
+        self.renders += 1
+        rendered = {
+            name: Markup(env.get_template(template).render(context))
+            for name, template in self.fragments.items()
+        }
+        if len(self._rendered) >= self.max_versions:
+            self._rendered.clear()
+        self._rendered[key] = rendered
+        return rendered
+
+    def invalidate(self) -> None:
+        self._rendered.clear()
+
+
+fragment_cache = FragmentCache()
+
+
+def page_etag(template_name: str, context: dict, user_id=None) -> str:
+    digest = hashlib.sha1()
+    parts = (
+        user_id,
+        template_name,
+        template_revision(template_name),
+        *fragment_cache.revisions(),
+        context.get("catalog_version", ""),
+        context.get("selected_project_name", ""),
+    )
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def render_page(templates, request, template_name: str, context: dict) -> Response:
+    """TemplateResponse with cached fragments, a strong ETag and 304 on a match"""
+    etag = page_etag(template_name, context, user_id_for(request))
+    headers = {"ETag": etag, "Cache-Control": PAGE_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if "catalog_version" in context:
+        context = {
+            **context,
+            "fragments": fragment_cache.get(templates.env, context["catalog_version"], context),
+        }
+    return templates.TemplateResponse(template_name, context, headers=headers)
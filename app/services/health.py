@@ -0,0 +1,141 @@
+'''
+Background liveness / latency monitor for the databases.
+
+Every `health_check_interval_seconds` each registered check is probed
+(with a timeout) and its state kept in memory: healthy flag, latency of
+the last probe, consecutive failures and the last error. A check turns
+unhealthy after `health_failure_threshold` consecutive failures and
+healthy again on the first success.
+
+Request handlers read `health_monitor.healthy` (a dict lookup) instead of
+pinging MongoDB themselves; `/health` serves `health_monitor.status()`.
+
+MongoDB is registered here. Other databases are added by whoever owns
+the connection, e.g. the MySQL pool of get_Campuchia_sms:
+
+    health_monitor.add_check('mysql', mysql_ping, required=False)
+
+Checks with required=False are reported but do not flip `healthy`.
+'''
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HealthCheck:
+    def __init__(self, name: str, probe: Callable[[], Awaitable[object]], required: bool = True):
+        self.name = name
+        self.probe = probe
+        self.required = required
+        # None until the first probe has run
+        self.healthy: Optional[bool] = None
+        self.latency_ms: Optional[float] = None
+        self.consecutive_failures = 0
+        self.last_checked: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            'healthy': self.healthy,
+            'required': self.required,
+            'latency_ms': self.latency_ms,
+            'consecutive_failures': self.consecutive_failures,
+            'last_checked': self.last_checked.isoformat() if self.last_checked else None,
+            'last_error': self.last_error
+        }
+
+
+class HealthMonitor:
+    def __init__(
+        self,
+        interval_seconds: float = None,
+        timeout_seconds: float = None,
+        failure_threshold: int = None
+    ):
+        self.interval = interval_seconds or settings.health_check_interval_seconds
+        self.timeout = timeout_seconds or settings.health_check_timeout_seconds
+        self.failure_threshold = failure_threshold or settings.health_failure_threshold
+        self.checks: Dict[str, HealthCheck] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add_check(self, name: str, probe: Callable[[], Awaitable[object]], required: bool = True) -> None:
+        self.checks[name] = HealthCheck(name, probe, required)
+
+    def remove_check(self, name: str) -> None:
+        self.checks.pop(name, None)
+
+    @property
+    def healthy(self) -> bool:
+        """False once a required check has failed failure_threshold times in a row"""
+        return all(c.healthy is not False for c in self.checks.values() if c.required)
+
+    def is_healthy(self, name: str) -> bool:
+        check = self.checks.get(name)
+        return check is not None and check.healthy is not False
+
+    async def _probe(self, check: HealthCheck) -> None:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(check.probe(), self.timeout)
+        except Exception as e:
+            check.consecutive_failures += 1
+            check.last_error = str(e) or type(e).__name__
+            if check.consecutive_failures >= self.failure_threshold and check.healthy is not False:
+                logger.error(f"Health check {check.name} failing: {check.last_error}")
+                check.healthy = False
+        else:
+            if check.healthy is False:
+                logger.info(f"Health check {check.name} recovered")
+            check.healthy = True
+            check.consecutive_failures = 0
+            check.last_error = None
+        check.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        check.last_checked = datetime.now()
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self._probe(c) for c in list(self.checks.values())))
+
+    def status(self) -> dict:
+        return {
+            'healthy': self.healthy,
+            'checks': {name: check.to_dict() for name, check in self.checks.items()}
+        }
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check_all()
+            except Exception as e:
+                logger.error(f"Health monitor tick failed: {str(e)}")
+
+    async def start(self) -> None:
+        """Probe once (so state is known before serving), then keep probing"""
+        await self.check_all()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+async def ping_mongo() -> None:
+    # The client behind the `db` every model queries through
+    from app.config.database import db
+    await db.client.admin.command('ping')
+
+
+health_monitor = HealthMonitor()
+health_monitor.add_check('mongo', ping_mongo)
@@ -0,0 +1,194 @@
+'''
+Contention-free phone number allocation.
+
+Every phone number carries a random `alloc_key` in [0, 1). Instead of all
+buyers racing for the first matching document of a (service, country), each
+worker:
+
+1. serves buyers from a small batch of numbers it has pre-claimed with a
+   lease (`lease_owner` / `lease_expires`), so the final `is_used` write only
+   touches documents nobody else is competing for;
+2. refills that batch starting at a random `alloc_key`, so different workers
+   claim from different parts of the index;
+3. falls back to a direct randomized scan when no batch can be claimed.
+
+Leases that are not consumed expire on their own, so a crashed worker never
+keeps numbers out of circulation for longer than `lease_seconds`.
+
+Usage:
+
+    from app.services.number_allocator import number_allocator
+    phone = await number_allocator.allocate(service_id, country_id)
+'''
+import asyncio
+import os
+import random
+import socket
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+from app.config.settings import settings
+from app.models.phone_number import PhoneNumber, PhoneNumberStatus
+
+
+def _lease_free(now: datetime) -> dict:
+    return {'$or': [
+        {'lease_expires': None},
+        {'lease_expires': {'$lt': now}}
+    ]}
+
+
+class NumberAllocator:
+    def __init__(
+        self,
+        collection=None,
+        batch_size: int = None,
+        lease_seconds: int = None,
+        worker_id: str = None
+    ):
+        # None means PhoneNumber.collection, resolved per call so that code
+        # re-pointing the model at another database is honoured.
+        self._collection = collection
+        self.batch_size = batch_size or settings.allocation_batch_size
+        self.lease = timedelta(seconds=lease_seconds or settings.allocation_lease_seconds)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._batches: Dict[Tuple[str, str], Deque[Tuple[ObjectId, datetime]]] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    @property
+    def collection(self):
+        return self._collection if self._collection is not None else PhoneNumber.collection
+
+    @staticmethod
+    def _base_query(service_id: str, country_id: str, now: datetime) -> dict:
+        return {
+            'service_id': ObjectId(service_id),
+            'country_id': ObjectId(country_id),
+            'is_used': False,
+            'status': PhoneNumberStatus.ACTIVE.value,
+            'expiration_time': {'$gt': now}
+        }
+
+    async def allocate(self, service_id: str, country_id: str) -> Optional[dict]:
+        """Mark an available number as used and return it, or None"""
+        key = (str(service_id), str(country_id))
+
+        phone = await self._take_from_batch(key)
+        if phone:
+            return phone
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another buyer may have refilled while we waited
+            if not self._batches.get(key):
+                await self._refill(key)
+        phone = await self._take_from_batch(key)
+        if phone:
+            return phone
+
+        return await self._fallback_scan(*key)
+
+    async def _take_from_batch(self, key: Tuple[str, str]) -> Optional[dict]:
+        batch = self._batches.get(key)
+        while batch:
+            number_id, lease_expires = batch.popleft()
+            now = datetime.now()
+            if lease_expires <= now:
+                continue
+            phone = await self.collection.find_one_and_update(
+                {
+                    '_id': number_id,
+                    'lease_owner': self.worker_id,
+                    'is_used': False
+                },
+                {
+                    '$set': {'is_used': True, 'updated_at': now},
+                    '$unset': {'lease_owner': '', 'lease_expires': ''}
+                },
+                return_document=ReturnDocument.AFTER
+            )
+            if phone:
+                return phone
+        return None
+
+    async def _candidate_ids(self, query: dict, start: float, limit: int) -> list:
+        """Ids of up to `limit` numbers from a random point of the key space"""
+        ids = []
+        for key_range in ({'$gte': start}, {'$lt': start}):
+            cursor = self.collection.find(
+                {**query, 'alloc_key': key_range},
+                {'_id': 1}
+            ).sort('alloc_key', 1).limit(limit - len(ids))
+            async for doc in cursor:
+                ids.append(doc['_id'])
+            if len(ids) >= limit:
+                break
+        return ids
+
+    async def _refill(self, key: Tuple[str, str]) -> None:
+        """Claim a batch of numbers for this worker with a lease"""
+        now = datetime.now()
+        lease_expires = now + self.lease
+        query = {**self._base_query(*key, now), **_lease_free(now)}
+
+        candidates = await self._candidate_ids(query, random.random(), self.batch_size)
+        if not candidates:
+            return
+
+        # The lease filter is repeated so that numbers claimed by another
+        # worker between the read and this write are skipped, not stolen.
+        await self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {'_id': number_id, **query},
+                    {'$set': {'lease_owner': self.worker_id, 'lease_expires': lease_expires}}
+                )
+                for number_id in candidates
+            ],
+            ordered=False
+        )
+        batch = self._batches.setdefault(key, deque())
+        cursor = self.collection.find(
+            {'_id': {'$in': candidates}, 'lease_owner': self.worker_id, 'lease_expires': lease_expires},
+            {'_id': 1}
+        )
+        async for doc in cursor:
+            batch.append((doc['_id'], lease_expires))
+
+    async def _fallback_scan(self, service_id: str, country_id: str) -> Optional[dict]:
+        """Allocate directly, starting at a random point of the key space"""
+        now = datetime.now()
+        query = {**self._base_query(service_id, country_id, now), **_lease_free(now)}
+        start = random.random()
+        for key_range in ({'$gte': start}, {'$lt': start}):
+            phone = await self.collection.find_one_and_update(
+                {**query, 'alloc_key': key_range},
+                {'$set': {'is_used': True, 'updated_at': now}},
+                sort=[('alloc_key', 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if phone:
+                return phone
+        # Numbers created before alloc_key existed
+        return await self.collection.find_one_and_update(
+            {**query, 'alloc_key': None},
+            {'$set': {'is_used': True, 'updated_at': now}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def release_leases(self) -> int:
+        """Give back every number still leased by this worker"""
+        self._batches.clear()
+        result = await self.collection.update_many(
+            {'lease_owner': self.worker_id},
+            {'$unset': {'lease_owner': '', 'lease_expires': ''}}
+        )
+        return result.modified_count
+
+
+number_allocator = NumberAllocator()
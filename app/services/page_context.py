@@ -0,0 +1,116 @@
+'''
+Shared template context for the user page routes.
+
+Every page renders the same top-20 services, the active countries and
+the name of the user's first project. PageContextProvider keeps those in
+a short-TTL cache (settings.page_context_ttl_seconds): the catalog is
+shared by all users, the project name is cached per user. On a miss,
+concurrent requests for the same key wait on one load instead of each
+querying MongoDB (single flight), so an expiry under load costs one
+round trip per key, not one per request.
+
+The catalog entry also carries `catalog_version`, a hash of its rows,
+which keys the rendered fragments and page ETags (see
+app/services/fragment_cache.py). Writes that change what the pages show
+invalidate the affected entry so the next request reloads it right away:
+Country writes and the service stats refresh call invalidate_catalog(),
+Project create / update / delete call invalidate_user(). Other writes
+(e.g. services edited directly in MongoDB) show up within
+page_context_ttl_seconds.
+
+Usage:
+
+    from app.services.page_context import page_context
+    context = await page_context.get(request, user_id)
+    return render_page(templates, request, "user/account/homepage.html", context)
+'''
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from app.config.settings import settings
+from app.services.fragment_cache import catalog_version
+
+DEFAULT_PROJECT_NAME = "My Verification Project"
+CATALOG_KEY = 'catalog'
+
+
+class SingleFlightCache:
+    """TTL cache where concurrent misses on one key share a single load"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10000):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.loads = 0
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # A cancelled waiter must not cancel the load the others wait on
+        return await asyncio.shield(future)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        self.loads += 1
+        value = await loader()
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+
+class PageContextProvider:
+    def __init__(self, ttl_seconds: float = None):
+        self.cache = SingleFlightCache(ttl_seconds or settings.page_context_ttl_seconds)
+
+    async def _load_catalog(self) -> dict:
+        from app.models.country import Country
+        from app.models.service import Service
+        services, countries = await asyncio.gather(
+            Service.list_services(limit=20),
+            Country.list_active_countries()
+        )
+        return {
+            "services": services,
+            "total_services": len(services),
+            "countries": countries,
+            "total_countries": len(countries),
+            "catalog_version": catalog_version(services, countries)
+        }
+
+    async def _load_project_name(self, user_id) -> str:
+        from app.models.project import Project
+        user_projects = await Project.get_user_projects(user_id)
+        return user_projects[0].name if user_projects else DEFAULT_PROJECT_NAME
+
+    async def get(self, request, user_id) -> dict:
+        """Template context with catalog and project name (cached)"""
+        catalog = await self.cache.get(CATALOG_KEY, self._load_catalog)
+        project_name = await self.cache.get(
+            ('project', str(user_id)), lambda: self._load_project_name(user_id)
+        )
+        return {"request": request, **catalog, "selected_project_name": project_name}
+
+    def invalidate_catalog(self) -> None:
+        self.cache.invalidate(CATALOG_KEY)
+
+    def invalidate_user(self, user_id) -> None:
+        self.cache.invalidate(('project', str(user_id)))
+
+
+page_context = PageContextProvider()
@@ -0,0 +1,210 @@
+'''
+Streaming CSV / JSONL import and export of the pricing matrix.
+
+Import reads the file one row at a time, validates each row through
+PricingSchema (and BulkDiscount for the tiers), and upserts valid rows
+keyed by (country_id, service_id) with one bulk_write per `batch_size`
+rows. Invalid rows are reported with their line number and do not stop
+the import. Memory stays constant whatever the file size: at most one
+batch and `max_errors` error entries are held at a time.
+
+Export streams the collection sorted by (country_id, service_id) with a
+projection, writing rows as they arrive.
+
+CSV columns: country_id, service_id, base_price, current_price,
+bulk_discounts. bulk_discounts is written as "min_quantity:price_per"
+pairs separated by ";", e.g. "100:0.08;500:0.06". JSONL rows carry the
+same keys with bulk_discounts as a list of objects.
+
+Usage (see scripts/pricing_io.py):
+
+    with open('pricing.csv', newline='') as f:
+        report = await import_pricing(f, 'csv')
+    with open('pricing.jsonl', 'w') as f:
+        await export_pricing(f, 'jsonl')
+'''
+import csv
+import json
+from datetime import datetime
+from typing import IO, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo import UpdateOne
+
+from app.models.pricing import Pricing, PricingSchema
+
+FORMATS = ('csv', 'jsonl')
+CSV_COLUMNS = ['country_id', 'service_id', 'base_price', 'current_price', 'bulk_discounts']
+
+
+def format_for(path: str) -> str:
+    """Guess the format from a file name"""
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def parse_discounts(value: str) -> List[dict]:
+    """"100:0.08;500:0.06" -> [{'min_quantity': '100', 'price_per': '0.08'}, ...]"""
+    tiers = []
+    for part in (value or '').split(';'):
+        part = part.strip()
+        if not part:
+            continue
+        quantity, sep, price = part.partition(':')
+        if not sep:
+            raise ValueError(f"bulk_discounts: expected min_quantity:price_per, got {part!r}")
+        tiers.append({'min_quantity': quantity.strip(), 'price_per': price.strip()})
+    return tiers
+
+
+def format_discounts(tiers: List[dict]) -> str:
+    return ';'.join(f"{t['min_quantity']}:{t['price_per']}" for t in tiers or [])
+
+
+def _read_rows(stream: IO, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """(line number, raw row, parse error) for every data row of the file"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        missing = [c for c in CSV_COLUMNS[:4] if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Missing CSV columns: {', '.join(missing)}")
+        for row in reader:
+            try:
+                row['bulk_discounts'] = parse_discounts(row.get('bulk_discounts'))
+            except ValueError as e:
+                yield reader.line_num, None, str(e)
+                continue
+            yield reader.line_num, row, None
+    else:
+        for line_num, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_num, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield line_num, None, "Expected a JSON object"
+                continue
+            yield line_num, row, None
+
+
+def _validate(row: dict) -> PricingSchema:
+    for field in ('country_id', 'service_id'):
+        if not ObjectId.is_valid(str(row.get(field) or '')):
+            raise ValueError(f"{field}: not a valid ObjectId")
+    row = {k: v for k, v in row.items() if k in CSV_COLUMNS}
+    return PricingSchema(**row)
+
+
+def _error_message(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return '; '.join(
+            f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in exc.errors()
+        )
+    return str(exc)
+
+
+async def _write_batch(batch: dict) -> Tuple[int, int]:
+    now = datetime.now()
+    operations = [
+        UpdateOne(
+            {'country_id': ObjectId(p.country_id), 'service_id': ObjectId(p.service_id)},
+            {'$set': {
+                'base_price': p.base_price,
+                'current_price': p.current_price,
+                'bulk_discounts': [d.model_dump() for d in p.bulk_discounts],
+                'last_updated': now
+            }},
+            upsert=True
+        )
+        for p in batch.values()
+    ]
+    result = await Pricing.collection.bulk_write(operations, ordered=False)
+    return result.upserted_count, result.modified_count
+
+
+async def import_pricing(
+    stream: IO,
+    fmt: str = 'csv',
+    batch_size: int = 1000,
+    dry_run: bool = False,
+    max_errors: int = 1000
+) -> dict:
+    """Validate and upsert every row of a CSV / JSONL stream; returns a report"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    report = {'rows': 0, 'valid': 0, 'invalid': 0, 'inserted': 0, 'updated': 0,
+              'batches': 0, 'dry_run': dry_run, 'errors': []}
+    # Keyed by pair so a later row for the same pair wins inside a batch
+    batch = {}
+
+    async def flush():
+        if batch and not dry_run:
+            inserted, updated = await _write_batch(batch)
+            report['inserted'] += inserted
+            report['updated'] += updated
+            report['batches'] += 1
+        batch.clear()
+
+    try:
+        for line_num, row, error in _read_rows(stream, fmt):
+            report['rows'] += 1
+            if error is None:
+                try:
+                    pricing = _validate(row)
+                except (ValidationError, ValueError, TypeError) as e:
+                    error = _error_message(e)
+            if error is not None:
+                report['invalid'] += 1
+                if len(report['errors']) < max_errors:
+                    report['errors'].append({'line': line_num, 'error': error})
+                continue
+            report['valid'] += 1
+            batch[(pricing.country_id, pricing.service_id)] = pricing
+            if len(batch) >= batch_size:
+                await flush()
+        await flush()
+    finally:
+        if report['batches']:
+            Pricing.invalidate_prices()
+    report['errors_truncated'] = report['invalid'] > len(report['errors'])
+    return report
+
+
+async def export_pricing(
+    stream: IO,
+    fmt: str = 'csv',
+    query: Optional[dict] = None,
+    batch_size: int = 1000
+) -> int:
+    """Write pricing rows matching `query` to a CSV / JSONL stream; returns rows written"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    projection = {'_id': 0, 'country_id': 1, 'service_id': 1, 'base_price': 1,
+                  'current_price': 1, 'bulk_discounts': 1}
+    cursor = Pricing.collection.find(query or {}, projection).sort(
+        [('country_id', 1), ('service_id', 1)]
+    ).batch_size(batch_size)
+
+    writer = None
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(CSV_COLUMNS)
+    count = 0
+    async for doc in cursor:
+        row = {
+            'country_id': str(doc.get('country_id')),
+            'service_id': str(doc.get('service_id')),
+            'base_price': doc.get('base_price'),
+            'current_price': doc.get('current_price'),
+            'bulk_discounts': doc.get('bulk_discounts') or []
+        }
+        if writer:
+            row['bulk_discounts'] = format_discounts(row['bulk_discounts'])
+            writer.writerow([row[c] for c in CSV_COLUMNS])
+        else:
+            stream.write(json.dumps(row) + '\n')
+        count += 1
+    return count
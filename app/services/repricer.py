@@ -0,0 +1,199 @@
+'''
+Bulk repricing of the pricing matrix.
+
+A PriceChange targets every pricing row of a service, of a country, or of
+one (country, service) pair, and either sets a new base price or scales
+all prices by a multiplier:
+
+- base_price: base_price = new, current_price = max(current_price, new)
+- multiplier: base_price, current_price and every bulk discount price_per
+  are multiplied and rounded to PRICE_DECIMALS
+
+Changes are written as pipeline updates (`update` given as a list of
+stages), so `$max` / `$multiply` are evaluated by MongoDB against each
+row instead of being stored literally as they would be inside a plain
+`$set`. One UpdateMany per change, sent in ordered bulk_write batches of
+`reprice_batch_size`, so a full matrix update is a handful of round trips
+and later changes win over earlier ones for overlapping rows.
+
+`dry_run=True` streams the rows each change would touch and reports the
+old and new prices without writing anything. Each change is diffed
+against the stored prices, not against the result of earlier changes in
+the same call.
+
+After a write, cached prices of the affected service / country are
+dropped with Pricing.invalidate_prices.
+
+Usage:
+
+    from app.services.repricer import PriceChange, repricer
+    report = await repricer.apply(
+        [PriceChange(service_id=sid, base_price=0.25),
+         PriceChange(country_id=cid, multiplier=1.1)],
+        dry_run=True
+    )
+'''
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateMany
+
+from app.config.settings import settings
+from app.models.pricing import Pricing
+
+PRICE_DECIMALS = 4
+
+
+class PriceChange:
+    def __init__(
+        self,
+        service_id: Optional[str] = None,
+        country_id: Optional[str] = None,
+        base_price: Optional[float] = None,
+        multiplier: Optional[float] = None
+    ):
+        if not service_id and not country_id:
+            raise ValueError("service_id or country_id is required")
+        if (base_price is None) == (multiplier is None):
+            raise ValueError("Exactly one of base_price or multiplier is required")
+        if (base_price if base_price is not None else multiplier) <= 0:
+            raise ValueError("Prices and multipliers must be greater than 0")
+        self.service_id = str(service_id) if service_id else None
+        self.country_id = str(country_id) if country_id else None
+        self.base_price = base_price
+        self.multiplier = multiplier
+
+    def filter(self) -> dict:
+        query = {}
+        if self.service_id:
+            query['service_id'] = ObjectId(self.service_id)
+        if self.country_id:
+            query['country_id'] = ObjectId(self.country_id)
+        if self.base_price is not None:
+            # Rows already at this base price are left alone
+            query['base_price'] = {'$ne': self.base_price}
+        return query
+
+    def pipeline(self, now: datetime) -> List[dict]:
+        if self.base_price is not None:
+            return [{'$set': {
+                'base_price': self.base_price,
+                'current_price': {'$max': ['$current_price', self.base_price]},
+                'last_updated': now
+            }}]
+
+        def scaled(expr):
+            return {'$round': [{'$multiply': [expr, self.multiplier]}, PRICE_DECIMALS]}
+
+        return [{'$set': {
+            'base_price': scaled('$base_price'),
+            'current_price': scaled('$current_price'),
+            'bulk_discounts': {'$map': {
+                'input': {'$ifNull': ['$bulk_discounts', []]},
+                'as': 'd',
+                'in': {'min_quantity': '$$d.min_quantity', 'price_per': scaled('$$d.price_per')}
+            }},
+            'last_updated': now
+        }}]
+
+    def preview(self, row: dict) -> dict:
+        """New prices for a stored row, computed the way the pipeline does"""
+        if self.base_price is not None:
+            return {
+                'base_price': self.base_price,
+                'current_price': max(row.get('current_price', 0), self.base_price),
+                'bulk_discounts': row.get('bulk_discounts') or []
+            }
+        return {
+            'base_price': round(row['base_price'] * self.multiplier, PRICE_DECIMALS),
+            'current_price': round(row['current_price'] * self.multiplier, PRICE_DECIMALS),
+            'bulk_discounts': [
+                {'min_quantity': d['min_quantity'],
+                 'price_per': round(d['price_per'] * self.multiplier, PRICE_DECIMALS)}
+                for d in row.get('bulk_discounts') or []
+            ]
+        }
+
+    def describe(self) -> dict:
+        return {
+            'service_id': self.service_id,
+            'country_id': self.country_id,
+            'base_price': self.base_price,
+            'multiplier': self.multiplier
+        }
+
+
+class Repricer:
+    def __init__(self, batch_size: int = None):
+        self.batch_size = batch_size or settings.reprice_batch_size
+
+    async def apply(
+        self,
+        changes: Iterable[PriceChange],
+        dry_run: bool = False,
+        diff_limit: int = 100
+    ) -> dict:
+        """Apply (or preview) price changes; returns a report"""
+        changes = list(changes)
+        start = time.perf_counter()
+        if dry_run:
+            report = await self._diff(changes, diff_limit)
+        else:
+            report = await self._write(changes)
+        report['changes'] = len(changes)
+        report['dry_run'] = dry_run
+        report['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return report
+
+    async def _write(self, changes: List[PriceChange]) -> dict:
+        now = datetime.now()
+        matched = modified = batches = 0
+        try:
+            for i in range(0, len(changes), self.batch_size):
+                batch = changes[i:i + self.batch_size]
+                result = await Pricing.collection.bulk_write(
+                    [UpdateMany(c.filter(), c.pipeline(now)) for c in batch],
+                    ordered=True
+                )
+                matched += result.matched_count
+                modified += result.modified_count
+                batches += 1
+        finally:
+            # Also after a failed batch: earlier batches are already written
+            for change in changes:
+                Pricing.invalidate_prices(change.service_id, change.country_id)
+        return {'matched': matched, 'modified': modified, 'batches': batches}
+
+    async def _diff(self, changes: List[PriceChange], diff_limit: int) -> dict:
+        projection = {'country_id': 1, 'service_id': 1, 'base_price': 1,
+                      'current_price': 1, 'bulk_discounts': 1}
+        rows = []
+        matched = 0
+        for change in changes:
+            async for row in Pricing.collection.find(change.filter(), projection):
+                new = change.preview(row)
+                if (new['base_price'] == row.get('base_price')
+                        and new['current_price'] == row.get('current_price')
+                        and new['bulk_discounts'] == (row.get('bulk_discounts') or [])):
+                    continue
+                matched += 1
+                if len(rows) < diff_limit:
+                    rows.append({
+                        'pricing_id': str(row['_id']),
+                        'country_id': str(row.get('country_id')),
+                        'service_id': str(row.get('service_id')),
+                        'base_price': [row.get('base_price'), new['base_price']],
+                        'current_price': [row.get('current_price'), new['current_price']]
+                    })
+        return {
+            'matched': matched,
+            'modified': 0,
+            'rows': rows,
+            'truncated': matched > len(rows),
+            'plan': [c.describe() for c in changes]
+        }
+
+
+repricer = Repricer()
@@ -0,0 +1,156 @@
+'''
+In-memory snapshot of the service catalog behind /api/services.
+
+The snapshot is loaded with one projected query and kept for
+`services_snapshot_ttl_seconds`; concurrent requests during a reload wait
+on the same load (SingleFlightCache). From it, each sort order
+(popularity, price_asc, price_desc) is a precomputed list of rows with
+their sort keys, so a page is a bisect + slice, not a MongoDB query.
+Country-filtered views are derived from the full ones on first use and
+kept with the snapshot.
+
+Pagination is keyset on the sort key: the cursor carries the key of the
+last row, so it stays valid across snapshot reloads (rows are neither
+skipped nor repeated unless they changed position).
+
+Each snapshot has a `version` (content hash) used for the ETag of
+/api/services responses.
+
+Usage:
+
+    from app.services.service_catalog import service_catalog
+    page = await service_catalog.page('price_asc', country_id=cid, limit=20, cursor=token)
+    page['items'], page['next_cursor'], page['total']
+'''
+import base64
+import hashlib
+import json
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.config.settings import settings
+from app.core.pagination import MAX_PAGE_SIZE
+from app.models.service import Service, ServiceListItem
+from app.services.page_context import SingleFlightCache
+
+SNAPSHOT_KEY = 'services'
+SORTS = ('popularity', 'price_asc', 'price_desc')
+
+
+def _sort_key(sort_by: str, item: ServiceListItem) -> tuple:
+    if sort_by == 'popularity':
+        return (-(item.popularity or 0), item.id)
+    if sort_by == 'price_asc':
+        return (item.current_price or 0, item.id)
+    return (-(item.current_price or 0), item.id)
+
+
+def encode_cursor(sort_by: str, key: tuple) -> str:
+    payload = json.dumps({'s': sort_by, 'k': list(key)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(sort_by: str, token: str) -> tuple:
+    """
+    :raises ValueError: If the token is malformed or was issued for another sort.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        value, service_id = payload['k']
+        key = (float(value), str(service_id))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+    if payload.get('s') != sort_by:
+        raise ValueError("Cursor was issued for another sort order")
+    return key
+
+
+class CatalogSnapshot:
+    def __init__(self, items: List[ServiceListItem], countries_by_service: Dict[str, frozenset]):
+        self.items = items
+        self.countries_by_service = countries_by_service
+        self.known_countries = frozenset().union(*countries_by_service.values())
+        # (sort_by, country_id) -> (keys, items), both in sort order
+        self._views: Dict[Tuple[str, Optional[str]], Tuple[List[tuple], List[ServiceListItem]]] = {}
+        for sort_by in SORTS:
+            ordered = sorted(items, key=lambda item: _sort_key(sort_by, item))
+            self._views[(sort_by, None)] = ([_sort_key(sort_by, i) for i in ordered], ordered)
+        digest = hashlib.sha1()
+        for item in items:
+            digest.update(repr(sorted(item.to_dict().items())).encode())
+            digest.update(repr(sorted(countries_by_service.get(item.id, ()))).encode())
+        self.version = digest.hexdigest()[:16]
+
+    def view(self, sort_by: str, country_id: Optional[str] = None):
+        view = self._views.get((sort_by, country_id))
+        if view is None and country_id not in self.known_countries:
+            # Not cached: any valid ObjectId can be asked for
+            return [], []
+        if view is None:
+            keys, ordered = self._views[(sort_by, None)]
+            selected = [
+                (k, item) for k, item in zip(keys, ordered)
+                if country_id in self.countries_by_service.get(item.id, ())
+            ]
+            view = ([k for k, _ in selected], [item for _, item in selected])
+            self._views[(sort_by, country_id)] = view
+        return view
+
+
+class ServiceCatalog:
+    def __init__(self, ttl_seconds: float = None):
+        self.cache = SingleFlightCache(ttl_seconds or settings.services_snapshot_ttl_seconds)
+
+    async def _load(self) -> CatalogSnapshot:
+        projection = {**ServiceListItem.PROJECTION, 'available_countries': 1}
+        items, countries_by_service = [], {}
+        async for doc in Service.collection.find({}, projection):
+            item = ServiceListItem(doc)
+            items.append(item)
+            countries_by_service[item.id] = frozenset(
+                str(c) for c in doc.get('available_countries') or []
+            )
+        return CatalogSnapshot(items, countries_by_service)
+
+    async def snapshot(self) -> CatalogSnapshot:
+        return await self.cache.get(SNAPSHOT_KEY, self._load)
+
+    async def page(
+        self,
+        sort_by: str = 'popularity',
+        country_id: Optional[str] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> dict:
+        """
+        One page of the catalog in `sort_by` order.
+
+        :raises ValueError: On an unknown sort, bad country id or bad cursor.
+        """
+        if sort_by not in SORTS:
+            raise ValueError(f"Unknown sort_by {sort_by!r}, expected one of {', '.join(SORTS)}")
+        if country_id and not ObjectId.is_valid(country_id):
+            raise ValueError(f"Invalid country_id: {country_id}")
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        snapshot = await self.snapshot()
+        keys, ordered = snapshot.view(sort_by, country_id or None)
+        start = bisect_right(keys, decode_cursor(sort_by, cursor)) if cursor else 0
+        rows = ordered[start:start + limit]
+        next_cursor = None
+        if start + limit < len(ordered):
+            next_cursor = encode_cursor(sort_by, keys[start + limit - 1])
+        return {
+            'items': [row.to_dict() for row in rows],
+            'next_cursor': next_cursor,
+            'total': len(ordered),
+            'version': snapshot.version
+        }
+
+    def invalidate(self) -> None:
+        self.cache.invalidate(SNAPSHOT_KEY)
+
+
+service_catalog = ServiceCatalog()
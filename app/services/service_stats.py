@@ -0,0 +1,269 @@
+'''
+Sliding-window success-rate and time-to-code statistics for services.
+
+Request handlers only call `service_stats.record(...)`, which updates
+in-memory per-minute counters for the service and for the
+(service, country) pair; nothing touches MongoDB on the request path.
+
+Every `stats_flush_seconds` the engine:
+1. merges the minute deltas of this worker into the shared `service_stats`
+   collection with one bulk_write of $inc upserts (all workers add into
+   the same minute documents, so nothing is lost between processes);
+2. re-reads the last `stats_window_minutes` of minute documents and writes
+   each service's success_rate and time-to-code percentiles back to
+   `services` with one bulk_write, then invalidates the cached catalog
+   (page context and /api/services snapshot).
+
+Minute documents expire through a TTL index once they leave the window.
+
+Usage:
+
+    from app.services.service_stats import service_stats
+    service_stats.record(service_id, country_id, success=True, time_to_code=23.5)
+    service_stats.snapshot(service_id)   # this worker's live window
+'''
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.config.database import db
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Time-to-code samples kept per minute document
+MAX_SAMPLES_PER_MINUTE = 100
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _minute(ts: datetime) -> datetime:
+    return ts.replace(second=0, microsecond=0)
+
+
+class _Bucket:
+    __slots__ = ('success', 'total', 'samples')
+
+    def __init__(self):
+        self.success = 0
+        self.total = 0
+        self.samples: List[float] = []
+
+    def add(self, success: bool, time_to_code: Optional[float]) -> None:
+        self.total += 1
+        if success:
+            self.success += 1
+        if time_to_code is not None and len(self.samples) < MAX_SAMPLES_PER_MINUTE:
+            self.samples.append(time_to_code)
+
+
+# (service_id, country_id or None)
+StatsKey = Tuple[str, Optional[str]]
+
+
+class ServiceStatsEngine:
+    def __init__(self, window_minutes: int = None, flush_seconds: float = None):
+        self.window = timedelta(minutes=window_minutes or settings.stats_window_minutes)
+        self.flush_seconds = flush_seconds or settings.stats_flush_seconds
+        self.collection = db['service_stats']
+        # Live window of this worker, for snapshot()
+        self._window: Dict[StatsKey, Dict[datetime, _Bucket]] = defaultdict(dict)
+        # Deltas not yet merged into MongoDB
+        self._pending: Dict[Tuple[StatsKey, datetime], _Bucket] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(
+        self,
+        service_id: str,
+        country_id: Optional[str] = None,
+        success: bool = True,
+        time_to_code: Optional[float] = None
+    ) -> None:
+        """Count one outcome (and its time to code in seconds, if known)"""
+        minute = _minute(datetime.now())
+        keys = [(str(service_id), None)]
+        if country_id:
+            keys.append((str(service_id), str(country_id)))
+        for key in keys:
+            self._window[key].setdefault(minute, _Bucket()).add(success, time_to_code)
+            self._pending.setdefault((key, minute), _Bucket()).add(success, time_to_code)
+
+    def _trim(self) -> None:
+        cutoff = _minute(datetime.now() - self.window)
+        for key in list(self._window):
+            buckets = self._window[key]
+            for minute in [m for m in buckets if m < cutoff]:
+                del buckets[minute]
+            if not buckets:
+                del self._window[key]
+
+    def snapshot(self, service_id: str, country_id: Optional[str] = None) -> dict:
+        """This worker's stats over the rolling window"""
+        self._trim()
+        buckets = self._window.get((str(service_id), str(country_id) if country_id else None), {})
+        success = sum(b.success for b in buckets.values())
+        total = sum(b.total for b in buckets.values())
+        samples = sorted(s for b in buckets.values() for s in b.samples)
+        result = {
+            'success': success,
+            'total': total,
+            'success_rate': success / total if total else None
+        }
+        for pct in PERCENTILES:
+            result[f'time_to_code_p{pct}'] = percentile(samples, pct)
+        return result
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index(
+            [('service_id', 1), ('country_id', 1), ('minute', 1)], unique=True
+        )
+        # Keep two windows so a late flush still lands in a live document
+        await self.collection.create_index(
+            'minute', expireAfterSeconds=int(self.window.total_seconds()) * 2
+        )
+
+    def _requeue(self, pending: Dict[Tuple[StatsKey, datetime], _Bucket]) -> None:
+        for key, bucket in pending.items():
+            current = self._pending.setdefault(key, _Bucket())
+            current.success += bucket.success
+            current.total += bucket.total
+            current.samples = (bucket.samples + current.samples)[:MAX_SAMPLES_PER_MINUTE]
+
+    async def flush(self) -> int:
+        """Merge pending deltas, then refresh services; returns deltas written"""
+        pending, self._pending = self._pending, {}
+        if pending:
+            operations = []
+            for ((service_id, country_id), minute), bucket in pending.items():
+                update = {'$inc': {'success': bucket.success, 'total': bucket.total}}
+                if bucket.samples:
+                    update['$push'] = {'samples': {
+                        '$each': bucket.samples, '$slice': -MAX_SAMPLES_PER_MINUTE
+                    }}
+                operations.append(UpdateOne(
+                    {
+                        'service_id': ObjectId(service_id),
+                        'country_id': ObjectId(country_id) if country_id else None,
+                        'minute': minute
+                    },
+                    update,
+                    upsert=True
+                ))
+            try:
+                await self.collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                # Unordered: ops missing from writeErrors were applied, retry only the rest
+                keys = list(pending)
+                self._requeue({
+                    keys[error['index']]: pending[keys[error['index']]]
+                    for error in e.details.get('writeErrors', [])
+                })
+                raise
+            except Exception:
+                # Put the deltas back so the next flush retries them
+                self._requeue(pending)
+                raise
+        await self.refresh_services()
+        return len(pending)
+
+    async def refresh_services(self) -> int:
+        """Write window success_rate and time-to-code percentiles to services"""
+        from app.models.service import Service
+        since = _minute(datetime.now() - self.window)
+        pipeline = [
+            {'$match': {'country_id': None, 'minute': {'$gte': since}}},
+            {'$group': {
+                '_id': '$service_id',
+                'success': {'$sum': '$success'},
+                'total': {'$sum': '$total'},
+                'samples': {'$push': '$samples'}
+            }}
+        ]
+        operations = []
+        async for row in self.collection.aggregate(pipeline):
+            if not row['total']:
+                continue
+            samples = sorted(s for chunk in row['samples'] if chunk for s in chunk)
+            updates = {
+                'success_rate': row['success'] / row['total'],
+                'stats_window_total': row['total'],
+                'stats_updated': datetime.now()
+            }
+            for pct in PERCENTILES:
+                updates[f'time_to_code_p{pct}'] = percentile(samples, pct)
+            operations.append(UpdateOne({'_id': row['_id']}, {'$set': updates}))
+        if operations:
+            await Service.collection.bulk_write(operations, ordered=False)
+            # Pages and /api/services show success_rate: reload them now
+            from app.services.page_context import page_context
+            from app.services.service_catalog import service_catalog
+            page_context.invalidate_catalog()
+            service_catalog.invalidate()
+        return len(operations)
+
+    async def get_country_stats(self, service_id: str) -> List[dict]:
+        """Window stats of a service per country, merged across workers"""
+        since = _minute(datetime.now() - self.window)
+        pipeline = [
+            {'$match': {
+                'service_id': ObjectId(service_id),
+                'country_id': {'$ne': None},
+                'minute': {'$gte': since}
+            }},
+            {'$group': {
+                '_id': '$country_id',
+                'success': {'$sum': '$success'},
+                'total': {'$sum': '$total'}
+            }}
+        ]
+        return [
+            {
+                'country_id': str(row['_id']),
+                'success': row['success'],
+                'total': row['total'],
+                'success_rate': row['success'] / row['total'] if row['total'] else None
+            }
+            async for row in self.collection.aggregate(pipeline)
+        ]
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Service stats flush failed: {str(e)}")
+            self._trim()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Final service stats flush failed: {str(e)}")
+
+
+service_stats = ServiceStatsEngine()
@@ -0,0 +1,284 @@
+'''
+Server-side login sessions.
+
+Login and the OAuth callbacks create a session and set an opaque random
+token in the `session_id` cookie. Only the SHA-256 of the token is
+stored, so a leaked sessions collection cannot be replayed.
+
+Expiry is sliding: each use pushes `expires_at` to now +
+`session_idle_minutes`, never beyond `absolute_expires_at` (created_at +
+`session_max_age_days`).
+
+SessionStore keeps recently used sessions in an in-process LRU
+(`session_cache_size` entries), so a request normally costs a dict lookup.
+An entry is re-read from the backend after `session_cache_seconds`, which
+bounds how long another worker can keep honouring a session revoked
+elsewhere. Revocations made by this worker apply immediately.
+
+Sliding-expiry updates are not written on every request. A session is
+marked dirty at most once per `session_touch_seconds`, and dirty sessions
+go to the backend in one bulk write every `session_flush_seconds` (and on
+shutdown).
+
+Backends (settings.session_backend):
+
+- "mongo":  `sessions` collection, a TTL index on expires_at and an index
+            on user_id for revoke_user
+- "memory": process-local dict, a stand-in for development and
+            single-worker setups (sessions die with the process)
+
+Usage:
+
+    from app.services.sessions import session_store
+    token = await session_store.create(user_id, email=email, ip=ip)
+    session = await session_store.get(token)      # None if unknown / expired
+    await session_store.revoke_user(user_id)      # log out everywhere
+'''
+import asyncio
+import hashlib
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SESSION_COOKIE = "session_id"
+
+
+def _session_key(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class Session:
+    __slots__ = ('key', 'user_id', 'email', 'created_at', 'last_seen',
+                 'expires_at', 'absolute_expires_at', 'loaded_at')
+
+    def __init__(self, doc: dict):
+        self.key = doc['_id']
+        self.user_id = doc['user_id']
+        self.email = doc.get('email')
+        self.created_at = doc['created_at']
+        self.last_seen = doc['last_seen']
+        self.expires_at = doc['expires_at']
+        self.absolute_expires_at = doc['absolute_expires_at']
+        # When the front cache read it from the backend (monotonic)
+        self.loaded_at = time.monotonic()
+
+    @property
+    def claims(self) -> dict:
+        """Same shape as access token claims, for request.state.user"""
+        return {'sub': str(self.user_id), 'email': self.email, 'sid': self.key}
+
+
+class MongoSessionBackend:
+    def __init__(self, collection=None):
+        from app.config.database import db
+        self.collection = collection if collection is not None else db['sessions']
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index('expires_at', expireAfterSeconds=0)
+        await self.collection.create_index('user_id')
+
+    async def insert(self, doc: dict) -> None:
+        await self.collection.insert_one(doc)
+
+    async def load(self, key: str) -> Optional[dict]:
+        return await self.collection.find_one({'_id': key})
+
+    async def touch_many(self, updates: Dict[str, Tuple[datetime, datetime]]) -> None:
+        await self.collection.bulk_write([
+            UpdateOne({'_id': key}, {'$set': {'last_seen': last_seen, 'expires_at': expires_at}})
+            for key, (last_seen, expires_at) in updates.items()
+        ], ordered=False)
+
+    async def delete(self, key: str) -> None:
+        await self.collection.delete_one({'_id': key})
+
+    async def delete_user(self, user_id: ObjectId) -> int:
+        result = await self.collection.delete_many({'user_id': user_id})
+        return result.deleted_count
+
+
+class MemorySessionBackend:
+    def __init__(self):
+        self.docs: Dict[str, dict] = {}
+
+    async def ensure_indexes(self) -> None:
+        pass
+
+    async def insert(self, doc: dict) -> None:
+        self.docs[doc['_id']] = dict(doc)
+
+    async def load(self, key: str) -> Optional[dict]:
+        doc = self.docs.get(key)
+        if doc is not None and doc['expires_at'] <= datetime.now():
+            del self.docs[key]
+            return None
+        return dict(doc) if doc is not None else None
+
+    async def touch_many(self, updates: Dict[str, Tuple[datetime, datetime]]) -> None:
+        for key, (last_seen, expires_at) in updates.items():
+            if key in self.docs:
+                self.docs[key].update(last_seen=last_seen, expires_at=expires_at)
+
+    async def delete(self, key: str) -> None:
+        self.docs.pop(key, None)
+
+    async def delete_user(self, user_id: ObjectId) -> int:
+        keys = [k for k, doc in self.docs.items() if doc['user_id'] == user_id]
+        for key in keys:
+            del self.docs[key]
+        return len(keys)
+
+
+BACKENDS = {'mongo': MongoSessionBackend, 'memory': MemorySessionBackend}
+
+
+class SessionStore:
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._front: "OrderedDict[str, Session]" = OrderedDict()
+        # key -> (last_seen, expires_at) waiting for the next flush
+        self._pending: Dict[str, Tuple[datetime, datetime]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        # Resolved lazily so settings / db re-pointing before first use are honoured
+        if self._backend is None:
+            self._backend = BACKENDS[settings.session_backend]()
+        return self._backend
+
+    async def ensure_indexes(self) -> None:
+        await self.backend.ensure_indexes()
+
+    def _remember(self, session: Session) -> None:
+        self._front[session.key] = session
+        self._front.move_to_end(session.key)
+        while len(self._front) > settings.session_cache_size:
+            self._front.popitem(last=False)
+
+    def _forget(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._front.pop(key, None)
+            self._pending.pop(key, None)
+
+    async def create(self, user_id, email: Optional[str] = None, **extra) -> str:
+        """New session for a user; returns the token to put in the cookie"""
+        token = secrets.token_urlsafe(32)
+        now = datetime.now()
+        absolute = now + timedelta(days=settings.session_max_age_days)
+        doc = {
+            '_id': _session_key(token),
+            'user_id': ObjectId(user_id),
+            'email': email,
+            'created_at': now,
+            'last_seen': now,
+            'expires_at': min(now + timedelta(minutes=settings.session_idle_minutes), absolute),
+            'absolute_expires_at': absolute,
+            **extra
+        }
+        await self.backend.insert(doc)
+        self._remember(Session(doc))
+        return token
+
+    async def get(self, token: Optional[str]) -> Optional[Session]:
+        """Live session for a token, extending its sliding expiry"""
+        if not token:
+            return None
+        key = _session_key(token)
+        session = self._front.get(key)
+        if session is not None and time.monotonic() - session.loaded_at < settings.session_cache_seconds:
+            self._front.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            doc = await self.backend.load(key)
+            if doc is None:
+                self._forget([key])
+                return None
+            session = Session(doc)
+            self._remember(session)
+
+        now = datetime.now()
+        if session.expires_at <= now:
+            self._forget([key])
+            return None
+        self._slide(session, now)
+        return session
+
+    def _slide(self, session: Session, now: datetime) -> None:
+        if (now - session.last_seen).total_seconds() < settings.session_touch_seconds:
+            return
+        session.last_seen = now
+        session.expires_at = min(
+            now + timedelta(minutes=settings.session_idle_minutes), session.absolute_expires_at
+        )
+        self._pending[session.key] = (session.last_seen, session.expires_at)
+
+    async def revoke(self, token: str) -> None:
+        key = _session_key(token)
+        self._forget([key])
+        await self.backend.delete(key)
+
+    async def revoke_user(self, user_id) -> int:
+        """Delete every session of a user (log out everywhere); returns sessions deleted"""
+        user_id = ObjectId(user_id)
+        self._forget([k for k, s in self._front.items() if s.user_id == user_id])
+        return await self.backend.delete_user(user_id)
+
+    async def flush(self) -> int:
+        """Write pending last-seen / expiry updates in one batch"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        try:
+            await self.backend.touch_many(pending)
+        except Exception:
+            # Keep newer values queued meanwhile; retry the rest on the next flush
+            for key, value in pending.items():
+                self._pending.setdefault(key, value)
+            raise
+        return len(pending)
+
+    async def _safe_flush(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Session flush failed: {str(e)}")
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.session_flush_seconds)
+            await self._safe_flush()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._safe_flush()
+
+    def stats(self) -> dict:
+        return {'cached': len(self._front), 'pending_touches': len(self._pending),
+                'hits': self.hits, 'misses': self.misses}
+
+
+session_store = SessionStore()
@@ -0,0 +1,177 @@
+'''
+Background sweeper for stale pending rows.
+
+Runs Order.expire_pending_orders and Transaction.process_failed_transactions
+on an interval, plus the archive jobs that move old finished orders and
+transactions to their archive collections (a bounded number of batches
+per tick). Every worker process starts a sweeper, but only the one
+holding the `sweeper` lease document in the `leases` collection does any
+work; the lease is renewed on each tick and taken over by another worker
+once it expires.
+
+Each sweep records how many rows it touched and how long it took in
+`sweeper.metrics` and logs the same line.
+
+Usage (see main.py):
+
+    from app.services.sweeper import sweeper
+    sweeper.start()
+    ...
+    await sweeper.stop()
+'''
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.config.database import db
+from app.config.settings import settings
+from app.models.order import Order
+from app.models.transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+
+class SweepJob:
+    def __init__(self, name: str, run: Callable[[], Awaitable[int]]):
+        self.name = name
+        self.run = run
+
+
+class Sweeper:
+    def __init__(
+        self,
+        jobs: List[SweepJob],
+        lease_name: str = 'sweeper',
+        interval_seconds: int = None,
+        lease_seconds: int = None
+    ):
+        self.jobs = jobs
+        self.lease_name = lease_name
+        self.interval = interval_seconds or settings.sweeper_interval_seconds
+        self.lease = timedelta(seconds=lease_seconds or settings.sweeper_lease_seconds)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.leases = db['leases']
+        self.metrics: Dict[str, dict] = {
+            job.name: {
+                'runs': 0,
+                'last_run_at': None,
+                'last_touched': 0,
+                'last_duration_ms': 0.0,
+                'total_touched': 0,
+                'last_error': None
+            }
+            for job in jobs
+        }
+        self._task: Optional[asyncio.Task] = None
+
+    async def acquire_lease(self) -> bool:
+        """Take or renew the leader lease; False if another worker holds it"""
+        now = datetime.now()
+        try:
+            await self.leases.find_one_and_update(
+                {
+                    '_id': self.lease_name,
+                    '$or': [
+                        {'owner': self.owner},
+                        {'expires_at': {'$lt': now}}
+                    ]
+                },
+                {'$set': {'owner': self.owner, 'expires_at': now + self.lease}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # The lease document exists and belongs to a live leader
+            return False
+
+    async def release_lease(self) -> None:
+        await self.leases.delete_one({'_id': self.lease_name, 'owner': self.owner})
+
+    async def run_once(self) -> None:
+        """Run every job once, recording rows touched and duration"""
+        for job in self.jobs:
+            stats = self.metrics[job.name]
+            started = time.perf_counter()
+            try:
+                touched = await job.run()
+                stats['last_error'] = None
+            except Exception as e:
+                touched = 0
+                stats['last_error'] = str(e)
+                logger.exception(f"Sweep {job.name} failed")
+            duration_ms = (time.perf_counter() - started) * 1000
+            stats['runs'] += 1
+            stats['last_run_at'] = datetime.now()
+            stats['last_touched'] = touched
+            stats['last_duration_ms'] = round(duration_ms, 2)
+            stats['total_touched'] += touched
+            logger.info(f"Sweep {job.name}: touched={touched} duration_ms={duration_ms:.1f}")
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                if await self.acquire_lease():
+                    await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Sweeper tick failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.release_lease()
+        except Exception as e:
+            logger.error(f"Failed to release sweeper lease: {str(e)}")
+
+
+sweeper = Sweeper([
+    SweepJob(
+        'expire_pending_orders',
+        lambda: Order.expire_pending_orders(
+            hours=settings.pending_order_hours,
+            batch_size=settings.sweeper_batch_size
+        )
+    ),
+    SweepJob(
+        'process_failed_transactions',
+        lambda: Transaction.process_failed_transactions(
+            hours=settings.pending_transaction_hours,
+            batch_size=settings.sweeper_batch_size
+        )
+    ),
+    SweepJob(
+        'archive_finished_orders',
+        lambda: Order.archive_finished_orders(
+            days=settings.archive_order_days,
+            batch_size=settings.archive_batch_size,
+            max_batches=settings.archive_max_batches_per_run
+        )
+    ),
+    SweepJob(
+        'archive_settled_transactions',
+        lambda: Transaction.archive_settled_transactions(
+            days=settings.archive_transaction_days,
+            batch_size=settings.archive_batch_size,
+            max_batches=settings.archive_max_batches_per_run
+        )
+    ),
+])
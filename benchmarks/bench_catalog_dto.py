@@ -0,0 +1,112 @@
+'''
+Memory and serialization cost of catalog listings: full documents vs the
+projected ServiceListItem / CountryListItem rows.
+
+For a page worth of services and countries shaped like the stored ones
+(available_countries / available_services arrays included), reports:
+
+- wire:    BSON bytes MongoDB sends (full document vs projection)
+- memory:  bytes allocated to hold the rows (tracemalloc)
+- json us: per-row cost of serializing to JSON, as /api/services does
+
+    python -m benchmarks.bench_catalog_dto [--rows 200] [--ids 300] [--repeat 5]
+
+No database needed.
+'''
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+import bson
+from bson import ObjectId
+
+from app.models.country import CountryListItem
+from app.models.service import ServiceListItem
+
+
+def service_doc(i, ids):
+    return {
+        '_id': ObjectId(), 'name': f"Service {i}", 'icon': f"https://example.com/icons/{i}.png",
+        'base_price': 0.10, 'current_price': 0.15,
+        'available_countries': [ObjectId() for _ in range(ids)],
+        'success_rate': 0.95, 'popularity': 4.5, 'is_free_allowed': True,
+        'free_daily_limit': 2, 'time_to_code_p50': 12.0, 'time_to_code_p90': 40.0,
+        'time_to_code_p99': 95.0, 'last_updated': datetime.now()
+    }
+
+
+def country_doc(i, ids):
+    return {
+        '_id': ObjectId(), 'name': f"Country {i}", 'code': 'VN',
+        'flag_icon': f"https://example.com/flags/{i}.svg", 'is_active': True,
+        'phone_code': '+84', 'available_services': [ObjectId() for _ in range(ids)]
+    }
+
+
+def projected(doc, projection):
+    """What MongoDB returns for `projection` (computed fields included)"""
+    row = {'_id': doc['_id']}
+    for field, spec in projection.items():
+        if spec == 1:
+            if field in doc:
+                row[field] = doc[field]
+        else:
+            row[field] = len(doc.get('available_services') or [])
+    return row
+
+
+def allocated(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rows = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del rows
+    return size
+
+
+def per_row_us(fn, rows, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best / rows * 1e6
+
+
+def report(label, docs, dto_cls, repeat):
+    wire_full = sum(len(bson.encode(d)) for d in docs)
+    wire_dto = sum(len(bson.encode(projected(d, dto_cls.PROJECTION))) for d in docs)
+    encoded_full = [bson.encode(d) for d in docs]
+    encoded_dto = [bson.encode(projected(d, dto_cls.PROJECTION)) for d in docs]
+
+    # Decoding inside the measurement, as a driver would hand the rows over
+    mem_full = allocated(lambda: [bson.decode(b) for b in encoded_full])
+    mem_dto = allocated(lambda: [dto_cls(bson.decode(b)) for b in encoded_dto])
+
+    rows = len(docs)
+    dtos = [dto_cls(projected(d, dto_cls.PROJECTION)) for d in docs]
+    json_full = per_row_us(lambda: json.dumps(docs, default=str), rows, repeat)
+    json_dto = per_row_us(lambda: json.dumps([r.to_dict() for r in dtos], default=str), rows, repeat)
+
+    print(f"{label:<10} {'full':>12} {'dto':>12} {'ratio':>7}")
+    print(f"{'wire B':<10} {wire_full:>12} {wire_dto:>12} {wire_full / wire_dto:>6.1f}x")
+    print(f"{'memory B':<10} {mem_full:>12} {mem_dto:>12} {mem_full / mem_dto:>6.1f}x")
+    print(f"{'json us':<10} {json_full:>12.2f} {json_dto:>12.2f} {json_full / json_dto:>6.1f}x")
+    print()
+
+
+def main(rows: int, ids: int, repeat: int):
+    report('services', [service_doc(i, ids) for i in range(rows)], ServiceListItem, repeat)
+    report('countries', [country_doc(i, ids) for i in range(rows)], CountryListItem, repeat)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--ids', type=int, default=300, help="ids per available_* array")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    main(args.rows, args.ids, args.repeat)
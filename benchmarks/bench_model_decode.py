@@ -0,0 +1,124 @@
+'''
+Per-document decode cost of stored documents into the Pydantic schemas.
+
+For each schema, decodes a batch of documents shaped like what MongoDB
+returns (ObjectId ids, datetimes) three ways:
+
+- validate:    Schema(**doc), converting ObjectIds to str first
+- adapter:     cached TypeAdapter(List[Schema]) over the whole batch,
+               same conversion
+- trusted:     app.core.trusted.trusted_construct (model_construct after
+               the id / enum conversions, no validators)
+
+    python -m benchmarks.bench_model_decode [--docs 2000] [--repeat 5]
+
+No database needed.
+'''
+import argparse
+import time
+from datetime import datetime
+from typing import List
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from app.core.trusted import trusted_construct_many, to_validation_input
+from app.models.order import OrderSchema
+from app.models.pricing import PricingSchema
+from app.models.project import ProjectSchema
+from app.models.service import ServiceSchema
+from app.models.transaction import TransactionSchema
+
+
+def project_doc(i):
+    return {
+        '_id': ObjectId(), 'user_id': ObjectId(), 'name': f"Project {i}",
+        'description': 'Project for user verification flows',
+        'default_country': ObjectId(), 'default_service': ObjectId(),
+        'area_code': '800', 'created_at': datetime.now(), 'updated_at': datetime.now(),
+        'api_calls': i
+    }
+
+
+def order_doc(i):
+    return {
+        '_id': ObjectId(), 'user_id': ObjectId(), 'service_id': ObjectId(),
+        'country_id': ObjectId(), 'phone_number_id': ObjectId(), 'price': 0.5,
+        'status': 'completed', 'start_time': datetime.now(), 'end_time': datetime.now(),
+        'verification_code': '123456', 'ip_address': '192.168.1.1',
+        'created_at': datetime.now(), 'updated_at': datetime.now()
+    }
+
+
+def transaction_doc(i):
+    return {
+        '_id': ObjectId(), 'user_id': ObjectId(), 'amount': 10.0, 'type': 'deposit',
+        'status': 'completed', 'payment_method': 'credit_card',
+        'payment_details': {'card_last4': '4242'}, 'timestamp': datetime.now(),
+        'created_at': datetime.now(), 'updated_at': datetime.now()
+    }
+
+
+def pricing_doc(i):
+    return {
+        '_id': ObjectId(), 'country_id': ObjectId(), 'service_id': ObjectId(),
+        'base_price': 0.10, 'current_price': 0.15,
+        'bulk_discounts': [
+            {'min_quantity': 100, 'price_per': 0.08},
+            {'min_quantity': 500, 'price_per': 0.06}
+        ],
+        'last_updated': datetime.now()
+    }
+
+
+def service_doc(i):
+    return {
+        '_id': ObjectId(), 'name': f"Service {i}", 'icon': 'https://example.com/i.png',
+        'base_price': 0.10, 'current_price': 0.15,
+        'available_countries': [ObjectId() for _ in range(20)],
+        'success_rate': 0.95, 'popularity': 4.5, 'is_free_allowed': True,
+        'free_daily_limit': 2, 'last_updated': datetime.now()
+    }
+
+
+CASES = [
+    (ProjectSchema, project_doc),
+    (OrderSchema, order_doc),
+    (TransactionSchema, transaction_doc),
+    (PricingSchema, pricing_doc),
+    (ServiceSchema, service_doc),
+]
+
+
+def per_doc_us(fn, count, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best / count * 1e6
+
+
+def main(docs: int, repeat: int):
+    print(f"{'schema':<20} {'validate us':>12} {'adapter us':>11} {'trusted us':>11} {'speedup':>8}")
+    for schema, make in CASES:
+        batch = [make(i) for i in range(docs)]
+        adapter = TypeAdapter(List[schema])
+
+        validate = per_doc_us(
+            lambda: [schema(**to_validation_input(d)) for d in batch], docs, repeat
+        )
+        batched = per_doc_us(
+            lambda: adapter.validate_python([to_validation_input(d) for d in batch]), docs, repeat
+        )
+        trusted = per_doc_us(lambda: trusted_construct_many(schema, batch), docs, repeat)
+        print(f"{schema.__name__:<20} {validate:>12.2f} {batched:>11.2f} {trusted:>11.2f} "
+              f"{validate / trusted:>7.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--docs', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    main(args.docs, args.repeat)
@@ -0,0 +1,118 @@
+'''
+Contention benchmark for phone number allocation.
+
+Seeds a scratch database with available numbers for one (service, country)
+and measures allocations per second at 1, 8 and 64 concurrent buyers, for
+the old "first matching document" find_one_and_update and for
+NumberAllocator. Buyers are spread over several allocator instances to
+simulate separate worker processes.
+
+    python -m benchmarks.bench_number_allocation [--numbers 20000] [--workers 4]
+
+Needs a running MongoDB at settings.mongo_uri; the scratch database
+`<mongo_db_name>_bench` is dropped afterwards.
+'''
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+
+from app.config.settings import settings
+from app.models.phone_number import PhoneNumber, PhoneNumberStatus
+from app.services.number_allocator import NumberAllocator
+
+CONCURRENCY_LEVELS = (1, 8, 64)
+
+
+async def seed(collection, service_id, country_id, count):
+    await collection.delete_many({})
+    expires = datetime.now() + timedelta(days=30)
+    docs = [
+        {
+            'number': f"+855{10000000 + i}",
+            'service_id': service_id,
+            'country_id': country_id,
+            'provider': 'bench',
+            'status': PhoneNumberStatus.ACTIVE.value,
+            'is_used': False,
+            'expiration_time': expires,
+            'alloc_key': random.random()
+        }
+        for i in range(count)
+    ]
+    for i in range(0, count, 5000):
+        await collection.insert_many(docs[i:i + 5000])
+
+
+async def naive_allocate(collection, service_id, country_id):
+    now = datetime.now()
+    return await collection.find_one_and_update(
+        {
+            'service_id': service_id,
+            'country_id': country_id,
+            'is_used': False,
+            'status': PhoneNumberStatus.ACTIVE.value,
+            'expiration_time': {'$gt': now}
+        },
+        {'$set': {'is_used': True, 'updated_at': now}},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def run_level(allocate, buyers, allocations):
+    remaining = allocations
+    done = 0
+
+    async def buyer(i):
+        nonlocal remaining, done
+        while remaining > 0:
+            remaining -= 1
+            if await allocate(i):
+                done += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(buyer(i) for i in range(buyers)))
+    return done / (time.perf_counter() - start)
+
+
+async def main(numbers: int, workers: int, allocations: int):
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    bench_db = client[f"{settings.mongo_db_name}_bench"]
+    collection = bench_db['phone_numbers']
+    PhoneNumber.collection = collection
+    await PhoneNumber.ensure_indexes()
+    service_id, country_id = ObjectId(), ObjectId()
+
+    print(f"{'buyers':>6} {'naive alloc/s':>15} {'allocator alloc/s':>18}")
+    try:
+        for buyers in CONCURRENCY_LEVELS:
+            await seed(collection, service_id, country_id, numbers)
+            naive = await run_level(
+                lambda i: naive_allocate(collection, service_id, country_id),
+                buyers, allocations
+            )
+
+            await seed(collection, service_id, country_id, numbers)
+            allocators = [NumberAllocator(collection=collection) for _ in range(workers)]
+            engine = await run_level(
+                lambda i: allocators[i % workers].allocate(str(service_id), str(country_id)),
+                buyers, allocations
+            )
+            print(f"{buyers:>6} {naive:>15.0f} {engine:>18.0f}")
+    finally:
+        await client.drop_database(bench_db.name)
+        client.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--numbers', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--allocations', type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.numbers, args.workers, args.allocations))
@@ -0,0 +1,84 @@
+'''
+Login cost of password verification at the configured scrypt parameters.
+
+Reports, for each cost (default: the configured one and its neighbours):
+
+- ms/hash:      latency of one verify on one core
+- logins/s/core: 1000 / ms, the sustained login rate a core can serve
+- pool logins/s: throughput of verify_and_update through the thread pool
+                 with `--concurrency` logins in flight
+- loop lag ms:  worst event-loop stall while the pool is busy (should stay
+                near 0: hashing never runs on the loop)
+- memory MB:    n * r * 128 bytes scrypt needs per hash in flight
+
+    python -m benchmarks.bench_password_hash [--logins 64] [--concurrency 32] [--n 16384]
+
+No database needed.
+'''
+import argparse
+import asyncio
+import os
+import time
+
+from app.config.settings import settings
+from app.core import passwords
+
+
+def per_hash_ms(stored: str, rounds: int) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        passwords.verify_password_sync(stored, 'correct horse battery staple')
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+async def pool_run(stored: str, logins: int, concurrency: int):
+    lag = 0.0
+    done = False
+
+    async def watch_loop():
+        nonlocal lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lag = max(lag, time.perf_counter() - start - 0.005)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            ok, _ = await passwords.verify_and_update(stored, 'correct horse battery staple')
+            assert ok
+
+    watcher = asyncio.ensure_future(watch_loop())
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    done = True
+    await watcher
+    return logins / elapsed, lag * 1000
+
+
+def main(costs, logins: int, concurrency: int):
+    workers = settings.password_hash_workers or os.cpu_count()
+    print(f"pool workers: {workers}, r={settings.password_scrypt_r}, p={settings.password_scrypt_p}")
+    print(f"{'n':>7} {'ms/hash':>8} {'logins/s/core':>14} {'pool logins/s':>14} {'loop lag ms':>12} {'memory MB':>10}")
+    for n in costs:
+        settings.password_scrypt_n = n
+        stored = passwords.hash_password_sync('correct horse battery staple')
+        ms = per_hash_ms(stored, 3)
+        rate, lag = asyncio.run(pool_run(stored, logins, concurrency))
+        memory = 128 * n * settings.password_scrypt_r / 1e6
+        print(f"{n:>7} {ms:>8.1f} {1000 / ms:>14.1f} {rate:>14.1f} {lag:>12.1f} {memory:>10.1f}")
+    legacy = os.urandom(16).hex() + '0' * 64
+    print(f"legacy sha256: {per_hash_ms(legacy, 3):.4f} ms/hash")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--n', type=int, default=settings.password_scrypt_n, help="configured cost")
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+    main([args.n // 2, args.n, args.n * 2], args.logins, args.concurrency)
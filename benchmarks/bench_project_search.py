@@ -0,0 +1,111 @@
+'''
+Project search benchmark: 100k projects for a single user.
+
+Compares the old unanchored case-insensitive $regex pipeline with
+Project.search_projects (prefix keys + relevance ranking) for a few
+representative queries.
+
+    python -m benchmarks.bench_project_search [--projects 100000] [--repeat 20]
+
+Needs a running MongoDB at settings.mongo_uri; the scratch database
+`<mongo_db_name>_bench` is dropped afterwards.
+'''
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.config.settings import settings
+from app.models.project import Project, search_fields
+
+WORDS = [
+    'user', 'verification', 'signup', 'telegram', 'whatsapp', 'checkout',
+    'marketing', 'campaign', 'login', 'onboarding', 'staging', 'production',
+    'android', 'ios', 'web', 'partner', 'internal', 'test', 'shop', 'bot'
+]
+QUERIES = ['verif', 'telegram bot', 'prod', 'onboarding android', 'zzz']
+
+
+async def seed(collection, user_id, count):
+    await collection.delete_many({})
+    base = datetime.now()
+    rng = random.Random(42)
+    batch = []
+    for i in range(count):
+        name = ' '.join(rng.sample(WORDS, 3)) + f" {i}"
+        description = ' '.join(rng.sample(WORDS, 6))
+        batch.append({
+            'user_id': user_id,
+            'name': name,
+            'description': description,
+            'default_country': ObjectId(),
+            'default_service': ObjectId(),
+            'created_at': base - timedelta(seconds=i),
+            'api_calls': 0,
+            **search_fields(name, description)
+        })
+        if len(batch) == 5000:
+            await collection.insert_many(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch)
+
+
+async def regex_search(collection, user_id, query, limit=10):
+    pipeline = [
+        {'$match': {
+            'user_id': user_id,
+            '$or': [
+                {'name': {'$regex': query, '$options': 'i'}},
+                {'description': {'$regex': query, '$options': 'i'}}
+            ]
+        }},
+        {'$limit': limit},
+        {'$sort': {'created_at': -1}}
+    ]
+    return [doc async for doc in collection.aggregate(pipeline)]
+
+
+async def indexed_search(collection, user_id, query, limit=10):
+    # Raw documents, so both columns measure the database work only
+    pipeline = Project.search_pipeline(user_id, query, limit)
+    return [doc async for doc in collection.aggregate(pipeline)] if pipeline else []
+
+
+async def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+async def main(projects: int, repeat: int):
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    bench_db = client[f"{settings.mongo_db_name}_bench"]
+    collection = bench_db['projects']
+    Project.collection = collection
+    user_id = ObjectId()
+    try:
+        await seed(collection, user_id, projects)
+        await Project.ensure_indexes()
+        print(f"{projects} projects for one user")
+        print(f"{'query':<22} {'regex ms':>10} {'indexed ms':>11}")
+        for query in QUERIES:
+            regex_ms = await timed(lambda: regex_search(collection, user_id, query), repeat)
+            indexed_ms = await timed(lambda: indexed_search(collection, user_id, query), repeat)
+            print(f"{query:<22} {regex_ms:>10.2f} {indexed_ms:>11.2f}")
+    finally:
+        await client.drop_database(bench_db.name)
+        client.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--projects', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.projects, args.repeat))
@@ -0,0 +1,109 @@
+'''
+Full price-matrix repricing: countries x services pricing rows.
+
+Compares a per-row read + update_one loop (on a sample, extrapolated)
+with repricer.apply: one pipeline UpdateMany per service, then one
+multiplier change per country, in bounded bulk_write batches.
+
+    python -m benchmarks.bench_repricing [--countries 200] [--services 100] [--sample 2000]
+
+Needs a running MongoDB at settings.mongo_uri; the scratch database
+`<mongo_db_name>_bench` is dropped afterwards.
+'''
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.config.settings import settings
+from app.models.pricing import Pricing
+from app.services.repricer import PriceChange, repricer
+
+
+async def seed(collection, country_ids, service_ids):
+    await collection.delete_many({})
+    rng = random.Random(42)
+    batch = []
+    for country_id in country_ids:
+        for service_id in service_ids:
+            base = round(rng.uniform(0.05, 1.0), 4)
+            batch.append({
+                'country_id': country_id,
+                'service_id': service_id,
+                'base_price': base,
+                'current_price': round(base * rng.uniform(1.0, 1.5), 4),
+                'bulk_discounts': [
+                    {'min_quantity': 100, 'price_per': round(base * 0.9, 4)},
+                    {'min_quantity': 500, 'price_per': round(base * 0.8, 4)}
+                ],
+                'last_updated': datetime.now()
+            })
+            if len(batch) == 5000:
+                await collection.insert_many(batch)
+                batch = []
+    if batch:
+        await collection.insert_many(batch)
+
+
+async def per_row(collection, service_ids, sample):
+    """The pre-pipeline way: read each row, compute in Python, write it back"""
+    new_prices = {sid: 0.5 for sid in service_ids}
+    done = 0
+    async for row in collection.find({}).limit(sample):
+        new_base = new_prices[row['service_id']]
+        await collection.update_one(
+            {'_id': row['_id']},
+            {'$set': {
+                'base_price': new_base,
+                'current_price': max(row['current_price'], new_base),
+                'last_updated': datetime.now()
+            }}
+        )
+        done += 1
+    return done
+
+
+async def main(countries: int, services: int, sample: int):
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    bench_db = client[f"{settings.mongo_db_name}_bench"]
+    collection = bench_db['pricing']
+    Pricing.collection = collection
+    country_ids = [ObjectId() for _ in range(countries)]
+    service_ids = [ObjectId() for _ in range(services)]
+    rows = countries * services
+    try:
+        await seed(collection, country_ids, service_ids)
+        await Pricing.ensure_indexes()
+        print(f"{rows} pricing rows ({countries} countries x {services} services)")
+
+        start = time.perf_counter()
+        done = await per_row(collection, service_ids, min(sample, rows))
+        elapsed = time.perf_counter() - start
+        print(f"per-row loop     {done / elapsed:>10.0f} rows/s  "
+              f"(~{rows / (done / elapsed):.1f}s for the matrix)")
+
+        changes = [PriceChange(service_id=sid, base_price=0.6) for sid in service_ids]
+        changes += [PriceChange(country_id=cid, multiplier=1.05) for cid in country_ids]
+        report = await repricer.apply(changes)
+        seconds = report['elapsed_ms'] / 1000
+        print(f"repricer         {report['modified'] / seconds:>10.0f} rows/s  "
+              f"({report['modified']} row writes, {report['batches']} batches, {seconds:.2f}s)")
+
+        report = await repricer.apply(changes[:services], dry_run=True, diff_limit=0)
+        print(f"dry run diff     {report['matched']} rows in {report['elapsed_ms'] / 1000:.2f}s")
+    finally:
+        await client.drop_database(bench_db.name)
+        client.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--countries', type=int, default=200)
+    parser.add_argument('--services', type=int, default=100)
+    parser.add_argument('--sample', type=int, default=2000, help="rows for the per-row loop")
+    args = parser.parse_args()
+    asyncio.run(main(args.countries, args.services, args.sample))
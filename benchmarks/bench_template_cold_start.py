@@ -0,0 +1,110 @@
+'''
+Cold-start cost of the Jinja templates: first page render in a fresh worker.
+
+Each sample is a new Python process (a new worker) that imports the
+shared environment from app.core.templating and renders a page twice,
+reporting:
+
+- startup ms: time spent in precompile_templates (0 when lazy)
+- first ms:   get_template + render of the page on the first request
+- second ms:  the same on the next request (template already compiled)
+
+for four setups:
+
+- lazy:                 no bytecode cache, compile on first hit (old behaviour)
+- lazy+bytecode:        compile on first hit, bytecode cache already filled
+- precompile:           precompile_templates at startup, no bytecode cache
+- precompile+bytecode:  precompile_templates at startup from the bytecode cache
+
+    python -m benchmarks.bench_template_cold_start [--page user/account/homepage.html] [--runs 5]
+
+No database needed.
+'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = [
+    ('lazy', False, False),
+    ('lazy+bytecode', False, True),
+    ('precompile', True, False),
+    ('precompile+bytecode', True, True),
+]
+
+
+def sample_context():
+    from bson import ObjectId
+    from app.models.country import CountryListItem
+    from app.models.service import ServiceListItem
+    services = [ServiceListItem({'_id': ObjectId(), 'name': f"Service {i}", 'icon': 'x.png',
+                                 'current_price': 0.15, 'success_rate': 0.95, 'popularity': i})
+                for i in range(20)]
+    countries = [CountryListItem({'_id': ObjectId(), 'name': f"Country {i}", 'code': 'VN',
+                                  'flag_icon': 'f.svg', 'phone_code': '+84', 'service_count': 3})
+                 for i in range(50)]
+    return {'services': services, 'total_services': len(services), 'countries': countries,
+            'total_countries': len(countries), 'selected_project_name': 'Bench'}
+
+
+def child(page: str, precompile: bool, bytecode: bool):
+    """One worker: optional precompile, then two renders of `page`"""
+    from app.core.templating import precompile_templates, templates
+    from app.services.fragment_cache import fragment_cache
+    env = templates.env
+    if not bytecode:
+        env.bytecode_cache = None
+    context = sample_context()
+
+    start = time.perf_counter()
+    if precompile:
+        precompile_templates()
+    startup = time.perf_counter() - start
+
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        fragments = fragment_cache.get(env, 'bench', context)
+        env.get_template(page).render({**context, 'fragments': fragments})
+        timings.append(time.perf_counter() - start)
+    print(json.dumps({'startup': startup * 1000, 'first': timings[0] * 1000,
+                      'second': timings[1] * 1000}))
+
+
+def run_child(page, precompile, bytecode, cache_dir):
+    env = dict(os.environ, TEMPLATE_BYTECODE_CACHE_DIR=cache_dir)
+    out = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_template_cold_start', '--child',
+         '--page', page] + (['--precompile'] if precompile else []) + (['--bytecode'] if bytecode else []),
+        env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(page: str, runs: int):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Fill the bytecode cache once, as an earlier worker would have
+        run_child(page, True, True, cache_dir)
+        print(f"{'setup':<22} {'startup ms':>11} {'first ms':>9} {'second ms':>10}")
+        for label, precompile, bytecode in MODES:
+            samples = [run_child(page, precompile, bytecode, cache_dir) for _ in range(runs)]
+            med = {k: statistics.median(s[k] for s in samples) for k in ('startup', 'first', 'second')}
+            print(f"{label:<22} {med['startup']:>11.2f} {med['first']:>9.2f} {med['second']:>10.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--page', default='user/account/homepage.html')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--precompile', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--bytecode', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.page, args.precompile, args.bytecode)
+    else:
+        main(args.page, args.runs)
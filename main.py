@@ -1,25 +1,52 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from app.core.assets import AssetStaticFiles
+from app.core.auth import AuthMiddleware
 from app.routes import user_routes
 import uvicorn
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
-    from app.config.database import connect_to_mongo
+    from app.config.database import connect_to_mongo, ensure_indexes
     if not await connect_to_mongo():
         raise RuntimeError("Failed to connect to MongoDB")
+    await ensure_indexes()
+    from app.config.settings import settings
+    if settings.template_precompile:
+        from app.core.templating import precompile_templates
+        precompile_templates()
+    from app.services.health import health_monitor
+    await health_monitor.start()
+    from app.services.sweeper import sweeper
+    sweeper.start()
+    from app.services.country_index import country_index
+    await country_index.start()
+    from app.services.service_stats import service_stats
+    service_stats.start()
+    from app.services.counter_buffer import CounterBuffer
+    CounterBuffer.start_all()
+    from app.services.sessions import session_store
+    session_store.start()
     yield
     # Shutdown logic
+    await session_store.stop()
+    await CounterBuffer.stop_all()
+    await service_stats.stop()
+    await country_index.stop()
+    await sweeper.stop()
+    await health_monitor.stop()
+    from app.services.number_allocator import number_allocator
+    await number_allocator.release_leases()
+    from app.core import passwords
+    passwords.shutdown()
     from app.config.database import close_mongo_connection
     await close_mongo_connection()
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(AuthMiddleware)
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-templates = Jinja2Templates(directory="app/views")
+app.mount("/static", AssetStaticFiles(directory="app/static"), name="static")
 app.include_router(user_routes.router)
 
 if __name__ == "__main__":
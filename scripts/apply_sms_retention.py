@@ -0,0 +1,32 @@
+'''
+Date SMS logs written before TTL retention so the TTL index can expire them.
+
+Run from the project root:
+
+    python -m scripts.apply_sms_retention [--recompute]
+
+--recompute re-dates every bucket and log, e.g. after changing
+SMS_LOG_RETENTION_DAYS; without it only documents lacking expires_at are
+updated. Re-running is safe.
+'''
+import argparse
+import asyncio
+
+from app.models.sms_log import SMSLog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--recompute', action='store_true')
+    args = parser.parse_args()
+
+    async def run():
+        await SMSLog.ensure_indexes()
+        return await SMSLog.apply_retention(args.recompute)
+
+    total = asyncio.run(run())
+    print(f"Done, updated {total} documents")
+
+
+if __name__ == '__main__':
+    main()
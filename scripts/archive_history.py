@@ -0,0 +1,40 @@
+'''
+Move old finished orders and settled transactions to the archive collections.
+
+The sweeper does this a few batches per tick; use this script for the
+first, large pass. Run from the project root:
+
+    python -m scripts.archive_history [--order-days 90] [--transaction-days 90] [--batch-size 1000]
+
+Interrupted runs can simply be restarted.
+'''
+import argparse
+import asyncio
+
+from app.config.settings import settings
+from app.models.order import Order
+from app.models.transaction import Transaction
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--order-days', type=int, default=settings.archive_order_days)
+    parser.add_argument('--transaction-days', type=int, default=settings.archive_transaction_days)
+    parser.add_argument('--batch-size', type=int, default=settings.archive_batch_size)
+    args = parser.parse_args()
+
+    async def run():
+        await Order.ensure_indexes()
+        await Transaction.ensure_indexes()
+        orders = await Order.archive_finished_orders(args.order_days, args.batch_size)
+        print(f"Archived {orders} orders")
+        transactions = await Transaction.archive_settled_transactions(
+            args.transaction_days, args.batch_size
+        )
+        print(f"Archived {transactions} transactions")
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+'''
+Build search keys for projects created before search_projects used them.
+
+Run from the project root:
+
+    python -m scripts.backfill_project_search [--batch-size 1000]
+'''
+import argparse
+import asyncio
+
+from app.models.project import Project
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    async def run():
+        await Project.ensure_indexes()
+        return await Project.backfill_search_keys(args.batch_size)
+
+    total = asyncio.run(run())
+    print(f"Done, indexed {total} projects")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+'''
+Fingerprint app/static and write gzip / brotli siblings for deployment.
+
+Run from the project root before starting the app (each deploy):
+
+    python -m scripts.build_assets [--clean]
+
+Output goes to STATIC_BUILD_DIR (app/static_build by default) with a
+manifest.json the `asset_url` template helper reads at startup. Without
+--clean, files of earlier builds are kept so pages still cached by
+clients keep resolving during a rollout. Brotli siblings need the
+optional `brotli` package; without it only .gz files are written.
+'''
+import argparse
+
+from app.core.assets import brotli, build_assets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clean', action='store_true', help="remove earlier builds first")
+    args = parser.parse_args()
+
+    report = build_assets(clean=args.clean)
+    if brotli is None:
+        print("brotli not installed, skipping .br files")
+    print(f"Done, {report['files']} files ({report['bytes']} bytes), "
+          f"{report['gzip']} gzip / {report['brotli']} brotli siblings, "
+          f"{report['compressed_bytes']} bytes on the wire")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+'''
+Build resized AVIF / WebP derivatives of app/static/img.
+
+Run from the project root (needs Pillow, only for this step):
+
+    python -m scripts.build_images [--widths 320,640,960] [--formats avif,webp]
+
+Output goes to IMAGE_DERIVATIVES_DIR (app/static_derived by default).
+Files are named by source content hash, so re-running only encodes new
+or changed images; the rest are reused.
+'''
+import argparse
+
+from app.core.images import FORMATS, WIDTHS, build_derivatives, supported_formats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--widths', default=','.join(map(str, WIDTHS)))
+    parser.add_argument('--formats', default=','.join(FORMATS))
+    args = parser.parse_args()
+
+    formats = args.formats.split(',')
+    skipped = [f for f in formats if f not in supported_formats()]
+    if skipped:
+        print(f"Pillow cannot encode {', '.join(skipped)} here, skipping")
+    report = build_derivatives(
+        widths=[int(w) for w in args.widths.split(',')],
+        formats=formats
+    )
+    print(f"Done, {report['images']} images: {report['encoded']} derivatives encoded, "
+          f"{report['reused']} reused")
+    if report['failed']:
+        print(f"Failed: {', '.join(report['failed'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+'''
+Move the embedded `sms_received` arrays of phone_numbers into SMSLog buckets.
+
+Run from the project root:
+
+    python -m scripts.migrate_sms_received [--batch-size 200]
+
+Every phone number is handled on its own: its buckets are rebuilt (buckets
+written by an interrupted earlier run are replaced), then the array is
+removed and the migrated messages are added to `sms_count` / `last_sms_at`
+($inc / $max, so messages counted by the deployed app since are kept).
+Re-running is safe.
+'''
+import argparse
+import asyncio
+from itertools import groupby
+
+from app.models.phone_number import PhoneNumber
+from app.models.sms_log import SMSLog, SMS_BUCKET_SIZE, bucket_start_for, expires_at_for
+
+
+def build_buckets(phone: dict) -> list:
+    """Group a phone number's embedded messages into bucket documents"""
+    messages = sorted(
+        (m for m in phone.get('sms_received', []) if m.get('timestamp')),
+        key=lambda m: m['timestamp']
+    )
+    buckets = []
+    for start, group in groupby(messages, key=lambda m: bucket_start_for(m['timestamp'])):
+        group = [
+            {
+                'content': m.get('content', ''),
+                'from': m.get('from', m.get('from_number')),
+                'timestamp': m['timestamp']
+            }
+            for m in group
+        ]
+        for i in range(0, len(group), SMS_BUCKET_SIZE):
+            chunk = group[i:i + SMS_BUCKET_SIZE]
+            buckets.append({
+                'phone_number': phone['number'],
+                'bucket_start': start,
+                'count': len(chunk),
+                'first_at': chunk[0]['timestamp'],
+                'last_at': chunk[-1]['timestamp'],
+                'messages': chunk,
+                'expires_at': expires_at_for(start),
+                'migrated_from': phone['_id']
+            })
+    return buckets
+
+
+async def migrate(batch_size: int) -> int:
+    migrated = 0
+    cursor = PhoneNumber.collection.find(
+        {'sms_received': {'$exists': True}},
+        {'number': 1, 'sms_received': 1}
+    ).batch_size(batch_size)
+    async for phone in cursor:
+        buckets = build_buckets(phone)
+        await SMSLog.bucket_collection.delete_many({'migrated_from': phone['_id']})
+        if buckets:
+            await SMSLog.bucket_collection.insert_many(buckets, ordered=False)
+
+        # $inc / $max: add_sms_message may already have counted messages
+        # received since deploy, which must not be overwritten
+        update = {
+            '$inc': {'sms_count': sum(b['count'] for b in buckets)},
+            '$unset': {'sms_received': ''}
+        }
+        if buckets:
+            update['$max'] = {'last_sms_at': max(b['last_at'] for b in buckets)}
+        # Only while sms_received is still there, so a re-run never counts twice
+        await PhoneNumber.collection.update_one(
+            {'_id': phone['_id'], 'sms_received': {'$exists': True}},
+            update
+        )
+        migrated += 1
+        if migrated % batch_size == 0:
+            print(f"Migrated {migrated} phone numbers")
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=200)
+    args = parser.parse_args()
+
+    async def run():
+        await SMSLog.ensure_indexes()
+        return await migrate(args.batch_size)
+
+    total = asyncio.run(run())
+    print(f"Done, migrated {total} phone numbers")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+'''
+Import or export the pricing matrix as CSV or JSONL.
+
+Run from the project root:
+
+    python -m scripts.pricing_io export pricing.csv
+    python -m scripts.pricing_io import pricing.csv [--dry-run] [--batch-size 1000]
+
+The format follows the file extension (.jsonl / .ndjson -> JSONL, else
+CSV) unless --format is given. See app/services/pricing_io.py for the
+columns.
+'''
+import argparse
+import asyncio
+import json
+import sys
+
+from app.services.pricing_io import FORMATS, export_pricing, format_for, import_pricing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('action', choices=['import', 'export'])
+    parser.add_argument('path', help="file to read or write, '-' for stdin/stdout")
+    parser.add_argument('--format', choices=FORMATS)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true', help="import: validate only")
+    args = parser.parse_args()
+    fmt = args.format or format_for(args.path)
+
+    if args.action == 'export':
+        async def run_export(stream):
+            return await export_pricing(stream, fmt, batch_size=args.batch_size)
+
+        if args.path == '-':
+            count = asyncio.run(run_export(sys.stdout))
+        else:
+            with open(args.path, 'w', newline='', encoding='utf-8') as f:
+                count = asyncio.run(run_export(f))
+        print(f"Exported {count} pricing rows", file=sys.stderr)
+        return
+
+    async def run_import(stream):
+        return await import_pricing(stream, fmt, args.batch_size, args.dry_run)
+
+    if args.path == '-':
+        report = asyncio.run(run_import(sys.stdin))
+    else:
+        with open(args.path, newline='', encoding='utf-8') as f:
+            report = asyncio.run(run_import(f))
+    print(json.dumps(report, indent=2))
+    if report['invalid']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+'''
+Reprice a service, a country or one (country, service) pair.
+
+Prints a dry-run diff unless --apply is given. Run from the project root:
+
+    python -m scripts.reprice --service <id> --base-price 0.25
+    python -m scripts.reprice --country <id> --multiplier 1.1 --apply
+'''
+import argparse
+import asyncio
+import json
+
+from app.services.repricer import PriceChange, repricer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--service')
+    parser.add_argument('--country')
+    parser.add_argument('--base-price', type=float)
+    parser.add_argument('--multiplier', type=float)
+    parser.add_argument('--apply', action='store_true', help="write the change (default: dry run)")
+    parser.add_argument('--diff-limit', type=int, default=50)
+    args = parser.parse_args()
+
+    try:
+        change = PriceChange(args.service, args.country, args.base_price, args.multiplier)
+    except ValueError as e:
+        parser.error(str(e))
+
+    report = asyncio.run(repricer.apply([change], dry_run=not args.apply, diff_limit=args.diff_limit))
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()